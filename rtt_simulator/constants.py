@@ -5,6 +5,7 @@ NETWORK_ORDER_KEY = "NetworkOrder"
 NETWORK_ENUMS_KEY = "NetworkPathEnumerations"
 CONSTELLATION_KEY = "Constellation"
 DURATION_KEY = "SimulationDuration"
+PROPAGATION_MODE_KEY = "PropagationMode"
 
 POINT_TYPE_KEY = "Type"
 LOCATION_KEY = "Location"
@@ -19,5 +20,9 @@ EARTH_RADIUS = 6378135.0
 
 #Simulation constants
 HYPATIA_NUM_THREADS = 10
+HYPATIA_PARALLEL_MODE = "threads"
+HYPATIA_IN_MEMORY = False
 TIMESTEP_MS = 100
 DYNAMIC_STATE_ALGORITHM = "algorithm_free_one_only_over_isls"
+PROPAGATION_MODE = "ephem"
+PROPAGATION_MODES = ["ephem", "sgp4", "analytic", "ephemeris"]
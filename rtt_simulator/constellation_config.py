@@ -17,6 +17,9 @@ class ConstellationConfig():
     :param int num_orbs: Number of orbits
     :param int num_sats_per_orb: Number of satellites per orbit
     :param int inclination_degree: The inclination degree
+    :param str propagation_mode: How satellite positions are calculated ("ephem",
+        "sgp4", "analytic" or "ephemeris"), "analytic" is the fastest for the
+        near-circular orbits generated from this configuration
     """
     def __init__(
             self,
@@ -30,7 +33,8 @@ class ConstellationConfig():
             max_isl_length_m,
             num_orbs,
             num_sats_per_orb,
-            inclination_degree
+            inclination_degree,
+            propagation_mode=constants.PROPAGATION_MODE
         ):
             self.name = name
             self.eccentricity = eccentricity
@@ -43,6 +47,7 @@ class ConstellationConfig():
             self.num_orbs = num_orbs
             self.num_sats_per_orb = num_sats_per_orb
             self.inclination_degree = inclination_degree
+            self.propagation_mode = propagation_mode
 
 def GetStarlinkConfig():
     """
@@ -12,6 +12,7 @@ import constants
 from collections import defaultdict
 from network_simulator import NetworkSimulator
 from satgen.post_analysis.print_routes_and_rtt import print_routes_and_rtt
+from satgen.post_analysis.routes_and_rtt_in_memory import routes_and_rtt_in_memory
 
 class SatelliteNetworkState():
     """
@@ -23,14 +24,19 @@ class SatelliteNetworkState():
     :param gs_points: A generator object the yields net_point.NetworkPoint objects
     :param int duration: Duration of the simulation in seconds
     :param str output_dir: The folder to save the generated state to
+    :param bool in_memory: If True, only the satellite network is written, as the
+        dynamic state is generated in memory when the RTTs are calculated (else
+        it is also generated and written to the output folder, see rtts())
     """
     #gs_points is a generator of NetworkPoints
-    def __init__(self, constellation_config, gs_points, duration, output_dir):
+    def __init__(self, constellation_config, gs_points, duration, output_dir, in_memory=constants.HYPATIA_IN_MEMORY):
         self.constellation = constellation_config
         self.groundstation_points = gs_points
         self.output_dir = output_dir
         self.duration = duration
+        self.in_memory = in_memory
         self.loc_to_id = defaultdict(lambda: -1)
+        self.rtts_in_memory = None
 
     def __create_tmp_gs_config(self):
         tmp_name = self.output_dir + "/tmp_gs_loc.csv"
@@ -108,6 +114,9 @@ class SatelliteNetworkState():
         for f in os.listdir(write_to_dir):
             print(f)
 
+        if self.in_memory:
+            return
+
         satgen.help_dynamic_state(
             self.output_dir,
             constants.HYPATIA_NUM_THREADS,
@@ -117,9 +126,42 @@ class SatelliteNetworkState():
             self.constellation.max_gsl_length_m,
             self.constellation.max_isl_length_m,
             constants.DYNAMIC_STATE_ALGORITHM,
-            True
+            True,
+            self.constellation.propagation_mode,
+            parallel_mode=constants.HYPATIA_PARALLEL_MODE
         )
 
+    def rtts(self, src_id, dst_id):
+        """
+        rtts returns the Round Trip Times between two ground stations, which are
+        calculated in memory for all pairs of ground stations at once (the first
+        time it is called) and then looked up
+
+        :param int src_id: Internal simulation ID of the source ground station
+        :param int dst_id: Internal simulation ID of the destination ground station
+        :raises ValueError: If the state is not in memory or the pair is unknown
+        :return: List of RTTs in milliseconds
+        """
+        if not self.in_memory:
+            raise ValueError("RTTs are only calculated in memory if in_memory is set")
+        if self.rtts_in_memory is None:
+            gs_ids = sorted(self.loc_to_id.values())
+            routes_and_rtts = routes_and_rtt_in_memory(
+                self.output_dir + "/" + self.constellation.name,
+                constants.TIMESTEP_MS,
+                self.duration,
+                [(a, b) for a in gs_ids for b in gs_ids if a != b],
+                constants.DYNAMIC_STATE_ALGORITHM,
+                self.constellation.propagation_mode
+            )
+            self.rtts_in_memory = {
+                pair: [rtt_in_ns / 1000000.0 for rtt_in_ns in rtts_in_ns.tolist()]
+                for pair, rtts_in_ns in routes_and_rtts["rtt_ns"].items()
+            }
+        if (src_id, dst_id) not in self.rtts_in_memory:
+            raise ValueError("No RTTs between " + str(src_id) + " and " + str(dst_id))
+        return self.rtts_in_memory[(src_id, dst_id)]
+
     def groundstation_map(self, save_to_fname=None):
         """
         groundstation_map returns an object mapping ground station node names
@@ -214,14 +256,23 @@ class SatelliteRelaySimulator(NetworkSimulator):
         network state
     :param str output_dir: Directory to write the calculated RTTs to
     :param str satgenpy_dir: Full path to the hypatia satgenpy module
+    :param str propagation_mode: How satellite positions are calculated (should
+        be the same as the one used to generate the network state)
+    :param SatelliteNetworkState network_state: If given and in memory, the RTTs
+        are looked up from it (calculated in memory for all ground station pairs
+        at once), else they are calculated from the dynamic state generated on
+        disk (the routes and RTTs are written to output_dir and parsed back)
     """
-    def __init__(self, gs_map, duration, state_dir, output_dir, satgenpy_dir):
+    def __init__(self, gs_map, duration, state_dir, output_dir, satgenpy_dir, propagation_mode=constants.PROPAGATION_MODE,
+                 network_state=None):
         self.state_dir = state_dir
         self.output_dir = output_dir
         self.duration = duration
         self.rtt_datapoints = None
         self.gs_name_to_id_map = gs_map
         self.satgenpy_dir = satgenpy_dir
+        self.propagation_mode = propagation_mode
+        self.network_state = network_state
 
     """
     src, dst are NetworkPoints
@@ -237,7 +288,11 @@ class SatelliteRelaySimulator(NetworkSimulator):
         """
         src_id = self.gs_name_to_id_map.get_groundstation_id(src.name())
         dst_id = self.gs_name_to_id_map.get_groundstation_id(dst.name())
-        print_routes_and_rtt(self.output_dir, self.state_dir, constants.TIMESTEP_MS, self.duration, src_id, dst_id, self.satgenpy_dir + "/")
+        if self.network_state is not None and self.network_state.in_memory:
+            self.rtt_datapoints = self.network_state.rtts(src_id, dst_id)
+            return (rtt_in_s for rtt_in_s in self.rtt_datapoints)
+
+        print_routes_and_rtt(self.output_dir, self.state_dir, constants.TIMESTEP_MS, self.duration, src_id, dst_id, self.satgenpy_dir + "/", self.propagation_mode)
 
         for f in os.listdir(self.output_dir):
             print(f)
@@ -6,3 +6,4 @@ from .dynamic_state import *
 from .description import *
 from .post_analysis import *
 from .distance_tools import *
+from .ephemeris import *
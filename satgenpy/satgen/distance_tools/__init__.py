@@ -1,8 +1,37 @@
 from .distance_tools import (
+    ephem_date_at,
     distance_m_between_satellites,
     distance_m_ground_station_to_satellite,
     geodesic_distance_m_between_ground_stations,
     straight_distance_m_between_ground_stations,
+    geodesic_distance_m_matrix_between_ground_stations,
+    straight_distance_m_matrix_between_ground_stations,
     create_basic_ground_station_for_satellite_shadow,
-    geodetic2cartesian
+    geodetic2cartesian,
+    geodetic2cartesian_array
+)
+from .propagation import (
+    satellite_ephem_to_satrec,
+    create_satellite_propagator,
+    create_analytic_propagator,
+    analytic_satellite_positions_m,
+    create_ephemeris_propagator,
+    create_propagator_for_mode,
+    satellite_positions_m_or_none_at,
+    satellite_positions_m_at,
+    satellite_position_m_at,
+    calculate_satellite_positions_m_at,
+    sub_satellite_points_degrees,
+    sub_satellite_points_degrees_at,
+    ground_station_positions_m,
+    distances_m_between_satellites,
+    distances_m_ground_stations_to_satellites,
+    satellites_in_range_of_ground_stations,
+    satellites_in_range_of_ground_stations_among,
+    satellites_in_range_unchanged_for_ns
+)
+from .isl_length_table import (
+    walker_period_ns,
+    create_isl_length_table,
+    isl_lengths_m_from_table
 )
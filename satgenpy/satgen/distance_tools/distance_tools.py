@@ -22,8 +22,26 @@
 
 import math
 import ephem
+import numpy as np
 from geopy.distance import great_circle
 
+# Julian date of the ephem date zero point (1899-12-31 12:00:00)
+EPHEM_DATE_ZERO_JD = 2415020.0
+
+
+def ephem_date_at(epoch, time_since_epoch_ns):
+    """
+    Calculate the ephem date (days since 1899-12-31 12:00:00) of a time moment, such that it can be
+    passed to the distance calculations instead of a string. This avoids astropy time arithmetic
+    and the parsing of a date string for every distance calculation.
+
+    :param epoch:                   Epoch (astropy Time)
+    :param time_since_epoch_ns:     Time since epoch (ns)
+
+    :return: Ephem date (ephem.Date)
+    """
+    return ephem.Date((epoch.jd1 - EPHEM_DATE_ZERO_JD) + epoch.jd2 + time_since_epoch_ns / 86400000000000.0)
+
 
 def distance_m_between_satellites(sat1, sat2, epoch_str, date_str):
     """
@@ -31,8 +49,8 @@ def distance_m_between_satellites(sat1, sat2, epoch_str, date_str):
 
     :param sat1:       The first satellite
     :param sat2:       The other satellite
-    :param epoch_str:  Epoch time of the observer (string)
-    :param date_str:   The time instant when the distance should be measured (string)
+    :param epoch_str:  Epoch time of the observer (string, or ephem date from ephem_date_at())
+    :param date_str:   The time instant when the distance should be measured (string, or ephem date)
 
     :return: The distance between the satellites in meters
     """
@@ -70,8 +88,8 @@ def distance_m_ground_station_to_satellite(ground_station, satellite, epoch_str,
 
     :param ground_station:  The ground station
     :param satellite:       The satellite
-    :param epoch_str:       Epoch time of the observer (ground station) (string)
-    :param date_str:        The time instant when the distance should be measured (string)
+    :param epoch_str:       Epoch time of the observer (ground station) (string, or ephem date from ephem_date_at())
+    :param date_str:        The time instant when the distance should be measured (string, or ephem date)
 
     :return: The distance between the ground station and the satellite in meters
     """
@@ -138,13 +156,65 @@ def straight_distance_m_between_ground_stations(ground_station_1, ground_station
     return polygon_side_m
 
 
+def geodesic_distance_m_matrix_between_ground_stations(ground_stations):
+    """
+    Calculate the geodesic distance between every pair of ground stations at once
+    (same great-circle formula as geodesic_distance_m_between_ground_stations()).
+
+    :param ground_stations:     List of ground stations
+
+    :return: Numpy array of shape (number of ground stations, number of ground stations) with geodesic distances in meters
+    """
+
+    # WGS72 value; taken from https://geographiclib.sourceforge.io/html/NET/NETGeographicLib_8h_source.html
+    earth_radius_m = 6378135.0
+
+    # Latitude and longitude (radians) are parsed once for each ground station
+    lat = np.radians(np.array([float(ground_station["latitude_degrees_str"]) for ground_station in ground_stations]))
+    lng = np.radians(np.array([float(ground_station["longitude_degrees_str"]) for ground_station in ground_stations]))
+    sin_lat1, cos_lat1 = np.sin(lat)[:, np.newaxis], np.cos(lat)[:, np.newaxis]
+    sin_lat2, cos_lat2 = np.sin(lat)[np.newaxis, :], np.cos(lat)[np.newaxis, :]
+    delta_lng = lng[np.newaxis, :] - lng[:, np.newaxis]
+    cos_delta_lng, sin_delta_lng = np.cos(delta_lng), np.sin(delta_lng)
+
+    # Central angle
+    d = np.arctan2(
+        np.sqrt((cos_lat2 * sin_delta_lng) ** 2 + (cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_delta_lng) ** 2),
+        sin_lat1 * sin_lat2 + cos_lat1 * cos_lat2 * cos_delta_lng
+    )
+
+    return earth_radius_m * d
+
+
+def straight_distance_m_matrix_between_ground_stations(ground_stations, geodesic_distance_m_matrix=None):
+    """
+    Calculate the straight distance (goes through the Earth) between every pair of ground stations at once
+    (same as straight_distance_m_between_ground_stations()).
+
+    :param ground_stations:             List of ground stations
+    :param geodesic_distance_m_matrix:  Geodesic distance matrix, if already calculated (optional)
+
+    :return: Numpy array of shape (number of ground stations, number of ground stations) with straight distances in meters
+    """
+
+    # WGS72 value; taken from https://geographiclib.sourceforge.io/html/NET/NETGeographicLib_8h_source.html
+    earth_radius_m = 6378135.0
+
+    if geodesic_distance_m_matrix is None:
+        geodesic_distance_m_matrix = geodesic_distance_m_matrix_between_ground_stations(ground_stations)
+
+    # Angle from the Earth's core, of which half is the angle of the triangle with the 90 degree corner
+    angle_radians = geodesic_distance_m_matrix / (earth_radius_m * 2.0 * math.pi) * 2 * math.pi
+    return 2 * np.sin(angle_radians / 2.0) * earth_radius_m
+
+
 def create_basic_ground_station_for_satellite_shadow(satellite, epoch_str, date_str):
     """
     Calculate the (latitude, longitude) of the satellite shadow on the Earth and creates a ground station there.
 
     :param satellite:   Satellite
-    :param epoch_str:   Epoch (string)
-    :param date_str:    Time moment (string)
+    :param epoch_str:   Epoch (string, or ephem date from ephem_date_at())
+    :param date_str:    Time moment (string, or ephem date)
 
     :return: Basic ground station
     """
@@ -196,3 +266,42 @@ def geodetic2cartesian(lat_degrees, lon_degrees, ele_m):
     z = (v * (1.0 - e * e) + ele_m) * math.sin(lat)
 
     return x, y, z
+
+
+def geodetic2cartesian_array(lat_degrees, lon_degrees, ele_m):
+    """
+    Compute geodetic coordinates (latitude, longitude, elevation) to Cartesian coordinates
+    for many points at once (same formula as geodetic2cartesian()).
+
+    :param lat_degrees: Latitudes in degrees (array-like of floats)
+    :param lon_degrees: Longitudes in degrees (array-like of floats)
+    :param ele_m:  Elevations in meters (array-like of floats, or a single float)
+
+    :return: Numpy array of shape (number of points, 3) with the Cartesian coordinates (x, y, z)
+    """
+
+    # WGS72 value,
+    # Source: https://geographiclib.sourceforge.io/html/NET/NETGeographicLib_8h_source.html
+    a = 6378135.0
+
+    # Ellipsoid flattening factor; WGS72 value
+    # Taken from https://geographiclib.sourceforge.io/html/NET/NETGeographicLib_8h_source.html
+    f = 1.0 / 298.26
+
+    # First numerical eccentricity of ellipsoid
+    e = math.sqrt(2.0 * f - f * f)
+    lat = np.asarray(lat_degrees, dtype=float) * (math.pi / 180.0)
+    lon = np.asarray(lon_degrees, dtype=float) * (math.pi / 180.0)
+    ele_m = np.asarray(ele_m, dtype=float)
+    if lat.ndim != 1 or lat.shape != lon.shape:
+        raise ValueError("Latitudes and longitudes must be one-dimensional and of equal length")
+
+    # Radius of curvature in the prime vertical of the surface of the geodetic ellipsoid
+    sin_lat = np.sin(lat)
+    v = a / np.sqrt(1.0 - e * e * sin_lat * sin_lat)
+
+    cartesian = np.empty((len(lat), 3))
+    cartesian[:, 0] = (v + ele_m) * np.cos(lat) * np.cos(lon)
+    cartesian[:, 1] = (v + ele_m) * np.cos(lat) * np.sin(lon)
+    cartesian[:, 2] = (v * (1.0 - e * e) + ele_m) * sin_lat
+    return cartesian
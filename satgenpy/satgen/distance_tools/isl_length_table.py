@@ -0,0 +1,125 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import numpy as np
+from .distance_tools import distance_m_between_satellites, ephem_date_at
+from .propagation import satellite_ephem_to_satrec
+
+
+def walker_period_ns(satellites):
+    """
+    Calculate the period after which the ISL lengths repeat. If all satellites share the same orbital
+    shape (inclination, eccentricity, argument of perigee, mean motion, no drag) and epoch, they all
+    drift the same. As such, the constellation as a whole only rotates around the Earth axis (which
+    does not change the distance between satellites) and every satellite returns to the same argument
+    of latitude after the same period.
+
+    :param satellites:  List of satellites (ephem.EarthSatellite, as read in by read_tles())
+
+    :return: Period (ns)
+    """
+    satrecs = list(map(satellite_ephem_to_satrec, satellites))
+    if len(satrecs) == 0:
+        raise ValueError("There must be at least one satellite")
+    for satrec in satrecs:
+        if satrec.inclo != satrecs[0].inclo \
+                or satrec.ecco != satrecs[0].ecco \
+                or satrec.argpo != satrecs[0].argpo \
+                or satrec.no_kozai != satrecs[0].no_kozai \
+                or satrec.bstar != 0.0 \
+                or satrec.jdsatepoch != satrecs[0].jdsatepoch \
+                or satrec.jdsatepochF != satrecs[0].jdsatepochF:
+            raise ValueError("ISL lengths are only periodic if all satellites share the same "
+                             "drag-free orbital shape and epoch")
+
+    # Argument of latitude rate (radians / minute)
+    argument_of_latitude_rate = satrecs[0].mdot + satrecs[0].argpdot
+    return int(round(2.0 * math.pi / argument_of_latitude_rate * 60.0 * 1000.0 * 1000.0 * 1000.0))
+
+
+def create_isl_length_table(satellites, epoch, list_isls, period_ns, time_resolution_ns=1000000000):
+    """
+    Calculate the length of all ISLs over one period, such that the ISL lengths at any later
+    time moment can be retrieved using isl_lengths_m_from_table() instead of calculated.
+
+    :param satellites:          List of satellites (ephem.EarthSatellite, as read in by read_tles())
+    :param epoch:               Epoch (astropy Time) to which time since epoch is relative
+    :param list_isls:           List of (a, b) satellite pairs
+    :param period_ns:           Period after which the ISL lengths repeat (ns) (see walker_period_ns())
+    :param time_resolution_ns:  Time between subsequent entries in the table (ns)
+
+    :return: ISL length table dictionary
+    """
+    if period_ns <= 0:
+        raise ValueError("Period must be positive")
+    if time_resolution_ns <= 0 or time_resolution_ns > period_ns:
+        raise ValueError("Time resolution must be positive and at most the period")
+
+    # Entries from 0 up to and including three past the period, such that every
+    # time moment in the period has two entries before and two entries after it
+    num_entries = int(math.ceil(period_ns / time_resolution_ns)) + 4
+    isl_lengths_m = np.empty((num_entries, len(list_isls)))
+    ephem_epoch = ephem_date_at(epoch, 0)
+    for i in range(num_entries):
+        ephem_time = ephem_date_at(epoch, i * time_resolution_ns)
+        for isl_idx, (a, b) in enumerate(list_isls):
+            isl_lengths_m[i, isl_idx] = distance_m_between_satellites(
+                satellites[a], satellites[b], ephem_epoch, ephem_time
+            )
+
+    return {
+        "period_ns": period_ns,
+        "time_resolution_ns": time_resolution_ns,
+        "isl_lengths_m": isl_lengths_m,
+    }
+
+
+def isl_lengths_m_from_table(isl_length_table, time_since_epoch_ns):
+    """
+    Retrieve the length of all ISLs at a time moment from the ISL length table.
+    It is interpolated (cubic) between the entries of the table.
+
+    :param isl_length_table:        ISL length table (from create_isl_length_table())
+    :param time_since_epoch_ns:     Time since epoch (ns)
+
+    :return: Numpy array with the length in meters of each ISL
+    """
+    time_resolution_ns = isl_length_table["time_resolution_ns"]
+    isl_lengths_m = isl_length_table["isl_lengths_m"]
+
+    # Position in the table, at least one entry in such that there is an entry before it
+    # (except exactly at the first entry, which is returned as-is like every other entry)
+    position = (time_since_epoch_ns % isl_length_table["period_ns"]) / time_resolution_ns
+    if position == 0.0:
+        return isl_lengths_m[0].copy()
+    if position < 1.0:
+        position += isl_length_table["period_ns"] / time_resolution_ns
+    idx = int(math.floor(position))
+    f = position - idx
+
+    # Catmull-Rom spline through the two entries before and after
+    p0 = isl_lengths_m[idx - 1]
+    p1 = isl_lengths_m[idx]
+    p2 = isl_lengths_m[idx + 1]
+    p3 = isl_lengths_m[idx + 2]
+    return p1 + 0.5 * f * (p2 - p0 + f * (2.0 * p0 - 5.0 * p1 + 4.0 * p2 - p3 + f * (3.0 * (p1 - p2) + p3 - p0)))
@@ -0,0 +1,587 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import numpy as np
+from sgp4.api import Satrec, SatrecArray, WGS72
+from sgp4.propagation import gstime
+from scipy.spatial import cKDTree
+from .distance_tools import geodetic2cartesian, ephem_date_at, EPHEM_DATE_ZERO_JD
+
+# Upper bound on how fast the distance between a ground station and a satellite can change (m/s): a satellite in
+# orbit is slower than the escape velocity at the surface of the Earth (about 11.2 km/s), and a ground station
+# moves at most with the rotation of the Earth (less than 0.5 km/s)
+MAX_GSL_LENGTH_RATE_M_PER_S = 12000.0
+
+
+# Julian date of the SGP-4 epoch zero point (1949-12-31 00:00:00)
+SGP4_EPOCH_ZERO_JD = 2433281.5
+
+
+def satellite_ephem_to_satrec(satellite):
+    """
+    Convert an ephem satellite into an SGP-4 satellite record with the same orbital elements.
+
+    :param satellite:   Satellite (ephem.EarthSatellite, as read in by read_tles())
+
+    :return: SGP-4 satellite record (sgp4.api.Satrec)
+    """
+
+    # The angles of ephem are stored in radians (ephem.Angle), the mean motion in revolutions per day
+    epoch_jd = float(satellite._epoch) + EPHEM_DATE_ZERO_JD
+    satrec = Satrec()
+    satrec.sgp4init(
+        WGS72,                                  # Gravity model (same as TLE generation)
+        'i',                                    # Operating mode (improved mode)
+        0,                                      # satnum:   satellite number (not used)
+        epoch_jd - SGP4_EPOCH_ZERO_JD,          # epoch:    days since 1949 December 31 00:00 UT
+        satellite._drag,                        # bstar:    drag coefficient
+        0.0,                                    # ndot:     ballistic coefficient (not used by SGP-4)
+        0.0,                                    # nndot:    second derivative of mean motion (not used by SGP-4)
+        satellite._e,                           # ecco:     eccentricity
+        float(satellite._ap),                   # argpo:    argument of perigee (radians)
+        float(satellite._inc),                  # inclo:    inclination (radians)
+        float(satellite._M),                    # mo:       mean anomaly (radians)
+        satellite._n * 2.0 * math.pi / 1440.0,  # no_kozai: mean motion (radians/minute)
+        float(satellite._raan)                  # nodeo:    right ascension of ascending node (radians)
+    )
+    return satrec
+
+
+def create_satellite_propagator(satellites, epoch, max_cached_time_steps=64):
+    """
+    Create a propagator which calculates the positions of all satellites in one batched call.
+
+    The positions of the most recently used time moments are kept in a cache, such that
+    every satellite is only propagated once per time moment, irrespective of how many
+    ISLs, GSLs or path hops it is part of.
+
+    :param satellites:              List of satellites (ephem.EarthSatellite, as read in by read_tles())
+    :param epoch:                   Epoch (astropy Time) to which time since epoch is relative
+    :param max_cached_time_steps:   Maximum number of time moments of which the positions are cached
+                                    (when full, the earliest time moment is evicted first)
+
+    :return: Propagator dictionary
+    """
+    if max_cached_time_steps < 0:
+        raise ValueError("Maximum number of cached time steps cannot be negative")
+    return {
+        "propagation_mode": "sgp4",
+        "num_satellites": len(satellites),
+        "epoch_jd1": epoch.jd1,
+        "epoch_jd2": epoch.jd2,
+        "satrec_array": SatrecArray(list(map(satellite_ephem_to_satrec, satellites))),
+        "max_cached_time_steps": max_cached_time_steps,
+        "cached_positions_m": {},
+    }
+
+
+def create_analytic_propagator(satellites, epoch, max_cached_time_steps=64):
+    """
+    Create a propagator which calculates the positions of all satellites in closed form.
+
+    This is only possible for drag-free near-Earth orbits, such as the near-circular orbits of
+    generate_tles_from_scratch_manual(). For those, the SGP-4 equations reduce to secular J2 drift
+    of the mean anomaly, argument of perigee and RAAN, the long-period J3 periodics and the
+    short-period J2 periodics, which are evaluated with array operations for all satellites
+    and time moments at once (see analytic_satellite_positions_m()).
+
+    :param satellites:              List of satellites (ephem.EarthSatellite, as read in by read_tles())
+    :param epoch:                   Epoch (astropy Time) to which time since epoch is relative
+    :param max_cached_time_steps:   Maximum number of time moments of which the positions are cached
+                                    (when full, the earliest time moment is evicted first)
+
+    :return: Propagator dictionary
+    """
+    if max_cached_time_steps < 0:
+        raise ValueError("Maximum number of cached time steps cannot be negative")
+
+    # The secular rates and un-Kozai'd semi-major axis are the ones of the SGP-4 initialization
+    satrecs = list(map(satellite_ephem_to_satrec, satellites))
+    for i in range(len(satrecs)):
+        if satrecs[i].method != "n" or satrecs[i].bstar != 0.0:
+            raise ValueError("Analytic propagation is only possible for drag-free near-Earth orbits "
+                             "(satellite %d is not)" % i)
+
+    return {
+        "propagation_mode": "analytic",
+        "num_satellites": len(satellites),
+        "epoch_jd1": epoch.jd1,
+        "epoch_jd2": epoch.jd2,
+        "elements": {
+            "jdsatepoch": np.array([satrec.jdsatepoch for satrec in satrecs]),
+            "jdsatepochF": np.array([satrec.jdsatepochF for satrec in satrecs]),
+            "ecco": np.array([satrec.ecco for satrec in satrecs]),
+            "inclo": np.array([satrec.inclo for satrec in satrecs]),
+            "mo": np.array([satrec.mo for satrec in satrecs]),
+            "mdot": np.array([satrec.mdot for satrec in satrecs]),
+            "argpo": np.array([satrec.argpo for satrec in satrecs]),
+            "argpdot": np.array([satrec.argpdot for satrec in satrecs]),
+            "nodeo": np.array([satrec.nodeo for satrec in satrecs]),
+            "nodedot": np.array([satrec.nodedot for satrec in satrecs]),
+            "a": np.array([satrec.a for satrec in satrecs]),
+        },
+        "max_cached_time_steps": max_cached_time_steps,
+        "cached_positions_m": {},
+    }
+
+
+def analytic_satellite_positions_m(propagator, times_since_epoch_ns):
+    """
+    Calculate the Earth-fixed Cartesian position of all satellites at several time moments in closed form.
+
+    :param propagator:              Propagator (from create_analytic_propagator())
+    :param times_since_epoch_ns:    List of times since epoch (ns)
+
+    :return: Numpy array of shape (number of time moments, number of satellites, 3) with the (x, y, z) in meters
+    """
+    elements = propagator["elements"]
+    two_pi = 2.0 * math.pi
+
+    # WGS72 constants (same as the SGP-4 initialization)
+    radius_earth_km = 6378.135
+    xke = 60.0 / math.sqrt(radius_earth_km ** 3 / 398600.8)
+    j2 = 0.001082616
+    j3oj2 = -0.00000253881 / j2
+
+    # Time since the satellite epoch (minutes) with shape (time moments, 1), such that it broadcasts over satellites
+    fr = propagator["epoch_jd2"] + np.array(times_since_epoch_ns, dtype=np.float64) / 86400000000000.0
+    tsince = (
+        (propagator["epoch_jd1"] - elements["jdsatepoch"][np.newaxis, :]) * 1440.0
+        + (fr[:, np.newaxis] - elements["jdsatepochF"][np.newaxis, :]) * 1440.0
+    )
+
+    # Secular J2 drift (drag-free, so the semi-major axis and eccentricity remain constant)
+    mm = elements["mo"] + elements["mdot"] * tsince
+    argpm = elements["argpo"] + elements["argpdot"] * tsince
+    nodem = elements["nodeo"] + elements["nodedot"] * tsince
+    am = elements["a"]
+    em = np.maximum(elements["ecco"], 1.0e-6)
+    xlm = np.mod(mm + argpm + nodem, two_pi)
+    nodem = np.fmod(nodem, two_pi)
+    argpm = np.mod(argpm, two_pi)
+    mm = np.mod(xlm - argpm - nodem, two_pi)
+
+    # Long-period J3 periodics
+    sinio = np.sin(elements["inclo"])
+    cosio = np.cos(elements["inclo"])
+    aycof = -0.5 * j3oj2 * sinio
+    xlcof_divisor = np.where(np.abs(cosio + 1.0) > 1.5e-12, 1.0 + cosio, 1.5e-12)
+    xlcof = -0.25 * j3oj2 * sinio * (3.0 + 5.0 * cosio) / xlcof_divisor
+    axnl = em * np.cos(argpm)
+    temp = 1.0 / (am * (1.0 - em * em))
+    aynl = em * np.sin(argpm) + temp * aycof
+    xl = mm + argpm + nodem + temp * xlcof * axnl
+
+    # Kepler's equation
+    u = np.mod(xl - nodem, two_pi)
+    eo1 = u
+    for _ in range(10):
+        sineo1 = np.sin(eo1)
+        coseo1 = np.cos(eo1)
+        tem5 = (u - aynl * coseo1 + axnl * sineo1 - eo1) / (1.0 - coseo1 * axnl - sineo1 * aynl)
+        eo1 = eo1 + np.clip(tem5, -0.95, 0.95)
+    sineo1 = np.sin(eo1)
+    coseo1 = np.cos(eo1)
+
+    # Short-period J2 periodics
+    ecose = axnl * coseo1 + aynl * sineo1
+    esine = axnl * sineo1 - aynl * coseo1
+    el2 = axnl * axnl + aynl * aynl
+    pl = am * (1.0 - el2)
+    rl = am * (1.0 - ecose)
+    betal = np.sqrt(1.0 - el2)
+    temp = esine / (1.0 + betal)
+    sinu = am / rl * (sineo1 - aynl - axnl * temp)
+    cosu = am / rl * (coseo1 - axnl + aynl * temp)
+    su = np.arctan2(sinu, cosu)
+    sin2u = (cosu + cosu) * sinu
+    cos2u = 1.0 - 2.0 * sinu * sinu
+    temp1 = 0.5 * j2 / pl
+    temp2 = temp1 / pl
+    cosisq = cosio * cosio
+    mrt = rl * (1.0 - 1.5 * temp2 * betal * (3.0 * cosisq - 1.0)) + 0.5 * temp1 * (1.0 - cosisq) * cos2u
+    su = su - 0.25 * temp2 * (7.0 * cosisq - 1.0) * sin2u
+    xnode = nodem + 1.5 * temp2 * cosio * sin2u
+    xinc = elements["inclo"] + 1.5 * temp2 * cosio * sinio * cos2u
+    if np.any(mrt < 1.0):
+        raise ValueError("Analytic propagation yields a satellite below the Earth surface (decayed)")
+
+    # Position in the TEME frame (m)
+    sinsu = np.sin(su)
+    cossu = np.cos(su)
+    snod = np.sin(xnode)
+    cnod = np.cos(xnode)
+    sini = np.sin(xinc)
+    cosi = np.cos(xinc)
+    mr_m = mrt * radius_earth_km * 1000.0
+    x_teme_m = mr_m * (-snod * cosi * sinsu + cnod * cossu)
+    y_teme_m = mr_m * (cnod * cosi * sinsu + snod * cossu)
+    z_teme_m = mr_m * (sini * sinsu)
+
+    # Rotate by the Greenwich mean sidereal time to go to the Earth-fixed frame
+    theta = np.array([gstime(propagator["epoch_jd1"] + fr[i]) for i in range(len(fr))])[:, np.newaxis]
+    cos_theta = np.cos(theta)
+    sin_theta = np.sin(theta)
+    positions_m = np.empty(tsince.shape + (3,))
+    positions_m[:, :, 0] = cos_theta * x_teme_m + sin_theta * y_teme_m
+    positions_m[:, :, 1] = -sin_theta * x_teme_m + cos_theta * y_teme_m
+    positions_m[:, :, 2] = z_teme_m
+    return positions_m
+
+
+def create_ephemeris_propagator(ephemeris_positions_m, time_step_ns):
+    """
+    Create a propagator which looks up the positions of all satellites in a precomputed ephemeris table.
+
+    :param ephemeris_positions_m:   Ephemeris table (from read_ephemeris()) of shape
+                                    (number of time steps, number of satellites, 3)
+    :param time_step_ns:            Time step (ns) between subsequent entries of the ephemeris table
+
+    :return: Propagator dictionary
+    """
+    if time_step_ns <= 0:
+        raise ValueError("Time step must be positive")
+    return {
+        "propagation_mode": "ephemeris",
+        "num_satellites": ephemeris_positions_m.shape[1],
+        "time_step_ns": time_step_ns,
+        "ephemeris_positions_m": ephemeris_positions_m,
+    }
+
+
+def create_propagator_for_mode(propagation_mode, satellites, epoch, ephemeris_positions_m=None,
+                               ephemeris_time_step_ns=None):
+    """
+    Create the propagator belonging to a propagation mode.
+
+    :param propagation_mode:        Propagation mode ("ephem", "sgp4", "analytic" or "ephemeris")
+    :param satellites:              List of satellites (ephem.EarthSatellite, as read in by read_tles())
+    :param epoch:                   Epoch (astropy Time) to which time since epoch is relative
+    :param ephemeris_positions_m:   Ephemeris table (only for the "ephemeris" propagation mode)
+    :param ephemeris_time_step_ns:  Time step (ns) of the ephemeris table (only for the "ephemeris" propagation mode)
+
+    :return: Propagator dictionary, or None if each distance is calculated individually by ephem
+    """
+    if propagation_mode == "ephem":
+        return None
+    elif propagation_mode == "sgp4":
+        return create_satellite_propagator(satellites, epoch)
+    elif propagation_mode == "analytic":
+        return create_analytic_propagator(satellites, epoch)
+    elif propagation_mode == "ephemeris":
+        if ephemeris_positions_m is None or ephemeris_time_step_ns is None:
+            raise ValueError("The ephemeris propagation mode requires an ephemeris table and its time step")
+        if ephemeris_positions_m.shape[1] != len(satellites):
+            raise ValueError("Ephemeris table does not have the same number of satellites")
+        return create_ephemeris_propagator(ephemeris_positions_m, ephemeris_time_step_ns)
+    else:
+        raise ValueError("Unknown propagation mode: " + str(propagation_mode))
+
+
+def satellite_positions_m_or_none_at(propagator, time_since_epoch_ns):
+    """
+    Retrieve the Earth-fixed Cartesian position of all satellites at a time moment, if there is a propagator.
+
+    :param propagator:           Propagator (from create_propagator_for_mode()), can be None
+    :param time_since_epoch_ns:  Time since epoch (ns)
+
+    :return: Read-only numpy array of shape (number of satellites, 3), or None if there is no propagator
+    """
+    if propagator is None:
+        return None
+    return satellite_positions_m_at(propagator, time_since_epoch_ns)
+
+
+def satellite_positions_m_at(propagator, time_since_epoch_ns):
+    """
+    Retrieve the Earth-fixed Cartesian position of all satellites at a time moment.
+    It is only calculated if it is not yet in the cache of the propagator (or looked up
+    if the propagator is an ephemeris table).
+
+    :param propagator:           Propagator (from create_satellite_propagator() or create_ephemeris_propagator())
+    :param time_since_epoch_ns:  Time since epoch (ns)
+
+    :return: Read-only numpy array of shape (number of satellites, 3) with the (x, y, z) in meters
+    """
+
+    # Look-up in the ephemeris table
+    if propagator["propagation_mode"] == "ephemeris":
+        time_step_idx = time_since_epoch_ns // propagator["time_step_ns"]
+        if time_since_epoch_ns % propagator["time_step_ns"] != 0 \
+                or time_step_idx < 0 or time_step_idx >= propagator["ephemeris_positions_m"].shape[0]:
+            raise ValueError("Time %dns is not in the ephemeris table" % time_since_epoch_ns)
+        return propagator["ephemeris_positions_m"][time_step_idx]
+
+    # Cache hit
+    cached_positions_m = propagator["cached_positions_m"]
+    if time_since_epoch_ns in cached_positions_m:
+        return cached_positions_m[time_since_epoch_ns]
+
+    # Cache miss
+    positions_m = calculate_satellite_positions_m_at(propagator, time_since_epoch_ns)
+    positions_m.flags.writeable = False
+    if propagator["max_cached_time_steps"] > 0:
+        while len(cached_positions_m) >= propagator["max_cached_time_steps"]:
+            del cached_positions_m[min(cached_positions_m)]
+        cached_positions_m[time_since_epoch_ns] = positions_m
+    return positions_m
+
+
+def satellite_position_m_at(propagator, satellite_id, time_since_epoch_ns):
+    """
+    Retrieve the Earth-fixed Cartesian position of a single satellite at a time moment.
+
+    :param propagator:           Propagator (from create_satellite_propagator())
+    :param satellite_id:         Satellite identifier
+    :param time_since_epoch_ns:  Time since epoch (ns)
+
+    :return: Numpy array of (x, y, z) in meters
+    """
+    return satellite_positions_m_at(propagator, time_since_epoch_ns)[satellite_id]
+
+
+def calculate_satellite_positions_m_at(propagator, time_since_epoch_ns):
+    """
+    Calculate the Earth-fixed Cartesian position of all satellites at a time moment (without cache).
+
+    :param propagator:           Propagator (from create_satellite_propagator() or create_analytic_propagator())
+    :param time_since_epoch_ns:  Time since epoch (ns)
+
+    :return: Numpy array of shape (number of satellites, 3) with the (x, y, z) in meters
+    """
+
+    # Closed form
+    if propagator["propagation_mode"] == "analytic":
+        return analytic_satellite_positions_m(propagator, [time_since_epoch_ns])[0]
+
+    # Julian date as (whole, fraction) to retain precision
+    jd = np.array([propagator["epoch_jd1"]])
+    fr = np.array([propagator["epoch_jd2"] + time_since_epoch_ns / 86400000000000.0])
+
+    # Propagate all satellites at once (output is in km in the TEME frame)
+    error, r_teme_km, _ = propagator["satrec_array"].sgp4(jd, fr)
+    if np.any(error != 0):
+        raise ValueError(
+            "SGP-4 propagation failed for satellite(s) %s at t=%dns"
+            % (str(list(np.flatnonzero(error[:, 0]))), time_since_epoch_ns)
+        )
+    r_teme_m = r_teme_km[:, 0, :] * 1000.0
+
+    # Rotate by the Greenwich mean sidereal time to go to the Earth-fixed frame
+    theta = gstime(jd[0] + fr[0])
+    cos_theta = math.cos(theta)
+    sin_theta = math.sin(theta)
+    positions_m = np.empty(r_teme_m.shape)
+    positions_m[:, 0] = cos_theta * r_teme_m[:, 0] + sin_theta * r_teme_m[:, 1]
+    positions_m[:, 1] = -sin_theta * r_teme_m[:, 0] + cos_theta * r_teme_m[:, 1]
+    positions_m[:, 2] = r_teme_m[:, 2]
+    return positions_m
+
+
+def sub_satellite_points_degrees(satellite_positions_m):
+    """
+    Calculate the (latitude, longitude) of the satellite shadows on the Earth from their Earth-fixed
+    positions. Like the sublat of ephem, the latitude is geocentric.
+
+    :param satellite_positions_m: Numpy array of shape (..., 3) with the (x, y, z) in meters
+
+    :return: Tuple of (latitudes, longitudes) in degrees, each a numpy array of shape (...)
+    """
+    satellite_positions_m = np.asarray(satellite_positions_m)
+    x = satellite_positions_m[..., 0]
+    y = satellite_positions_m[..., 1]
+    z = satellite_positions_m[..., 2]
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def sub_satellite_points_degrees_at(propagator, satellites, epoch, times_since_epoch_ns):
+    """
+    Calculate the (latitude, longitude) of the shadows of all satellites on the Earth over a time grid.
+    With a propagator, the same satellite positions as for the distance calculations are used
+    (from its cache, or all at once if analytic). Without (ephem mode), each satellite is computed by ephem.
+
+    :param propagator:              Propagator (from create_propagator_for_mode()), can be None
+    :param satellites:              List of satellites
+    :param epoch:                   Epoch (astropy Time)
+    :param times_since_epoch_ns:    List of times since epoch (ns)
+
+    :return: Tuple of (latitudes, longitudes) in degrees, each a numpy array of shape
+             (number of times, number of satellites)
+    """
+
+    # Without propagator, ephem calculates each shadow
+    if propagator is None:
+        latitudes_degrees = np.empty((len(times_since_epoch_ns), len(satellites)))
+        longitudes_degrees = np.empty((len(times_since_epoch_ns), len(satellites)))
+        ephem_epoch = ephem_date_at(epoch, 0)
+        for i in range(len(times_since_epoch_ns)):
+            ephem_time = ephem_date_at(epoch, times_since_epoch_ns[i])
+            for j in range(len(satellites)):
+                satellites[j].compute(ephem_time, epoch=ephem_epoch)
+                latitudes_degrees[i][j] = math.degrees(satellites[j].sublat)
+                longitudes_degrees[i][j] = math.degrees(satellites[j].sublong)
+        return latitudes_degrees, longitudes_degrees
+
+    # All at once if analytic, else each time moment (likely already in the cache or ephemeris table)
+    if propagator["propagation_mode"] == "analytic":
+        satellite_positions_m = analytic_satellite_positions_m(propagator, times_since_epoch_ns)
+    else:
+        satellite_positions_m = np.empty((len(times_since_epoch_ns), propagator["num_satellites"], 3))
+        for i in range(len(times_since_epoch_ns)):
+            satellite_positions_m[i] = satellite_positions_m_at(propagator, times_since_epoch_ns[i])
+    return sub_satellite_points_degrees(satellite_positions_m)
+
+
+def ground_station_positions_m(ground_stations):
+    """
+    Retrieve the Earth-fixed Cartesian position of all ground stations.
+
+    :param ground_stations: List of ground stations (basic or extended)
+
+    :return: Numpy array of shape (number of ground stations, 3) with the (x, y, z) in meters
+    """
+    positions_m = np.empty((len(ground_stations), 3))
+    for i in range(len(ground_stations)):
+        ground_station = ground_stations[i]
+        if "cartesian_x" in ground_station:
+            positions_m[i] = (
+                ground_station["cartesian_x"],
+                ground_station["cartesian_y"],
+                ground_station["cartesian_z"]
+            )
+        else:
+            positions_m[i] = geodetic2cartesian(
+                float(ground_station["latitude_degrees_str"]),
+                float(ground_station["longitude_degrees_str"]),
+                ground_station["elevation_m_float"]
+            )
+    return positions_m
+
+
+def distances_m_between_satellites(satellite_positions_m, list_isls):
+    """
+    Calculate the straight distance of each satellite pair (e.g., all ISLs).
+
+    :param satellite_positions_m:   Satellite positions (from satellite_positions_m_at())
+    :param list_isls:               List of (a, b) satellite pairs
+
+    :return: Numpy array with the distance in meters of each pair
+    """
+    if len(list_isls) == 0:
+        return np.zeros(0)
+    pairs = np.array(list_isls, dtype=int)
+    return np.linalg.norm(satellite_positions_m[pairs[:, 0]] - satellite_positions_m[pairs[:, 1]], axis=1)
+
+
+def distances_m_ground_stations_to_satellites(ground_station_positions_m_array, satellite_positions_m):
+    """
+    Calculate the straight distance between every ground station and every satellite.
+
+    :param ground_station_positions_m_array:    Ground station positions (from ground_station_positions_m())
+    :param satellite_positions_m:               Satellite positions (from satellite_positions_m_at())
+
+    :return: Numpy array of shape (number of ground stations, number of satellites) with distances in meters
+    """
+    return np.linalg.norm(
+        ground_station_positions_m_array[:, np.newaxis, :] - satellite_positions_m[np.newaxis, :, :],
+        axis=2
+    )
+
+
+def satellites_in_range_of_ground_stations(ground_station_positions_m_array, satellite_positions_m,
+                                           max_gsl_length_m):
+    """
+    Find for every ground station the satellites which are within GSL range.
+
+    A spatial index (k-d tree) over the satellite positions is used, such that each ground
+    station only calculates the distance to the few candidate satellites near it instead of
+    to all satellites.
+
+    :param ground_station_positions_m_array:    Ground station positions (from ground_station_positions_m())
+    :param satellite_positions_m:               Satellite positions (from satellite_positions_m_at())
+    :param max_gsl_length_m:                    Maximum GSL length (m)
+
+    :return: List with for each ground station a list of (distance in meters, satellite id)
+             of the satellites in range, in ascending order of satellite id
+    """
+    if len(satellite_positions_m) == 0:
+        return [[] for _ in range(len(ground_station_positions_m_array))]
+
+    # The search radius is slightly widened, as the exact distance decides whether it is in range
+    satellite_index = cKDTree(satellite_positions_m)
+    candidates_per_ground_station = satellite_index.query_ball_point(
+        ground_station_positions_m_array, max_gsl_length_m * (1.0 + 1e-9)
+    )
+
+    return satellites_in_range_of_ground_stations_among(
+        ground_station_positions_m_array, satellite_positions_m, max_gsl_length_m, candidates_per_ground_station
+    )
+
+
+def satellites_in_range_of_ground_stations_among(ground_station_positions_m_array, satellite_positions_m,
+                                                 max_gsl_length_m, candidates_per_ground_station):
+    """
+    Find for every ground station which of its candidate satellites are within GSL range.
+
+    :param ground_station_positions_m_array:    Ground station positions (from ground_station_positions_m())
+    :param satellite_positions_m:               Satellite positions (from satellite_positions_m_at())
+    :param max_gsl_length_m:                    Maximum GSL length (m)
+    :param candidates_per_ground_station:       List with for each ground station a list of candidate satellite ids
+
+    :return: List with for each ground station a list of (distance in meters, satellite id)
+             of the satellites in range, in ascending order of satellite id
+    """
+    result = []
+    for i in range(len(ground_station_positions_m_array)):
+        candidate_sids = np.array(sorted(candidates_per_ground_station[i]), dtype=int)
+        satellites_in_range = []
+        if len(candidate_sids) > 0:
+            distances_m = np.linalg.norm(
+                ground_station_positions_m_array[i][np.newaxis, :] - satellite_positions_m[candidate_sids],
+                axis=1
+            )
+            for j in range(len(candidate_sids)):
+                if distances_m[j] <= max_gsl_length_m:
+                    satellites_in_range.append((float(distances_m[j]), int(candidate_sids[j])))
+        result.append(satellites_in_range)
+    return result
+
+
+def satellites_in_range_unchanged_for_ns(ground_station_positions_m_array, satellite_positions_m,
+                                         max_gsl_length_m):
+    """
+    Find how long the satellites in range of the ground stations stay the same at least, which is the time it
+    takes the satellite closest to the edge of the range of a ground station to reach it (at the maximum rate
+    at which the distance between a ground station and a satellite can change).
+
+    :param ground_station_positions_m_array:    Ground station positions (from ground_station_positions_m())
+    :param satellite_positions_m:               Satellite positions (from satellite_positions_m_at())
+    :param max_gsl_length_m:                    Maximum GSL length (m)
+
+    :return: Time (ns) during which no satellite can come in or go out of range of any of the ground stations
+    """
+    if len(ground_station_positions_m_array) == 0 or len(satellite_positions_m) == 0:
+        return math.inf
+    distances_m = distances_m_ground_stations_to_satellites(ground_station_positions_m_array, satellite_positions_m)
+    margin_m = np.min(np.abs(distances_m - max_gsl_length_m))
+    return int(math.floor(margin_m / MAX_GSL_LENGTH_RATE_M_PER_S * 1000.0 * 1000.0 * 1000.0))
@@ -2,5 +2,20 @@ from .helper_dynamic_state import (
     help_dynamic_state
 )
 from .generate_dynamic_state import (
-    generate_dynamic_state
+    generate_dynamic_state,
+    generate_dynamic_state_at
+)
+from .fstate_store import (
+    fstate_store_filenames,
+    fstate_at,
+    merge_fstate_store_parts,
+    read_fstate_store,
+    read_fstate_store_in_memory,
+    open_fstate_store_in_memory,
+    read_fstate_updates
+)
+from .satellite_network_graph import (
+    create_isl_graph,
+    isl_graph_at,
+    gsl_graph_at
 )
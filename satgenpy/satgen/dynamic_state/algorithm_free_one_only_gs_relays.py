@@ -32,7 +32,10 @@ def algorithm_free_one_only_gs_relays(
         num_isls_per_sat,
         list_gsl_interfaces_info,
         prev_output,
-        enable_verbose_logs
+        enable_verbose_logs,
+        incremental_shortest_paths=False,
+        fstate_store=None,
+        ground_station_pairs=None
 ):
     """
     FREE-ONE ONLY OVER GROUND STATION RELAYS ALGORITHM
@@ -62,37 +65,38 @@ def algorithm_free_one_only_gs_relays(
             raise ValueError("No satellite ISLs are permitted for this algorithm. Violated for satellite %d" % sid)
 
     # Check the graph
-    for sid in range(len(satellites)):
-        for n in sat_net_graph_only_satellites_with_isls.neighbors(sid):
-            if n < len(satellites):
-                raise ValueError("Graph cannot contain inter-satellite links")
-    for gid in range(len(ground_stations)):
-        for n in sat_net_graph_only_satellites_with_isls.neighbors(len(satellites) + gid):
-            if n >= len(satellites):
-                raise ValueError("Graph cannot contain inter-ground-station links")
+    adjacency = sat_net_graph_only_satellites_with_isls["adjacency"]
+    edge_from_satellite = np.repeat(np.arange(adjacency.shape[0]), np.diff(adjacency.indptr)) < len(satellites)
+    edge_to_satellite = adjacency.indices < len(satellites)
+    if np.any(edge_from_satellite & edge_to_satellite):
+        raise ValueError("Graph cannot contain inter-satellite links")
+    if np.any(~edge_from_satellite & ~edge_to_satellite):
+        raise ValueError("Graph cannot contain inter-ground-station links")
 
     #################################
     # BANDWIDTH STATE
     #
 
     # There is only one GSL interface for each node (pre-condition), which as-such will get the entire bandwidth
-    output_filename = output_dynamic_state_dir + "/gsl_if_bandwidth_" + str(time_since_epoch_ns) + ".txt"
-    if enable_verbose_logs:
-        print("  > Writing interface bandwidth state to: " + output_filename)
-    with open(output_filename, "w+") as f_out:
-        if time_since_epoch_ns == 0:
-            for node_id in range(len(satellites)):
-                f_out.write("%d,%d,%f\n" % (
-                    node_id,
-                    num_isls_per_sat[node_id],
-                    list_gsl_interfaces_info[node_id]["aggregate_max_bandwidth"]
-                ))
-            for node_id in range(len(satellites), len(satellites) + len(ground_stations)):
-                f_out.write("%d,%d,%f\n" % (
-                    node_id,
-                    0,
-                    list_gsl_interfaces_info[node_id]["aggregate_max_bandwidth"]
-                ))
+    # Only written if there is an output directory (else, it is kept in memory only)
+    if output_dynamic_state_dir is not None:
+        output_filename = output_dynamic_state_dir + "/gsl_if_bandwidth_" + str(time_since_epoch_ns) + ".txt"
+        if enable_verbose_logs:
+            print("  > Writing interface bandwidth state to: " + output_filename)
+        with open(output_filename, "w+") as f_out:
+            if time_since_epoch_ns == 0:
+                for node_id in range(len(satellites)):
+                    f_out.write("%d,%d,%f\n" % (
+                        node_id,
+                        num_isls_per_sat[node_id],
+                        list_gsl_interfaces_info[node_id]["aggregate_max_bandwidth"]
+                    ))
+                for node_id in range(len(satellites), len(satellites) + len(ground_stations)):
+                    f_out.write("%d,%d,%f\n" % (
+                        node_id,
+                        0,
+                        list_gsl_interfaces_info[node_id]["aggregate_max_bandwidth"]
+                    ))
 
     #################################
     # FORWARDING STATE
@@ -103,6 +107,13 @@ def algorithm_free_one_only_gs_relays(
     if prev_output is not None:
         prev_fstate = prev_output["fstate"]
 
+    # Shortest path trees of the previous time step (to only repair them)
+    shortest_paths = None
+    if incremental_shortest_paths:
+        shortest_paths = {}
+        if prev_output is not None:
+            shortest_paths = prev_output["shortest_paths"]
+
     # GID to satellite GSL interface index
     gid_to_sat_gsl_if_idx = [0] * len(ground_stations)  # (Only one GSL interface per satellite, so the first)
 
@@ -117,12 +128,16 @@ def algorithm_free_one_only_gs_relays(
         gid_to_sat_gsl_if_idx,
         {},
         prev_fstate,
-        enable_verbose_logs
+        enable_verbose_logs,
+        shortest_paths,
+        fstate_store,
+        ground_station_pairs
     )
 
     if enable_verbose_logs:
         print("")
 
     return {
-        "fstate": fstate
+        "fstate": fstate,
+        "shortest_paths": shortest_paths
     }
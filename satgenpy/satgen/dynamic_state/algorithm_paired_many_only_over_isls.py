@@ -34,7 +34,10 @@ def algorithm_paired_many_only_over_isls(
         sat_neighbor_to_if,
         list_gsl_interfaces_info,
         prev_output,
-        enable_verbose_logs
+        enable_verbose_logs,
+        incremental_shortest_paths=False,
+        fstate_store=None,
+        ground_station_pairs=None
 ):
     """
     PAIRED-MANY ONLY OVER INTER-SATELLITE LINKS ALGORITHM
@@ -56,13 +59,14 @@ def algorithm_paired_many_only_over_isls(
 
     print("\nALGORITHM: PAIRED MANY ONLY OVER ISLS")
 
-    # Check the graph
-    if sat_net_graph_without_gs.number_of_nodes() != len(satellites):
+    # Check the graph (which can also be given as a networkx graph)
+    sat_net_graph_without_gs = graph_of(
+        sat_net_graph_without_gs, len(satellites), sat_neighbor_to_if
+    )
+    if sat_net_graph_without_gs["num_nodes"] != len(satellites):
         raise ValueError("Number of nodes in the graph does not match the number of satellites")
-    for sid in range(len(satellites)):
-        for n in sat_net_graph_without_gs.neighbors(sid):
-            if n >= len(satellites):
-                raise ValueError("Graph cannot contain satellite-to-ground-station links")
+    if np.any(sat_net_graph_without_gs["adjacency"].indices >= len(satellites)):
+        raise ValueError("Graph cannot contain satellite-to-ground-station links")
 
     # This algorithm only works:
     # (a) if the # of interfaces of satellites is exactly <number of ground stations>
@@ -159,22 +163,11 @@ def algorithm_paired_many_only_over_isls(
     if prev_output is not None:
         prev_gsl_if_bandwidth_state = prev_output["gsl_if_bandwidth_state"]
 
-    output_filename = output_dynamic_state_dir + "/gsl_if_bandwidth_" + str(time_since_epoch_ns) + ".txt"
-    print("  > Writing interface bandwidth state to: " + output_filename)
-    with open(output_filename, "w+") as f_out:
-        for (node_id, if_id) in gsl_if_bandwidth_state:
-
-            # Only delta if have previous bandwidth state
-            if (
-                    prev_gsl_if_bandwidth_state is None
-                    or
-                    prev_gsl_if_bandwidth_state[(node_id, if_id)] != gsl_if_bandwidth_state[(node_id, if_id)]
-            ):
-                f_out.write("%d,%d,%f\n" % (
-                    node_id,
-                    if_id,
-                    gsl_if_bandwidth_state[(node_id, if_id)]
-                ))
+    # Only written if there is an output directory (else, it is kept in memory only)
+    if output_dynamic_state_dir is not None:
+        write_gsl_if_bandwidth_updates(
+            output_dynamic_state_dir, time_since_epoch_ns, gsl_if_bandwidth_state, prev_gsl_if_bandwidth_state
+        )
 
     #################################
 
@@ -185,6 +178,13 @@ def algorithm_paired_many_only_over_isls(
     if prev_output is not None:
         prev_fstate = prev_output["fstate"]
 
+    # Shortest path trees of the previous time step (to only repair them)
+    shortest_paths = None
+    if incremental_shortest_paths:
+        shortest_paths = {}
+        if prev_output is not None:
+            shortest_paths = prev_output["shortest_paths"]
+
     # GID to satellite GSL interface index
     # Each ground station has a GSL interface on every
     # satellite allocated only for itself
@@ -202,12 +202,45 @@ def algorithm_paired_many_only_over_isls(
         ground_station_satellites_in_range_select_one_at_most,
         sat_neighbor_to_if,
         prev_fstate,
-        enable_verbose_logs
+        enable_verbose_logs,
+        shortest_paths,
+        fstate_store,
+        ground_station_pairs
     )
 
     print("")
 
     return {
         "fstate": fstate,
-        "gsl_if_bandwidth_state": gsl_if_bandwidth_state
+        "gsl_if_bandwidth_state": gsl_if_bandwidth_state,
+        "shortest_paths": shortest_paths
     }
+
+
+def write_gsl_if_bandwidth_updates(output_dynamic_state_dir, time_since_epoch_ns, gsl_if_bandwidth_state,
+                                   prev_gsl_if_bandwidth_state):
+    """
+    Write the GSL interface bandwidth state of a time step to the gsl_if_bandwidth_<t>.txt file,
+    only the interfaces of which the bandwidth changed if there is a previous bandwidth state.
+
+    :param output_dynamic_state_dir:        Dynamic state directory
+    :param time_since_epoch_ns:             Time since epoch (ns)
+    :param gsl_if_bandwidth_state:          Dictionary of (node, interface) to bandwidth
+    :param prev_gsl_if_bandwidth_state:     Previous GSL interface bandwidth state (None if there is none)
+    """
+    output_filename = output_dynamic_state_dir + "/gsl_if_bandwidth_" + str(time_since_epoch_ns) + ".txt"
+    print("  > Writing interface bandwidth state to: " + output_filename)
+    with open(output_filename, "w+") as f_out:
+        for (node_id, if_id) in gsl_if_bandwidth_state:
+
+            # Only delta if have previous bandwidth state
+            if (
+                    prev_gsl_if_bandwidth_state is None
+                    or
+                    prev_gsl_if_bandwidth_state[(node_id, if_id)] != gsl_if_bandwidth_state[(node_id, if_id)]
+            ):
+                f_out.write("%d,%d,%f\n" % (
+                    node_id,
+                    if_id,
+                    gsl_if_bandwidth_state[(node_id, if_id)]
+                ))
@@ -1,5 +1,283 @@
 import math
-import networkx as nx
+import numpy as np
+from collections.abc import Mapping
+from scipy.sparse.csgraph import dijkstra
+from .fstate_store import write_fstate_updates
+from .satellite_network_graph import graph_of
+
+# Next-hop decision entry which is not part of the forwarding state
+FSTATE_ABSENT = -2
+
+
+class ForwardingState(Mapping):
+    """
+    Forwarding state of a time step, as an int32 array of shape (number of nodes, number of ground stations, 3)
+    with for each current node and destination ground station the next-hop decision (next-hop node, outgoing
+    interface, next-hop incoming interface), which is FSTATE_ABSENT for entries not part of the forwarding state.
+    It can be read as a dictionary of (current node, destination ground station node) to the next-hop decision.
+    """
+
+    def __init__(self, num_satellites, array):
+        self.num_satellites = num_satellites
+        self.array = array
+
+    def __getitem__(self, key):
+        (curr, dst) = key
+        dst_gid = dst - self.num_satellites
+        if (
+                not 0 <= curr < self.array.shape[0]
+                or not 0 <= dst_gid < self.array.shape[1]
+                or self.array[curr, dst_gid, 0] == FSTATE_ABSENT
+        ):
+            raise KeyError(key)
+        return tuple(self.array[curr, dst_gid].tolist())
+
+    def __iter__(self):
+        curr, dst_gid = np.nonzero(self.array[:, :, 0] != FSTATE_ABSENT)
+        return zip(curr.tolist(), (dst_gid + self.num_satellites).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.array[:, :, 0] != FSTATE_ABSENT))
+
+
+def empty_fstate_array(num_satellites, num_ground_stations):
+    """
+    Forwarding state array (see ForwardingState) without any entry.
+
+    :param num_satellites:          Number of satellites
+    :param num_ground_stations:     Number of ground stations
+
+    :return: Numpy int32 array of shape (num_satellites + num_ground_stations, num_ground_stations, 3)
+    """
+    return np.full((num_satellites + num_ground_stations, num_ground_stations, 3), FSTATE_ABSENT, dtype=np.int32)
+
+
+def fstate_updates_between(prev_fstate, fstate):
+    """
+    Forwarding state updates with respect to the previous forwarding state, which are the entries of which
+    the next-hop decision changed (in order of current node, and then destination).
+
+    :param prev_fstate:     Previous forwarding state (ForwardingState), if None, all entries are updates
+    :param fstate:          Forwarding state (ForwardingState)
+
+    :return: Numpy int32 array of shape (number of updates, 5) with each update record
+             (current, destination, next_hop, outgoing_if, incoming_if)
+    """
+    changed = fstate.array[:, :, 0] != FSTATE_ABSENT
+    if prev_fstate is not None:
+        changed &= np.any(fstate.array != prev_fstate.array, axis=2)
+    curr, dst_gid = np.nonzero(changed)
+    return np.column_stack((curr, dst_gid + fstate.num_satellites, fstate.array[curr, dst_gid])).astype(np.int32)
+
+
+def sparse_adjacency(graph, num_nodes):
+    """
+    Sparse adjacency matrix (CSR with sorted indices) with the edge weights of a graph.
+
+    :param graph:       Graph dictionary (see satellite_network_graph), or undirected networkx graph
+                        with nodes 0 to (num_nodes - 1) with "weight" on each edge
+    :param num_nodes:   Number of nodes
+
+    :return: Sparse adjacency matrix
+    """
+    return graph_of(graph, num_nodes)["adjacency"]
+
+
+def shortest_path_distances_from(graph, num_nodes, sources):
+    """
+    Calculate the shortest path distance from each of the source nodes to every node of the
+    (undirected) graph, using Dijkstra's algorithm on its sparse adjacency matrix.
+
+    :param graph:       Undirected graph with nodes 0 to (num_nodes - 1) (see sparse_adjacency())
+    :param num_nodes:   Number of nodes
+    :param sources:     List of source node identifiers
+
+    :return: Numpy array of shape (number of sources, num_nodes) with the distance to every node (inf if unreachable)
+    """
+    if len(sources) == 0:
+        return np.empty((0, num_nodes))
+    adjacency = sparse_adjacency(graph, num_nodes)
+    return dijkstra(adjacency, directed=True, indices=sources)
+
+
+def shortest_path_tree_levels(adjacency, predecessors):
+    """
+    Group the edges of shortest path trees by the depth (number of hops from the source)
+    of the node they lead to, which is found by repeatedly doubling the ancestor each node points to.
+
+    :param adjacency:       Sparse adjacency matrix (CSR with sorted indices) with the edge weights
+    :param predecessors:    Numpy array of shape (number of trees, number of nodes) with the predecessor
+                            of each node in each tree (negative for the source and unreachable nodes)
+
+    :return: List with for each depth (starting at 1) a tuple of numpy arrays of its edges:
+             (tree index, node, parent node, index of the edge weight in adjacency.data)
+    """
+    num_nodes = predecessors.shape[1]
+    in_tree = predecessors >= 0
+    depths = in_tree.astype(int).ravel()
+    ancestors = np.where(
+        in_tree, predecessors + num_nodes * np.arange(predecessors.shape[0])[:, np.newaxis], -1
+    ).ravel()
+    while True:
+        has_ancestor = np.flatnonzero(ancestors >= 0)
+        if len(has_ancestor) == 0:
+            break
+        depths[has_ancestor] += depths[ancestors[has_ancestor]]
+        ancestors[has_ancestor] = ancestors[ancestors[has_ancestor]]
+
+    # Edges sorted by depth, with the position of their weight
+    flat_order = np.flatnonzero(in_tree)
+    flat_order = flat_order[np.argsort(depths[flat_order], kind="stable")]
+    level_ends = np.searchsorted(depths[flat_order], np.arange(1, depths.max(initial=0) + 1), side="right")
+    trees, nodes = np.divmod(flat_order, num_nodes)
+    parents = predecessors.ravel()[flat_order]
+    edge_keys = np.repeat(np.arange(num_nodes), np.diff(adjacency.indptr)) * num_nodes + adjacency.indices
+    weight_positions = np.searchsorted(edge_keys, parents * num_nodes + nodes)
+
+    levels = []
+    level_start = 0
+    for level_end in level_ends:
+        level = slice(level_start, level_end)
+        levels.append((trees[level], nodes[level], parents[level], weight_positions[level]))
+        level_start = level_end
+    return levels
+
+
+def shortest_path_tree_distances(adjacency, sources, levels):
+    """
+    Calculate the distance from the source to every node along each tree, in the same
+    order of additions as Dijkstra's algorithm such that the distances are exactly equal.
+
+    :param adjacency:   Sparse adjacency matrix (CSR with sorted indices) with the edge weights
+    :param sources:     Numpy array with the source node identifier of each tree
+    :param levels:      Edges of the trees grouped by depth (see shortest_path_tree_levels())
+
+    :return: Numpy array of shape (number of trees, number of nodes) with the distance to every node
+             (inf if not in the tree)
+    """
+    num_nodes = adjacency.shape[0]
+    distances = np.full((len(sources), num_nodes), math.inf)
+    distances[np.arange(len(sources)), sources] = 0.0
+    distances = distances.ravel()
+
+    # A node at a depth is reached from its parent one depth lower
+    for trees, nodes, parents, weight_positions in levels:
+        distances[trees * num_nodes + nodes] = distances[trees * num_nodes + parents] + adjacency.data[weight_positions]
+
+    return distances.reshape((len(sources), num_nodes))
+
+
+def shortest_path_distances_from_incremental(graph, num_nodes, sources, shortest_paths):
+    """
+    Calculate the same distances as shortest_path_distances_from(), but re-use the shortest path
+    trees of the previous time step. As long as the set of edges is the same, the distances along
+    each previous tree are re-calculated with the current edge weights. If no edge can shorten any of
+    them, the tree is still a shortest path tree. Dijkstra's algorithm is only run for the sources whose
+    tree is not, and for new sources. If the set of edges changed, all of them are calculated again.
+
+    :param graph:           Undirected graph with nodes 0 to (num_nodes - 1) (see sparse_adjacency())
+    :param num_nodes:       Number of nodes
+    :param sources:         List of source node identifiers
+    :param shortest_paths:  Dictionary with the shortest path trees of the previous time step
+                            (empty if there is none), which is updated to the ones of this time step
+
+    :return: Numpy array of shape (number of sources, num_nodes) with the distance to every node (inf if unreachable)
+    """
+    adjacency = sparse_adjacency(graph, num_nodes)
+    sources = np.array(sources, dtype=int)
+    distances = np.full((len(sources), num_nodes), math.inf)
+    predecessors = np.full((len(sources), num_nodes), -1)
+    levels = []
+    recalculate = np.ones(len(sources), dtype=bool)
+
+    # Repair the trees of the sources which were there before, if the edges are the same (and have a positive
+    # weight, as else the distances along a tree are not necessarily the same as calculated by Dijkstra's)
+    if (
+            len(shortest_paths) > 0
+            and np.array_equal(shortest_paths["indptr"], adjacency.indptr)
+            and np.array_equal(shortest_paths["indices"], adjacency.indices)
+            and np.all(adjacency.data > 0)
+    ):
+        prev_rows = np.array([shortest_paths["source_row"].get(node_id, -1) for node_id in sources.tolist()], dtype=int)
+        rows = np.flatnonzero(prev_rows >= 0)
+        if len(rows) > 0:
+            predecessors[rows] = shortest_paths["predecessors"][prev_rows[rows]]
+            row_of_prev_row = np.full(len(shortest_paths["source_row"]), -1)
+            row_of_prev_row[prev_rows[rows]] = rows
+            prev_levels = shortest_paths["levels"]
+            if prev_levels is None:
+                prev_levels = shortest_path_tree_levels(adjacency, shortest_paths["predecessors"])
+            for trees, nodes, parents, weight_positions in prev_levels:
+                trees = row_of_prev_row[trees]
+                kept = trees >= 0
+                levels.append((trees[kept], nodes[kept], parents[kept], weight_positions[kept]))
+            distances = shortest_path_tree_distances(adjacency, sources, levels)
+
+            # Any edge which still shortens the distance to a node means the tree must be calculated again
+            edges = adjacency.tocoo()
+            shortened = np.any(distances[rows][:, edges.row] + edges.data < distances[rows][:, edges.col], axis=1)
+            recalculate[rows[~shortened]] = False
+
+    # Dijkstra's algorithm for the others
+    rows = np.flatnonzero(recalculate)
+    if len(rows) > 0:
+        distances[rows], predecessors[rows] = dijkstra(
+            adjacency, directed=True, indices=sources[rows], return_predecessors=True
+        )
+
+    # Levels of the trees, which are only determined when they are re-used (if all were calculated again)
+    if len(rows) == len(sources):
+        levels = None
+    elif len(rows) > 0:
+        new_levels = shortest_path_tree_levels(adjacency, predecessors[rows])
+        for depth in range(max(len(levels), len(new_levels))):
+            if depth < len(levels):
+                kept = ~recalculate[levels[depth][0]]
+                level = tuple(edge_property[kept] for edge_property in levels[depth])
+            else:
+                level = (np.empty(0, dtype=int),) * 4
+            if depth < len(new_levels):
+                new_level = (rows[new_levels[depth][0]],) + new_levels[depth][1:]
+                level = tuple(np.concatenate(edge_properties) for edge_properties in zip(level, new_level))
+            if depth < len(levels):
+                levels[depth] = level
+            else:
+                levels.append(level)
+
+    # Keep the trees for the next time step
+    shortest_paths["indptr"] = adjacency.indptr
+    shortest_paths["indices"] = adjacency.indices
+    shortest_paths["source_row"] = dict(zip(sources.tolist(), range(len(sources))))
+    shortest_paths["predecessors"] = predecessors
+    shortest_paths["levels"] = levels
+
+    return distances
+
+
+def ground_station_pair_gids(num_satellites, num_ground_stations, ground_station_pairs=None):
+    """
+    Ground station pairs of which the forwarding state is calculated.
+
+    :param num_satellites:          Number of satellites
+    :param num_ground_stations:     Number of ground stations
+    :param ground_station_pairs:    List of (source, destination) ground station node identifiers,
+                                    if None, all pairs of different ground stations
+
+    :return: Tuple of (sorted list of (source, destination) ground station identifier pairs,
+             sorted list of destination ground station identifiers)
+    """
+    if ground_station_pairs is None:
+        return [
+            (src_gid, dst_gid)
+            for src_gid in range(num_ground_stations)
+            for dst_gid in range(num_ground_stations)
+            if src_gid != dst_gid
+        ], list(range(num_ground_stations))
+    src_dst_gids = sorted(set(
+        (src_node_id - num_satellites, dst_node_id - num_satellites)
+        for (src_node_id, dst_node_id) in ground_station_pairs
+    ))
+    return src_dst_gids, sorted(set(dst_gid for (_, dst_gid) in src_dst_gids))
 
 
 def calculate_fstate_shortest_path_without_gs_relaying(
@@ -13,141 +291,146 @@ def calculate_fstate_shortest_path_without_gs_relaying(
         ground_station_satellites_in_range_candidates,
         sat_neighbor_to_if,
         prev_fstate,
-        enable_verbose_logs
+        enable_verbose_logs,
+        shortest_paths=None,
+        fstate_store=None,
+        ground_station_pairs=None
 ):
 
-    # Calculate shortest path distances
+    # Calculate shortest path distances, only to the satellites which are in range of a ground station
+    # (the graph is undirected, so the distance to it is the same as the distance from it),
+    # repairing the shortest path trees of the previous time step if they are kept in shortest_paths
     if enable_verbose_logs:
-        print("  > Calculating Floyd-Warshall for graph without ground-station relays")
-    # (Note: Numpy has a deprecation warning here because of how networkx uses matrices)
-    dist_sat_net_without_gs = nx.floyd_warshall_numpy(sat_net_graph_only_satellites_with_isls)
+        print("  > Calculating Dijkstra for graph without ground-station relays")
+    sat_net_graph_only_satellites_with_isls = graph_of(
+        sat_net_graph_only_satellites_with_isls, num_satellites, sat_neighbor_to_if
+    )
+    src_dst_gids, dst_gids = ground_station_pair_gids(num_satellites, num_ground_stations, ground_station_pairs)
+    dst_sats = sorted(set(
+        b[1] for dst_gid in dst_gids for b in ground_station_satellites_in_range_candidates[dst_gid]
+    ))
+
+    # Row of each destination satellite, with an additional row and column of infinity for padding
+    dst_sat_row = np.full(num_satellites, len(dst_sats))
+    dst_sat_row[dst_sats] = np.arange(len(dst_sats))
+    dist_to_dst_sat = np.full((len(dst_sats) + 1, num_satellites + 1), math.inf)
+    if shortest_paths is None:
+        dist_to_dst_sat[:len(dst_sats), :num_satellites] = shortest_path_distances_from(
+            sat_net_graph_only_satellites_with_isls, num_satellites, dst_sats
+        )
+    else:
+        dist_to_dst_sat[:len(dst_sats), :num_satellites] = shortest_path_distances_from_incremental(
+            sat_net_graph_only_satellites_with_isls, num_satellites, dst_sats, shortest_paths
+        )
+
+    # Neighbors (in the order of the graph) and the interfaces to them
+    neighbor_ids = sat_net_graph_only_satellites_with_isls["neighbor_ids"]
+    neighbor_weights = sat_net_graph_only_satellites_with_isls["neighbor_weights"]
+    neighbor_my_if = sat_net_graph_only_satellites_with_isls["neighbor_my_if"]
+    neighbor_next_hop_if = sat_net_graph_only_satellites_with_isls["neighbor_next_hop_if"]
+
+    # Satellites to ground stations
+    # From the satellites attached to the destination ground station,
+    # select the one which promises the shortest path to the destination ground station (getting there + last hop)
+    all_sats = np.arange(num_satellites)
+    num_isls_per_sat_array = np.array(num_isls_per_sat)
+    dist_satellite_to_ground_station = np.full((num_ground_stations, num_satellites), math.inf)
+    next_hop_decisions = np.full((num_ground_stations, 3, num_satellites), -1)
+    for dst_gid in dst_gids:
+        dst_gs_node_id = num_satellites + dst_gid
+
+        # Among the satellites in range of the destination ground station, find for each satellite
+        # the one which promises the shortest distance (at equal distance, the lowest satellite identifier)
+        possible_dst_sats = sorted(ground_station_satellites_in_range_candidates[dst_gid], key=lambda b: b[1])
+        if len(possible_dst_sats) == 0:
+            continue
+        possible_dst_sat_ids = np.array([b[1] for b in possible_dst_sats])
+        dist_via_dst_sat = (
+            dist_to_dst_sat[dst_sat_row[possible_dst_sat_ids], :num_satellites]
+            +
+            np.array([b[0] for b in possible_dst_sats])[:, np.newaxis]
+        )
+        best_idx = np.argmin(dist_via_dst_sat, axis=0)
+        dst_sat = possible_dst_sat_ids[best_idx]
+
+        # In any case, save the distance of the satellite to the ground station to re-use
+        # when we calculate ground station to ground station forwarding
+        dist_satellite_to_ground_station[dst_gid] = dist_via_dst_sat[best_idx, all_sats]
+        reachable = ~np.isinf(dist_satellite_to_ground_station[dst_gid])
+
+        # If the current node is not that satellite, among its neighbors, find the one which
+        # promises the lowest distance to reach the destination satellite (at equal distance, the first)
+        best_neighbor_idx = np.argmin(
+            neighbor_weights + dist_to_dst_sat[dst_sat_row[dst_sat][:, np.newaxis], neighbor_ids],
+            axis=1
+        )
+        next_hop_decisions[dst_gid][0] = neighbor_ids[all_sats, best_neighbor_idx]
+        next_hop_decisions[dst_gid][1] = neighbor_my_if[all_sats, best_neighbor_idx]
+        next_hop_decisions[dst_gid][2] = neighbor_next_hop_if[all_sats, best_neighbor_idx]
+
+        # If it is the destination satellite, the next hop is the ground station itself
+        at_dst_sat = dst_sat == all_sats
+        next_hop_decisions[dst_gid][0][at_dst_sat] = dst_gs_node_id
+        next_hop_decisions[dst_gid][1][at_dst_sat] = (
+            num_isls_per_sat_array[at_dst_sat] + gid_to_sat_gsl_if_idx[dst_gid]
+        )
+        next_hop_decisions[dst_gid][2][at_dst_sat] = 0
+
+        # By default, if there is no satellite in range for the
+        # destination ground station, it will be dropped (indicated by -1)
+        next_hop_decisions[dst_gid][:, ~reachable] = -1
+
+    # Ground stations to ground stations
+    # For each pair, choose the source satellite which promises the shortest path, which is a min-plus
+    # product of the distance of the source ground station to the satellites in its range and the
+    # distance of those satellites to the destination ground station (at equal distance, the lowest
+    # satellite identifier is chosen)
+    all_gids = np.arange(num_ground_stations)
+    src_sat_decisions = np.full((num_ground_stations, num_ground_stations), -1)
+    for src_gid in sorted(set(src_gid for (src_gid, _) in src_dst_gids)):
+        possible_src_sats = sorted(ground_station_satellites_in_range_candidates[src_gid], key=lambda a: a[1])
+        if len(possible_src_sats) == 0:
+            continue
+        possible_src_sat_ids = np.array([a[1] for a in possible_src_sats])
+        dist_via_src_sat = (
+            np.array([a[0] for a in possible_src_sats])[:, np.newaxis]
+            +
+            dist_satellite_to_ground_station[:, possible_src_sat_ids].T
+        )
+        best_idx = np.argmin(dist_via_src_sat, axis=0)
+        reachable = ~np.isinf(dist_via_src_sat[best_idx, all_gids])
+        src_sat_decisions[src_gid][reachable] = possible_src_sat_ids[best_idx[reachable]]
 
     # Forwarding state
-    fstate = {}
-
-    # Now write state to file for complete graph
-    output_filename = output_dynamic_state_dir + "/fstate_" + str(time_since_epoch_ns) + ".txt"
-    if enable_verbose_logs:
-        print("  > Writing forwarding state to: " + output_filename)
-    with open(output_filename, "w+") as f_out:
-
-        # Satellites to ground stations
-        # From the satellites attached to the destination ground station,
-        # select the one which promises the shortest path to the destination ground station (getting there + last hop)
-        dist_satellite_to_ground_station = {}
-        for curr in range(num_satellites):
-            for dst_gid in range(num_ground_stations):
-                dst_gs_node_id = num_satellites + dst_gid
-
-                # Among the satellites in range of the destination ground station,
-                # find the one which promises the shortest distance
-                possible_dst_sats = ground_station_satellites_in_range_candidates[dst_gid]
-                possibilities = []
-                for b in possible_dst_sats:
-                    if not math.isinf(dist_sat_net_without_gs[(curr, b[1])]):  # Must be reachable
-                        possibilities.append(
-                            (
-                                dist_sat_net_without_gs[(curr, b[1])] + b[0],
-                                b[1]
-                            )
-                        )
-                possibilities = list(sorted(possibilities))
-
-                # By default, if there is no satellite in range for the
-                # destination ground station, it will be dropped (indicated by -1)
-                next_hop_decision = (-1, -1, -1)
-                distance_to_ground_station_m = float("inf")
-                if len(possibilities) > 0:
-                    dst_sat = possibilities[0][1]
-                    distance_to_ground_station_m = possibilities[0][0]
-
-                    # If the current node is not that satellite, determine how to get to the satellite
-                    if curr != dst_sat:
-
-                        # Among its neighbors, find the one which promises the
-                        # lowest distance to reach the destination satellite
-                        best_distance_m = 1000000000000000
-                        for neighbor_id in sat_net_graph_only_satellites_with_isls.neighbors(curr):
-                            distance_m = (
-                                    sat_net_graph_only_satellites_with_isls.edges[(curr, neighbor_id)]["weight"]
-                                    +
-                                    dist_sat_net_without_gs[(neighbor_id, dst_sat)]
-                            )
-                            if distance_m < best_distance_m:
-                                next_hop_decision = (
-                                    neighbor_id,
-                                    sat_neighbor_to_if[(curr, neighbor_id)],
-                                    sat_neighbor_to_if[(neighbor_id, curr)]
-                                )
-                                best_distance_m = distance_m
-
-                    else:
-                        # This is the destination satellite, as such the next hop is the ground station itself
-                        next_hop_decision = (
-                            dst_gs_node_id,
-                            num_isls_per_sat[dst_sat] + gid_to_sat_gsl_if_idx[dst_gid],
-                            0
-                        )
-
-                # In any case, save the distance of the satellite to the ground station to re-use
-                # when we calculate ground station to ground station forwarding
-                dist_satellite_to_ground_station[(curr, dst_gs_node_id)] = distance_to_ground_station_m
-
-                # Write to forwarding state
-                if not prev_fstate or prev_fstate[(curr, dst_gs_node_id)] != next_hop_decision:
-                    f_out.write("%d,%d,%d,%d,%d\n" % (
-                        curr,
-                        dst_gs_node_id,
-                        next_hop_decision[0],
-                        next_hop_decision[1],
-                        next_hop_decision[2]
-                    ))
-                fstate[(curr, dst_gs_node_id)] = next_hop_decision
-
-        # Ground stations to ground stations
-        # Choose the source satellite which promises the shortest path
-        for src_gid in range(num_ground_stations):
-            for dst_gid in range(num_ground_stations):
-                if src_gid != dst_gid:
-                    src_gs_node_id = num_satellites + src_gid
-                    dst_gs_node_id = num_satellites + dst_gid
-
-                    # Among the satellites in range of the source ground station,
-                    # find the one which promises the shortest distance
-                    possible_src_sats = ground_station_satellites_in_range_candidates[src_gid]
-                    possibilities = []
-                    for a in possible_src_sats:
-                        best_distance_offered_m = dist_satellite_to_ground_station[(a[1], dst_gs_node_id)]
-                        if not math.isinf(best_distance_offered_m):
-                            possibilities.append(
-                                (
-                                    a[0] + best_distance_offered_m,
-                                    a[1]
-                                )
-                            )
-                    possibilities = sorted(possibilities)
-
-                    # By default, if there is no satellite in range for one of the
-                    # ground stations, it will be dropped (indicated by -1)
-                    next_hop_decision = (-1, -1, -1)
-                    if len(possibilities) > 0:
-                        src_sat_id = possibilities[0][1]
-                        next_hop_decision = (
-                            src_sat_id,
-                            0,
-                            num_isls_per_sat[src_sat_id] + gid_to_sat_gsl_if_idx[src_gid]
-                        )
-
-                    # Update forwarding state
-                    if not prev_fstate or prev_fstate[(src_gs_node_id, dst_gs_node_id)] != next_hop_decision:
-                        f_out.write("%d,%d,%d,%d,%d\n" % (
-                            src_gs_node_id,
-                            dst_gs_node_id,
-                            next_hop_decision[0],
-                            next_hop_decision[1],
-                            next_hop_decision[2]
-                        ))
-                    fstate[(src_gs_node_id, dst_gs_node_id)] = next_hop_decision
+    fstate_array = empty_fstate_array(num_satellites, num_ground_stations)
+
+    # Satellites to ground stations
+    fstate_array[:num_satellites, dst_gids] = next_hop_decisions[dst_gids].transpose((2, 0, 1))
+
+    # Ground stations to ground stations
+    # By default, if there is no satellite in range for one of the
+    # ground stations, it will be dropped (indicated by -1)
+    pair_src_gids = np.array([src_gid for (src_gid, _) in src_dst_gids], dtype=int)
+    pair_dst_gids = np.array([dst_gid for (_, dst_gid) in src_dst_gids], dtype=int)
+    src_sat_ids = src_sat_decisions[pair_src_gids, pair_dst_gids]
+    reachable = src_sat_ids != -1
+    fstate_array[num_satellites + pair_src_gids, pair_dst_gids] = -1
+    fstate_array[num_satellites + pair_src_gids[reachable], pair_dst_gids[reachable]] = np.column_stack((
+        src_sat_ids[reachable],
+        np.zeros(np.count_nonzero(reachable), dtype=int),
+        np.array(num_isls_per_sat, dtype=int)[src_sat_ids[reachable]]
+        + np.array(gid_to_sat_gsl_if_idx, dtype=int)[pair_src_gids[reachable]]
+    ))
+    fstate = ForwardingState(num_satellites, fstate_array)
+
+    # Updates with respect to the previous forwarding state
+    fstate_updates = fstate_updates_between(prev_fstate, fstate)
+
+    # Now write the updates to file (or the binary store) for complete graph
+    write_fstate_updates(
+        output_dynamic_state_dir, time_since_epoch_ns, fstate_updates, enable_verbose_logs, fstate_store,
+        prev_fstate is None
+    )
 
     # Finally return result
     return fstate
@@ -163,99 +446,117 @@ def calculate_fstate_shortest_path_with_gs_relaying(
         gid_to_sat_gsl_if_idx,
         sat_neighbor_to_if,
         prev_fstate,
-        enable_verbose_logs
+        enable_verbose_logs,
+        shortest_paths=None,
+        fstate_store=None,
+        ground_station_pairs=None
 ):
 
-    # Calculate shortest paths
+    # Calculate shortest path distances, only to the ground stations
+    # (the graph is undirected, so the distance to it is the same as the distance from it),
+    # repairing the shortest path trees of the previous time step if they are kept in shortest_paths
     if enable_verbose_logs:
-        print("  > Calculating Floyd-Warshall for graph including ground-station relays")
-    # (Note: Numpy has a deprecation warning here because of how networkx uses matrices)
-    dist_sat_net = nx.floyd_warshall_numpy(sat_net_graph)
+        print("  > Calculating Dijkstra to ground stations for graph including ground-station relays")
+    sat_net_graph = graph_of(sat_net_graph, num_satellites + num_ground_stations)
+    _, dst_gids = ground_station_pair_gids(num_satellites, num_ground_stations, ground_station_pairs)
+    dst_gs_node_ids = [num_satellites + dst_gid for dst_gid in dst_gids]
+    # Row of each destination ground station, with an additional column of infinity for padding
+    num_nodes = num_satellites + num_ground_stations
+    dist_to_dst_gs = np.full((len(dst_gids), num_nodes + 1), math.inf)
+    if shortest_paths is None:
+        dist_to_dst_gs[:, :num_nodes] = shortest_path_distances_from(
+            sat_net_graph, num_nodes, dst_gs_node_ids
+        )
+    else:
+        dist_to_dst_gs[:, :num_nodes] = shortest_path_distances_from_incremental(
+            sat_net_graph, num_nodes, dst_gs_node_ids, shortest_paths
+        )
+
+    # Any neighbor must be reachable
+    if np.any(np.isinf(sat_net_graph["adjacency"].data)):
+        raise ValueError("Neighbor cannot be unreachable")
+
+    # Neighbors (in the order of the graph)
+    neighbor_ids = sat_net_graph["neighbor_ids"]
+    neighbor_weights = sat_net_graph["neighbor_weights"]
+    node_ids = np.repeat(np.arange(num_nodes)[:, np.newaxis], neighbor_ids.shape[1], axis=1)
+    is_neighbor = neighbor_ids != num_nodes
+    gs_to_sat = is_neighbor & (node_ids >= num_satellites) & (neighbor_ids < num_satellites)
+    sat_to_gs = is_neighbor & (node_ids < num_satellites) & (neighbor_ids >= num_satellites)
+    sat_to_sat = is_neighbor & (node_ids < num_satellites) & (neighbor_ids < num_satellites)
+    if np.any(is_neighbor & (node_ids >= num_satellites) & (neighbor_ids >= num_satellites)):
+        raise ValueError("GS-to-GS link cannot exist")
+
+    # Check node identifiers to determine what are the correct interface identifiers to each neighbor
+    num_isls_per_sat_array = np.array(num_isls_per_sat, dtype=int)
+    gid_to_sat_gsl_if_idx_array = np.array(gid_to_sat_gsl_if_idx, dtype=int)
+    neighbor_my_if = np.full(neighbor_ids.shape, -1)
+    neighbor_next_hop_if = np.full(neighbor_ids.shape, -1)
+
+    # GS to sat.
+    neighbor_my_if[gs_to_sat] = 0
+    neighbor_next_hop_if[gs_to_sat] = (
+        num_isls_per_sat_array[neighbor_ids[gs_to_sat]]
+        +
+        gid_to_sat_gsl_if_idx_array[node_ids[gs_to_sat] - num_satellites]
+    )
+
+    # Sat. to GS
+    neighbor_my_if[sat_to_gs] = (
+        num_isls_per_sat_array[node_ids[sat_to_gs]]
+        +
+        gid_to_sat_gsl_if_idx_array[neighbor_ids[sat_to_gs] - num_satellites]
+    )
+    neighbor_next_hop_if[sat_to_gs] = 0
+
+    # Sat. to sat. (looked up in the pairs of sat_neighbor_to_if, sorted by node * num_nodes + neighbor)
+    if np.any(sat_to_sat):
+        if_pairs = np.array(list(sat_neighbor_to_if.keys()), dtype=np.int64).reshape((-1, 2))
+        if_keys = if_pairs[:, 0] * num_nodes + if_pairs[:, 1]
+        if_order = np.argsort(if_keys)
+        if_keys = if_keys[if_order]
+        if_values = np.array(list(sat_neighbor_to_if.values()), dtype=int)[if_order]
+        for (from_node_ids, to_node_ids, neighbor_if) in [
+            (node_ids[sat_to_sat], neighbor_ids[sat_to_sat], neighbor_my_if),
+            (neighbor_ids[sat_to_sat], node_ids[sat_to_sat], neighbor_next_hop_if)
+        ]:
+            keys = from_node_ids.astype(np.int64) * num_nodes + to_node_ids
+            positions = np.minimum(np.searchsorted(if_keys, keys), max(0, len(if_keys) - 1))
+            if len(if_keys) == 0 or np.any(if_keys[positions] != keys):
+                raise ValueError("Inter-satellite link has no interface")
+            neighbor_if[sat_to_sat] = if_values[positions]
 
     # Forwarding state
-    fstate = {}
-
-    # Now write state to file for complete graph
-    output_filename = output_dynamic_state_dir + "/fstate_" + str(time_since_epoch_ns) + ".txt"
-    if enable_verbose_logs:
-        print("  > Writing forwarding state to: " + output_filename)
-    with open(output_filename, "w+") as f_out:
-
-        # Satellites and ground stations to ground stations
-        for current_node_id in range(num_satellites + num_ground_stations):
-            for dst_gid in range(num_ground_stations):
-                dst_gs_node_id = num_satellites + dst_gid
-
-                # Cannot forward to itself
-                if current_node_id != dst_gs_node_id:
-
-                    # Among its neighbors, find the one which promises the
-                    # lowest distance to reach the destination satellite
-                    next_hop_decision = (-1, -1, -1)
-                    best_distance_m = 1000000000000000
-                    for neighbor_id in sat_net_graph.neighbors(current_node_id):
-
-                        # Any neighbor must be reachable
-                        if math.isinf(dist_sat_net[(current_node_id, neighbor_id)]):
-                            raise ValueError("Neighbor cannot be unreachable")
-
-                        # Calculate distance = next-hop + distance the next hop node promises
-                        distance_m = (
-                            sat_net_graph.edges[(current_node_id, neighbor_id)]["weight"]
-                            +
-                            dist_sat_net[(neighbor_id, dst_gs_node_id)]
-                        )
-                        if (
-                                not math.isinf(dist_sat_net[(neighbor_id, dst_gs_node_id)])
-                                and
-                                distance_m < best_distance_m
-                        ):
-
-                            # Check node identifiers to determine what are the
-                            # correct interface identifiers
-                            if current_node_id >= num_satellites and neighbor_id < num_satellites:  # GS to sat.
-                                my_if = 0
-                                next_hop_if = (
-                                    num_isls_per_sat[neighbor_id]
-                                    +
-                                    gid_to_sat_gsl_if_idx[current_node_id - num_satellites]
-                                )
-
-                            elif current_node_id < num_satellites and neighbor_id >= num_satellites:  # Sat. to GS
-                                my_if = (
-                                    num_isls_per_sat[current_node_id]
-                                    +
-                                    gid_to_sat_gsl_if_idx[neighbor_id - num_satellites]
-                                )
-                                next_hop_if = 0
-
-                            elif current_node_id < num_satellites and neighbor_id < num_satellites:  # Sat. to sat.
-                                my_if = sat_neighbor_to_if[(current_node_id, neighbor_id)]
-                                next_hop_if = sat_neighbor_to_if[(neighbor_id, current_node_id)]
-
-                            else:  # GS to GS
-                                raise ValueError("GS-to-GS link cannot exist")
-
-                            # Write the next-hop decision
-                            next_hop_decision = (
-                                neighbor_id,  # Next-hop node identifier
-                                my_if,        # My outgoing interface id
-                                next_hop_if   # Next-hop incoming interface id
-                            )
-
-                            # Update best distance found
-                            best_distance_m = distance_m
-
-                    # Write to forwarding state
-                    if not prev_fstate or prev_fstate[(current_node_id, dst_gs_node_id)] != next_hop_decision:
-                        f_out.write("%d,%d,%d,%d,%d\n" % (
-                            current_node_id,
-                            dst_gs_node_id,
-                            next_hop_decision[0],
-                            next_hop_decision[1],
-                            next_hop_decision[2]
-                        ))
-                    fstate[(current_node_id, dst_gs_node_id)] = next_hop_decision
+    fstate_array = empty_fstate_array(num_satellites, num_ground_stations)
+
+    # Satellites and ground stations to ground stations
+    all_nodes = np.arange(num_nodes)
+    for dst_row, dst_gid in enumerate(dst_gids):
+        dst_gs_node_id = num_satellites + dst_gid
+
+        # Among its neighbors, find the one which promises the lowest distance to reach the destination
+        # ground station (= next-hop + distance the next hop node promises, at equal distance, the first)
+        dist_via_neighbor = neighbor_weights + dist_to_dst_gs[dst_row][neighbor_ids]
+        best_neighbor_idx = np.argmin(dist_via_neighbor, axis=1)
+        fstate_array[:, dst_gid, 0] = neighbor_ids[all_nodes, best_neighbor_idx]
+        fstate_array[:, dst_gid, 1] = neighbor_my_if[all_nodes, best_neighbor_idx]
+        fstate_array[:, dst_gid, 2] = neighbor_next_hop_if[all_nodes, best_neighbor_idx]
+
+        # If no neighbor can reach it, it will be dropped (indicated by -1)
+        fstate_array[dist_via_neighbor[all_nodes, best_neighbor_idx] >= 1000000000000000, dst_gid] = -1
+
+        # Cannot forward to itself
+        fstate_array[dst_gs_node_id, dst_gid] = FSTATE_ABSENT
+    fstate = ForwardingState(num_satellites, fstate_array)
+
+    # Updates with respect to the previous forwarding state
+    fstate_updates = fstate_updates_between(prev_fstate, fstate)
+
+    # Now write the updates to file (or the binary store) for complete graph
+    write_fstate_updates(
+        output_dynamic_state_dir, time_since_epoch_ns, fstate_updates, enable_verbose_logs, fstate_store,
+        prev_fstate is None
+    )
 
     # Finally return result
     return fstate
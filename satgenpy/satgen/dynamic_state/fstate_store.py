@@ -0,0 +1,340 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import glob
+import io
+import os
+import numpy as np
+
+
+# Forwarding state update record: (current node, destination node, next hop node, outgoing interface, incoming interface)
+FSTATE_RECORD_LENGTH = 5
+
+# Forwarding state index entry of a time step: (time since epoch (ns), first record, number of records, is keyframe)
+FSTATE_INDEX_LENGTH = 4
+
+
+def fstate_store_filenames(output_dynamic_state_dir):
+    """
+    Filenames of the binary forwarding state store of a dynamic state directory.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+
+    :return: Tuple of (records filename, index filename)
+    """
+    return output_dynamic_state_dir + "/fstate.npy", output_dynamic_state_dir + "/fstate_index.npy"
+
+
+def fstate_store_part_filenames(output_dynamic_state_dir, offset_ns):
+    """
+    Filenames of the part of the binary forwarding state store written by a generation starting at offset_ns.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param offset_ns:                   Offset (ns) of the first time step of the part
+
+    :return: Tuple of (records filename, index filename)
+    """
+    return (
+        output_dynamic_state_dir + "/fstate_part_" + str(offset_ns) + ".bin",
+        output_dynamic_state_dir + "/fstate_part_" + str(offset_ns) + "_index.bin"
+    )
+
+
+def open_fstate_store_part(output_dynamic_state_dir, offset_ns):
+    """
+    Open a part of the binary forwarding state store for writing. The updates of each time step are
+    appended to it as int32 records, and the time step with its first record, number of records and whether
+    it is a keyframe to its index (int64). After the generation, the parts are merged into the store
+    (see merge_fstate_store_parts()).
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param offset_ns:                   Offset (ns) of the first time step which will be written
+
+    :return: Forwarding state store part (to pass to write_fstate_updates() and close_fstate_store_part())
+    """
+    filename_records, filename_index = fstate_store_part_filenames(output_dynamic_state_dir, offset_ns)
+    return {
+        "filename": filename_records,
+        "records_file": open(filename_records, "wb"),
+        "index_file": open(filename_index, "wb"),
+        "num_records": 0
+    }
+
+
+def open_fstate_store_in_memory():
+    """
+    Open a binary forwarding state store which is kept in memory. The updates of each time step
+    are written to it the same as to a part (see open_fstate_store_part()).
+
+    :return: Forwarding state store in memory (to pass to write_fstate_updates() and read_fstate_store_in_memory())
+    """
+    return {
+        "filename": "memory",
+        "records_file": io.BytesIO(),
+        "index_file": io.BytesIO(),
+        "num_records": 0
+    }
+
+
+def close_fstate_store_part(fstate_store):
+    """
+    Close a part of the binary forwarding state store.
+
+    :param fstate_store:    Forwarding state store part (see open_fstate_store_part())
+    """
+    fstate_store["records_file"].close()
+    fstate_store["index_file"].close()
+
+
+def write_fstate_updates(output_dynamic_state_dir, time_since_epoch_ns, fstate_updates, enable_verbose_logs,
+                         fstate_store=None, is_keyframe=False):
+    """
+    Write the forwarding state updates of a time step, either to the fstate_<t>.txt file
+    (as lines of current,destination,next_hop,outgoing_if,incoming_if) or to the binary store.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param time_since_epoch_ns:         Time since epoch (ns)
+    :param fstate_updates:              List of forwarding state update records (each a tuple of 5 integers),
+                                        or numpy array of shape (number of updates, 5)
+    :param enable_verbose_logs:         True to print where it is written to
+    :param fstate_store:                Forwarding state store part (see open_fstate_store_part()),
+                                        if None, it is written to the text file (if there is a directory)
+    :param is_keyframe:                 True iff the updates are the complete forwarding state (a keyframe,
+                                        or the first time step of a part), which is flagged in the index
+                                        of the binary store
+    """
+    if fstate_store is None and output_dynamic_state_dir is None:
+        return
+    fstate_updates = np.array(fstate_updates, dtype=np.int32).reshape((-1, FSTATE_RECORD_LENGTH))
+    if fstate_store is None:
+        output_filename = output_dynamic_state_dir + "/fstate_" + str(time_since_epoch_ns) + ".txt"
+        if enable_verbose_logs:
+            print("  > Writing forwarding state to: " + output_filename)
+        with open(output_filename, "w+") as f_out:
+            f_out.write("".join(["%d,%d,%d,%d,%d\n" % tuple(update) for update in fstate_updates.tolist()]))
+    else:
+        if enable_verbose_logs:
+            print("  > Writing forwarding state to: " + fstate_store["filename"])
+        fstate_store["records_file"].write(fstate_updates.tobytes())
+        fstate_store["index_file"].write(
+            np.array(
+                [time_since_epoch_ns, fstate_store["num_records"], len(fstate_updates), 1 if is_keyframe else 0],
+                dtype=np.int64
+            ).tobytes()
+        )
+        fstate_store["num_records"] += len(fstate_updates)
+
+
+def merge_fstate_store_parts(output_dynamic_state_dir, offsets_ns=None, remove_parts=True):
+    """
+    Merge the parts of the binary forwarding state store into the store, and remove them. A time step which
+    is in multiple parts (as each part but the last calculates one additional time step) is taken from the
+    first of them, such that it is an update rather than the complete state the next part starts with.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param offsets_ns:                  Offsets (ns) of the parts (if None, all parts in the directory)
+    :param remove_parts:                True to remove the parts once the store is written (if False, it is up
+                                        to the caller, see remove_fstate_store_parts())
+    """
+    if offsets_ns is None:
+        offsets_ns = []
+        for filename in glob.glob(output_dynamic_state_dir + "/fstate_part_*_index.bin"):
+            offsets_ns.append(int(os.path.basename(filename)[len("fstate_part_"):-len("_index.bin")]))
+    offsets_ns = sorted(offsets_ns)
+
+    # Time steps of each part which are taken
+    part_indices = []
+    last_time_step_ns = -1
+    for offset_ns in offsets_ns:
+        part_index = np.fromfile(
+            fstate_store_part_filenames(output_dynamic_state_dir, offset_ns)[1], dtype=np.int64
+        ).reshape((-1, FSTATE_INDEX_LENGTH))
+        part_index = part_index[part_index[:, 0] > last_time_step_ns]
+        if len(part_index) > 0:
+            last_time_step_ns = part_index[-1, 0]
+        part_indices.append(part_index)
+    num_time_steps = sum([len(part_index) for part_index in part_indices])
+    num_records = sum([int(np.sum(part_index[:, 2])) for part_index in part_indices])
+
+    # Written to temporary files first, such that an interrupted merge does not leave a partial store
+    filename_records, filename_index = fstate_store_filenames(output_dynamic_state_dir)
+    records = np.lib.format.open_memmap(
+        filename_records + ".tmp.npy", mode="w+", dtype=np.int32, shape=(num_records, FSTATE_RECORD_LENGTH)
+    )
+    index = np.lib.format.open_memmap(
+        filename_index + ".tmp.npy", mode="w+", dtype=np.int64, shape=(num_time_steps, FSTATE_INDEX_LENGTH)
+    )
+    current_time_step = 0
+    current_record = 0
+    for i in range(len(offsets_ns)):
+        part_index = part_indices[i]
+        part_num_records = int(np.sum(part_index[:, 2]))
+        if part_num_records > 0:
+            part_first_record = int(part_index[0, 1])
+            records[current_record:(current_record + part_num_records)] = np.memmap(
+                fstate_store_part_filenames(output_dynamic_state_dir, offsets_ns[i])[0], dtype=np.int32, mode="r",
+                offset=part_first_record * FSTATE_RECORD_LENGTH * 4, shape=(part_num_records, FSTATE_RECORD_LENGTH)
+            )
+            part_index[:, 1] -= part_first_record
+        index[current_time_step:(current_time_step + len(part_index))] = part_index
+        index[current_time_step:(current_time_step + len(part_index)), 1] += current_record
+        current_time_step += len(part_index)
+        current_record += part_num_records
+    records.flush()
+    index.flush()
+    del records
+    del index
+    os.replace(filename_records + ".tmp.npy", filename_records)
+    os.replace(filename_index + ".tmp.npy", filename_index)
+
+    # The parts are no longer needed
+    if remove_parts:
+        remove_fstate_store_parts(output_dynamic_state_dir, offsets_ns)
+
+
+def remove_fstate_store_parts(output_dynamic_state_dir, offsets_ns):
+    """
+    Remove the parts of the binary forwarding state store which (still) exist.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param offsets_ns:                  Offsets (ns) of the parts
+    """
+    for offset_ns in offsets_ns:
+        for filename in fstate_store_part_filenames(output_dynamic_state_dir, offset_ns):
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+
+def read_fstate_store(output_dynamic_state_dir):
+    """
+    Read the binary forwarding state store of a dynamic state directory, if it has one.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+
+    :return: Forwarding state store (to pass to read_fstate_updates()), or None if there is none
+             (in which case the forwarding state is in the fstate_<t>.txt files)
+    """
+    filename_records, filename_index = fstate_store_filenames(output_dynamic_state_dir)
+    if not os.path.isfile(filename_records):
+        return None
+    return fstate_store_from_arrays(np.load(filename_records, mmap_mode="r"), np.load(filename_index))
+
+
+def read_fstate_store_in_memory(fstate_store):
+    """
+    Read a binary forwarding state store which is kept in memory.
+
+    :param fstate_store:    Forwarding state store in memory (see open_fstate_store_in_memory())
+
+    :return: Forwarding state store (to pass to read_fstate_updates())
+    """
+    return fstate_store_from_arrays(
+        np.frombuffer(fstate_store["records_file"].getvalue(), dtype=np.int32).reshape((-1, FSTATE_RECORD_LENGTH)),
+        np.frombuffer(fstate_store["index_file"].getvalue(), dtype=np.int64).reshape((-1, FSTATE_INDEX_LENGTH))
+    )
+
+
+def fstate_store_from_arrays(records, index):
+    """
+    Forwarding state store of the records and index arrays.
+
+    :param records:     Records (numpy int32 array of shape (records, 5))
+    :param index:       Index (numpy int64 array of shape (time steps, 4))
+
+    :return: Forwarding state store (to pass to read_fstate_updates())
+    """
+    if len(records.shape) != 2 or records.shape[1] != FSTATE_RECORD_LENGTH:
+        raise ValueError("Forwarding state records must be of shape (records, %d)" % FSTATE_RECORD_LENGTH)
+    if len(index.shape) != 2 or index.shape[1] != FSTATE_INDEX_LENGTH:
+        raise ValueError("Forwarding state index must be of shape (time steps, %d)" % FSTATE_INDEX_LENGTH)
+    if len(index) > 0 and index[0, 3] == 0:
+        raise ValueError("Forwarding state index must start with a keyframe")
+    return {
+        "records": records,
+        "index": index,
+        "time_step_row": dict(zip(index[:, 0].tolist(), range(len(index)))),
+        "keyframe_rows": np.flatnonzero(index[:, 3])
+    }
+
+
+def read_fstate_updates(output_dynamic_state_dir, time_since_epoch_ns, fstate_store=None):
+    """
+    Read the forwarding state updates of a time step.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param time_since_epoch_ns:         Time since epoch (ns)
+    :param fstate_store:                Forwarding state store (see read_fstate_store()), if None,
+                                        it is read from the fstate_<t>.txt file
+
+    :return: List of forwarding state update records, each a list of
+             [current, destination, next_hop, outgoing_if, incoming_if]
+    """
+    if fstate_store is None:
+        fstate_updates = []
+        with open(output_dynamic_state_dir + "/fstate_" + str(time_since_epoch_ns) + ".txt", "r") as f_in:
+            for line in f_in:
+                fstate_updates.append(list(map(int, line.split(","))))
+        return fstate_updates
+    row = fstate_store["time_step_row"].get(time_since_epoch_ns)
+    if row is None:
+        raise ValueError("Forwarding state store has no time step t=%d ns" % time_since_epoch_ns)
+    first_record, num_records = fstate_store["index"][row, 1:3]
+    return fstate_store["records"][first_record:(first_record + num_records)].tolist()
+
+
+def fstate_at(output_dynamic_state_dir, time_since_epoch_ns, time_step_ns, fstate_keyframe_interval=None,
+              fstate_store=None):
+    """
+    Read the complete forwarding state at a time step, by applying the updates from the last
+    keyframe (time step with the complete forwarding state) at or before it up to and including it.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param time_since_epoch_ns:         Time since epoch (ns)
+    :param time_step_ns:                Time step (ns) with which the dynamic state was generated
+    :param fstate_keyframe_interval:    Keyframe interval (in time steps) with which the dynamic state was generated
+                                        (only for the fstate_<t>.txt files, if None, they are all applied from t=0)
+    :param fstate_store:                Forwarding state store (see read_fstate_store()), if None,
+                                        it is read from the fstate_<t>.txt files
+
+    :return: Forwarding state as dictionary (current, destination) -> (next_hop, outgoing_if, incoming_if)
+    """
+    if time_since_epoch_ns % time_step_ns != 0:
+        raise ValueError("Time must be a multiple of time_step_ns")
+    if fstate_store is None:
+        num_time_steps = time_since_epoch_ns // time_step_ns
+        if fstate_keyframe_interval is not None:
+            num_time_steps = num_time_steps % fstate_keyframe_interval
+        list_time_since_epoch_ns = range(
+            time_since_epoch_ns - num_time_steps * time_step_ns, time_since_epoch_ns + 1, time_step_ns
+        )
+    else:
+        row = fstate_store["time_step_row"].get(time_since_epoch_ns)
+        if row is None:
+            raise ValueError("Forwarding state store has no time step t=%d ns" % time_since_epoch_ns)
+        keyframe_rows = fstate_store["keyframe_rows"]
+        keyframe_row = keyframe_rows[np.searchsorted(keyframe_rows, row, side="right") - 1]
+        list_time_since_epoch_ns = fstate_store["index"][keyframe_row:(row + 1), 0].tolist()
+    fstate = {}
+    for t in list_time_since_epoch_ns:
+        for fstate_update in read_fstate_updates(output_dynamic_state_dir, t, fstate_store):
+            fstate[(fstate_update[0], fstate_update[1])] = (fstate_update[2], fstate_update[3], fstate_update[4])
+    return fstate
@@ -23,11 +23,14 @@
 from satgen.distance_tools import *
 from astropy import units as u
 import math
-import networkx as nx
+import shutil
 import numpy as np
+from .fstate_calculation import fstate_updates_between
+from .satellite_network_graph import create_isl_graph, isl_graph_at, gsl_graph_at
+from .fstate_store import open_fstate_store_part, close_fstate_store_part, write_fstate_updates
 from .algorithm_free_one_only_gs_relays import algorithm_free_one_only_gs_relays
 from .algorithm_free_one_only_over_isls import algorithm_free_one_only_over_isls
-from .algorithm_paired_many_only_over_isls import algorithm_paired_many_only_over_isls
+from .algorithm_paired_many_only_over_isls import algorithm_paired_many_only_over_isls, write_gsl_if_bandwidth_updates
 from .algorithm_free_gs_one_sat_many_only_over_isls import algorithm_free_gs_one_sat_many_only_over_isls
 
 
@@ -47,20 +50,142 @@ def generate_dynamic_state(
                                   # "algorithm_free_one_only_gs_relays"
                                   # "algorithm_free_one_only_over_isls"
                                   # "algorithm_paired_many_only_over_isls"
-        enable_verbose_logs
+        enable_verbose_logs,
+        propagation_mode="ephem",  # Options:
+                                   # "ephem" (each distance is calculated individually using ephem)
+                                   # "sgp4" (all satellite positions are calculated at once using SGP-4)
+                                   # "analytic" (all satellite positions are calculated at once in closed form,
+                                   #             only for drag-free orbits)
+                                   # "ephemeris" (all satellite positions are looked up in the ephemeris table)
+        ephemeris_positions_m=None,  # Ephemeris table with the same time step (only for "ephemeris")
+        isl_length_table=None,  # ISL lengths over one period (see create_isl_length_table()), if given
+                                # the ISL lengths are retrieved from it instead of calculated
+        incremental_shortest_paths=False,  # If True, the shortest path trees of the previous time step are
+                                           # repaired instead of calculated again (with the same result)
+        fstate_format="text",  # Options:
+                               # "text" (fstate_<t>.txt file for each time step)
+                               # "binary" (part of the binary store, see open_fstate_store_part())
+        fstate_keyframe_interval=None,  # If given, the complete forwarding state is written at every time step
+                                        # which is a multiple of this many time steps (a keyframe), instead
+                                        # of only the changes (see fstate_at())
+        ground_station_pairs=None,  # List of (source, destination) ground station node identifiers: if given,
+                                    # only the forwarding state to reach each destination from its source is
+                                    # calculated (by default, that of all pairs of ground stations)
+        event_driven=False,  # If True, the satellites in range of the ground stations are only searched for again
+                             # at the time step at which one can have come in or gone out of range, and in between,
+                             # the shortest paths of the previous time step are re-evaluated (and only calculated
+                             # again if a shorter one came up), with the same dynamic state as a result
+        coarser_dynamic_state_dirs=None  # List of (dynamic state directory, time step in ns which is a multiple of
+                                         # time_step_ns): the dynamic state at each of its time steps is also
+                                         # written to it (with the changes with respect to its previous time step)
 ):
     if offset_ns % time_step_ns != 0:
         raise ValueError("Offset must be a multiple of time_step_ns")
+    if coarser_dynamic_state_dirs is None:
+        coarser_dynamic_state_dirs = []
+    for (_, coarser_time_step_ns) in coarser_dynamic_state_dirs:
+        if coarser_time_step_ns <= 0 or coarser_time_step_ns % time_step_ns != 0:
+            raise ValueError("Coarser time step must be a multiple of time_step_ns")
+    if fstate_format not in ("text", "binary"):
+        raise ValueError("Unknown forwarding state format: " + str(fstate_format))
+    if fstate_keyframe_interval is not None and fstate_keyframe_interval <= 0:
+        raise ValueError("Forwarding state keyframe interval must be positive")
+    if ground_station_pairs is not None:
+        for (src_node_id, dst_node_id) in ground_station_pairs:
+            for node_id in (src_node_id, dst_node_id):
+                if node_id < len(satellites) or node_id >= len(satellites) + len(ground_stations):
+                    raise ValueError("Ground station pair contains a node which is not a ground station: "
+                                     + str(node_id))
+            if src_node_id == dst_node_id:
+                raise ValueError("Ground station pair cannot have the same source and destination: "
+                                 + str(src_node_id))
+
+    # Batched propagation of all satellites
+    propagator = create_propagator_for_mode(propagation_mode, satellites, epoch, ephemeris_positions_m, time_step_ns)
+
+    # Event-driven, only the satellites in range of the ground stations on which the dynamic state depends are
+    # searched for (those of the pairs, unless other ground stations can be relays or share the GSL interface
+    # bandwidth of a satellite), as those of the others do not affect it
+    event_gids = None
+    event_ground_station_positions_m = None
+    if event_driven:
+        if propagator is None:
+            raise ValueError("Event-driven dynamic state requires the satellite positions "
+                             "(propagation mode other than ephem)")
+        event_gids = list(range(len(ground_stations)))
+        if ground_station_pairs is not None and dynamic_state_algorithm in (
+                "algorithm_free_one_only_over_isls", "algorithm_free_gs_one_sat_many_only_over_isls"
+        ):
+            event_gids = sorted(set(
+                node_id - len(satellites) for ground_station_pair in ground_station_pairs
+                for node_id in ground_station_pair
+            ))
+        event_ground_station_positions_m = ground_station_positions_m(ground_stations)[event_gids]
+    event_satellites_in_range = None
+    next_event_check_ns = None
+
+    # The structure of the ISL graph is created once, only its edge weights change over time
+    isl_graph = create_isl_graph(len(satellites), list_isls)
+
+    # The binary forwarding state of all time steps is written to a single part
+    fstate_store = None
+    if fstate_format == "binary":
+        fstate_store = open_fstate_store_part(output_dynamic_state_dir, offset_ns)
+
+    # Each coarser dynamic state directory has its own previous forwarding state (and binary part)
+    coarser_outputs = []
+    for (coarser_dynamic_state_dir, coarser_time_step_ns) in coarser_dynamic_state_dirs:
+        coarser_outputs.append({
+            "output_dynamic_state_dir": coarser_dynamic_state_dir,
+            "time_step_ns": coarser_time_step_ns,
+            "fstate_store": (
+                open_fstate_store_part(coarser_dynamic_state_dir, offset_ns) if fstate_format == "binary" else None
+            ),
+            "prev_fstate": None,
+            "prev_gsl_if_bandwidth_state": None
+        })
+
     prev_output = None
     i = 0
     total_iterations = ((simulation_end_time_ns - offset_ns) / time_step_ns)
     for time_since_epoch_ns in range(offset_ns, simulation_end_time_ns, time_step_ns):
         if not enable_verbose_logs:
-            if i % int(math.floor(total_iterations) / 10.0) == 0:
+            if i % max(1, int(math.floor(total_iterations) / 10.0)) == 0:
                 print("Progress: calculating for T=%d (time step granularity is still %d ms)" % (
                     time_since_epoch_ns, time_step_ns / 1000000
                 ))
             i += 1
+        satellite_positions_m = satellite_positions_m_or_none_at(propagator, time_since_epoch_ns)
+        isl_lengths_m = None
+        if isl_length_table is not None:
+            isl_lengths_m = isl_lengths_m_from_table(isl_length_table, time_since_epoch_ns)
+
+        # At a keyframe, the forwarding state is written as if there was no previous forwarding state
+        is_keyframe = fstate_keyframe_interval is not None \
+            and (time_since_epoch_ns // time_step_ns) % fstate_keyframe_interval == 0
+        if is_keyframe and prev_output is not None:
+            prev_output = dict(prev_output, fstate=None)
+
+        # Event-driven, until a satellite can have come in or gone out of range (the next event), only the
+        # lengths of the GSLs to the satellites in range are calculated again
+        gsl_satellites_in_range = None
+        if event_driven:
+            if next_event_check_ns is None or time_since_epoch_ns >= next_event_check_ns:
+                event_satellites_in_range = satellites_in_range_of_ground_stations(
+                    event_ground_station_positions_m, satellite_positions_m, max_gsl_length_m
+                )
+                next_event_check_ns = time_since_epoch_ns + satellites_in_range_unchanged_for_ns(
+                    event_ground_station_positions_m, satellite_positions_m, max_gsl_length_m
+                )
+            else:
+                event_satellites_in_range = satellites_in_range_of_ground_stations_among(
+                    event_ground_station_positions_m, satellite_positions_m, max_gsl_length_m,
+                    [[sid for (_, sid) in in_range] for in_range in event_satellites_in_range]
+                )
+            gsl_satellites_in_range = [[] for _ in range(len(ground_stations))]
+            for (gid, in_range) in zip(event_gids, event_satellites_in_range):
+                gsl_satellites_in_range[gid] = in_range
+
         prev_output = generate_dynamic_state_at(
             output_dynamic_state_dir,
             epoch,
@@ -73,8 +198,72 @@ def generate_dynamic_state(
             max_isl_length_m,
             dynamic_state_algorithm,
             prev_output,
-            enable_verbose_logs
+            enable_verbose_logs,
+            satellite_positions_m,
+            isl_lengths_m,
+            incremental_shortest_paths or event_driven,  # Event-driven, the shortest paths are re-evaluated
+            fstate_store,
+            ground_station_pairs,
+            isl_graph,
+            gsl_satellites_in_range
+        )
+        write_coarser_dynamic_state_at(
+            output_dynamic_state_dir, time_since_epoch_ns, prev_output, coarser_outputs,
+            fstate_keyframe_interval, enable_verbose_logs
+        )
+    if fstate_store is not None:
+        close_fstate_store_part(fstate_store)
+    for coarser_output in coarser_outputs:
+        if coarser_output["fstate_store"] is not None:
+            close_fstate_store_part(coarser_output["fstate_store"])
+
+
+def write_coarser_dynamic_state_at(output_dynamic_state_dir, time_since_epoch_ns, output, coarser_outputs,
+                                   fstate_keyframe_interval, enable_verbose_logs):
+    """
+    Write the dynamic state of a time step to the coarser dynamic state directories of which it is a time step.
+    The forwarding state updates are the changes with respect to the previous time step of that directory
+    (the first time step of a generation and keyframes are complete), and so are the GSL interface bandwidth
+    changes if the algorithm keeps its bandwidth state (else, the bandwidth only changes at t=0, and the
+    file is the same as that of the time step in the dynamic state directory).
+
+    :param output_dynamic_state_dir:    Dynamic state directory (of the time step)
+    :param time_since_epoch_ns:         Time since epoch (ns)
+    :param output:                      Output of the dynamic state algorithm at the time step
+    :param coarser_outputs:             List of coarser outputs (each a dictionary with its dynamic state
+                                        directory, time step, binary part and previous forwarding and
+                                        bandwidth state, which are updated)
+    :param fstate_keyframe_interval:    Keyframe interval (in time steps of the coarser dynamic state directory)
+    :param enable_verbose_logs:         True to print where it is written to
+    """
+    for coarser_output in coarser_outputs:
+        coarser_time_step_ns = coarser_output["time_step_ns"]
+        if time_since_epoch_ns % coarser_time_step_ns != 0:
+            continue
+        coarser_dynamic_state_dir = coarser_output["output_dynamic_state_dir"]
+        if "gsl_if_bandwidth_state" in output:
+            write_gsl_if_bandwidth_updates(
+                coarser_dynamic_state_dir, time_since_epoch_ns, output["gsl_if_bandwidth_state"],
+                coarser_output["prev_gsl_if_bandwidth_state"]
+            )
+            coarser_output["prev_gsl_if_bandwidth_state"] = output["gsl_if_bandwidth_state"]
+        else:
+            shutil.copyfile(
+                output_dynamic_state_dir + "/gsl_if_bandwidth_" + str(time_since_epoch_ns) + ".txt",
+                coarser_dynamic_state_dir + "/gsl_if_bandwidth_" + str(time_since_epoch_ns) + ".txt"
+            )
+        if fstate_keyframe_interval is not None \
+                and (time_since_epoch_ns // coarser_time_step_ns) % fstate_keyframe_interval == 0:
+            coarser_output["prev_fstate"] = None
+        write_fstate_updates(
+            coarser_dynamic_state_dir,
+            time_since_epoch_ns,
+            fstate_updates_between(coarser_output["prev_fstate"], output["fstate"]),
+            enable_verbose_logs,
+            coarser_output["fstate_store"],
+            coarser_output["prev_fstate"] is None
         )
+        coarser_output["prev_fstate"] = output["fstate"]
 
 
 def generate_dynamic_state_at(
@@ -89,7 +278,14 @@ def generate_dynamic_state_at(
         max_isl_length_m,
         dynamic_state_algorithm,
         prev_output,
-        enable_verbose_logs
+        enable_verbose_logs,
+        satellite_positions_m=None,
+        isl_lengths_m=None,
+        incremental_shortest_paths=False,
+        fstate_store=None,
+        ground_station_pairs=None,
+        isl_graph=None,
+        gsl_satellites_in_range=None
 ):
     if enable_verbose_logs:
         print("FORWARDING STATE AT T = " + (str(time_since_epoch_ns))
@@ -100,23 +296,15 @@ def generate_dynamic_state_at(
     if enable_verbose_logs:
         print("\nBASIC INFORMATION")
 
-    # Time
-    time = epoch + time_since_epoch_ns * u.ns
+    # Time (as ephem dates, such that they are not parsed again for every distance calculation)
+    ephem_epoch = ephem_date_at(epoch, 0)
+    ephem_time = ephem_date_at(epoch, time_since_epoch_ns)
     if enable_verbose_logs:
         print("  > Epoch.................. " + str(epoch))
         print("  > Time since epoch....... " + str(time_since_epoch_ns) + " ns")
-        print("  > Absolute time.......... " + str(time))
-
-    # Graphs
-    sat_net_graph_only_satellites_with_isls = nx.Graph()
-    sat_net_graph_all_with_only_gsls = nx.Graph()
+        print("  > Absolute time.......... " + str(epoch + time_since_epoch_ns * u.ns))
 
     # Information
-    for i in range(len(satellites)):
-        sat_net_graph_only_satellites_with_isls.add_node(i)
-        sat_net_graph_all_with_only_gsls.add_node(i)
-    for i in range(len(satellites) + len(ground_stations)):
-        sat_net_graph_all_with_only_gsls.add_node(i)
     if enable_verbose_logs:
         print("  > Satellites............. " + str(len(satellites)))
         print("  > Ground stations........ " + str(len(ground_stations)))
@@ -128,35 +316,39 @@ def generate_dynamic_state_at(
     if enable_verbose_logs:
         print("\nISL INFORMATION")
 
-    # ISL edges
-    total_num_isls = 0
-    num_isls_per_sat = [0] * len(satellites)
-    sat_neighbor_to_if = {}
-    for (a, b) in list_isls:
-
-        # ISLs are not permitted to exceed their maximum distance
-        # TODO: Technically, they can (could just be ignored by forwarding state calculation),
-        # TODO: but practically, defining a permanent ISL between two satellites which
-        # TODO: can go out of distance is generally unwanted
-        sat_distance_m = distance_m_between_satellites(satellites[a], satellites[b], str(epoch), str(time))
-        if sat_distance_m > max_isl_length_m:
-            raise ValueError(
-                "The distance between two satellites (%d and %d) "
-                "with an ISL exceeded the maximum ISL length (%.2fm > %.2fm at t=%dns)"
-                % (a, b, sat_distance_m, max_isl_length_m, time_since_epoch_ns)
-            )
-
-        # Add to networkx graph
-        sat_net_graph_only_satellites_with_isls.add_edge(
-            a, b, weight=sat_distance_m
+    # With the satellite positions given, all ISL lengths can be calculated at once
+    if isl_lengths_m is None and satellite_positions_m is not None:
+        isl_lengths_m = distances_m_between_satellites(satellite_positions_m, list_isls)
+
+    # The structure of the ISL graph (including the interface mapping of ISLs) does not change over time
+    if isl_graph is None:
+        isl_graph = create_isl_graph(len(satellites), list_isls)
+    num_isls_per_sat = isl_graph["num_isls_per_sat"]
+    sat_neighbor_to_if = isl_graph["sat_neighbor_to_if"]
+
+    # ISL lengths
+    if isl_lengths_m is None:
+        isl_lengths_m = [
+            distance_m_between_satellites(satellites[a], satellites[b], ephem_epoch, ephem_time)
+            for (a, b) in list_isls
+        ]
+    isl_lengths_m = np.asarray(isl_lengths_m, dtype=float)
+
+    # ISLs are not permitted to exceed their maximum distance
+    # TODO: Technically, they can (could just be ignored by forwarding state calculation),
+    # TODO: but practically, defining a permanent ISL between two satellites which
+    # TODO: can go out of distance is generally unwanted
+    exceeded_isl_idx = np.flatnonzero(isl_lengths_m > max_isl_length_m)
+    if len(exceeded_isl_idx) > 0:
+        (a, b) = list_isls[exceeded_isl_idx[0]]
+        raise ValueError(
+            "The distance between two satellites (%d and %d) "
+            "with an ISL exceeded the maximum ISL length (%.2fm > %.2fm at t=%dns)"
+            % (a, b, isl_lengths_m[exceeded_isl_idx[0]], max_isl_length_m, time_since_epoch_ns)
         )
 
-        # Interface mapping of ISLs
-        sat_neighbor_to_if[(a, b)] = num_isls_per_sat[a]
-        sat_neighbor_to_if[(b, a)] = num_isls_per_sat[b]
-        num_isls_per_sat[a] += 1
-        num_isls_per_sat[b] += 1
-        total_num_isls += 1
+    # ISL edges
+    sat_net_graph_only_satellites_with_isls = isl_graph_at(isl_graph, isl_lengths_m)
 
     if enable_verbose_logs:
         print("  > Total ISLs............. " + str(len(list_isls)))
@@ -187,24 +379,32 @@ def generate_dynamic_state_at(
     if enable_verbose_logs:
         print("\nGSL IN-RANGE INFORMATION")
 
+    # With the satellite positions given, a spatial index finds the satellites in range of each ground station
+    # (unless they are given)
+    if gsl_satellites_in_range is None and satellite_positions_m is not None:
+        gsl_satellites_in_range = satellites_in_range_of_ground_stations(
+            ground_station_positions_m(ground_stations),
+            satellite_positions_m,
+            max_gsl_length_m
+        )
+
     # What satellites can a ground station see
     ground_station_satellites_in_range = []
     for ground_station in ground_stations:
         # Find satellites in range
-        satellites_in_range = []
-        for sid in range(len(satellites)):
-            distance_m = distance_m_ground_station_to_satellite(
-                ground_station,
-                satellites[sid],
-                str(epoch),
-                str(time)
-            )
-            if distance_m <= max_gsl_length_m:
-                satellites_in_range.append((distance_m, sid))
-                sat_net_graph_all_with_only_gsls.add_edge(
-                    sid, len(satellites) + ground_station["gid"], weight=distance_m
+        if gsl_satellites_in_range is not None:
+            satellites_in_range = gsl_satellites_in_range[ground_station["gid"]]
+        else:
+            satellites_in_range = []
+            for sid in range(len(satellites)):
+                distance_m = distance_m_ground_station_to_satellite(
+                    ground_station,
+                    satellites[sid],
+                    ephem_epoch,
+                    ephem_time
                 )
-
+                if distance_m <= max_gsl_length_m:
+                    satellites_in_range.append((distance_m, sid))
         ground_station_satellites_in_range.append(satellites_in_range)
 
     # Print how many are in range
@@ -234,7 +434,10 @@ def generate_dynamic_state_at(
             sat_neighbor_to_if,
             list_gsl_interfaces_info,
             prev_output,
-            enable_verbose_logs
+            enable_verbose_logs,
+            incremental_shortest_paths,
+            fstate_store,
+            ground_station_pairs
         )
 
     elif dynamic_state_algorithm == "algorithm_free_gs_one_sat_many_only_over_isls":
@@ -250,7 +453,10 @@ def generate_dynamic_state_at(
             sat_neighbor_to_if,
             list_gsl_interfaces_info,
             prev_output,
-            enable_verbose_logs
+            enable_verbose_logs,
+            incremental_shortest_paths,
+            fstate_store,
+            ground_station_pairs
         )
 
     elif dynamic_state_algorithm == "algorithm_free_one_only_gs_relays":
@@ -260,11 +466,14 @@ def generate_dynamic_state_at(
             time_since_epoch_ns,
             satellites,
             ground_stations,
-            sat_net_graph_all_with_only_gsls,
+            gsl_graph_at(len(satellites), len(ground_stations), ground_station_satellites_in_range),
             num_isls_per_sat,
             list_gsl_interfaces_info,
             prev_output,
-            enable_verbose_logs
+            enable_verbose_logs,
+            incremental_shortest_paths,
+            fstate_store,
+            ground_station_pairs
         )
 
     elif dynamic_state_algorithm == "algorithm_paired_many_only_over_isls":
@@ -280,7 +489,10 @@ def generate_dynamic_state_at(
             sat_neighbor_to_if,
             list_gsl_interfaces_info,
             prev_output,
-            enable_verbose_logs
+            enable_verbose_logs,
+            incremental_shortest_paths,
+            fstate_store,
+            ground_station_pairs
         )
 
     else:
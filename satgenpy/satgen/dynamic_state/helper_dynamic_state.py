@@ -24,9 +24,15 @@ from satgen.isls import *
 from satgen.ground_stations import *
 from satgen.tles import *
 from satgen.interfaces import *
+from satgen.ephemeris import help_ephemeris
+from satgen.distance_tools import walker_period_ns, create_isl_length_table
 from .generate_dynamic_state import generate_dynamic_state
+from .fstate_store import merge_fstate_store_parts, remove_fstate_store_parts
+import glob
 import os
 import math
+import threading
+from multiprocessing import Pool as ProcessPool
 from multiprocessing.dummy import Pool as ThreadPool
 
 
@@ -46,7 +52,16 @@ def worker(args):
         max_gsl_length_m,
         max_isl_length_m,
         dynamic_state_algorithm,
-        print_logs
+        print_logs,
+        propagation_mode,
+        ephemeris_positions_m,
+        isl_length_table,
+        incremental_shortest_paths,
+        fstate_format,
+        fstate_keyframe_interval,
+        ground_station_pairs,
+        event_driven,
+        coarser_dynamic_state_dirs
      ) = args
 
     # Generate dynamic state
@@ -67,78 +82,452 @@ def worker(args):
                                   # "algorithm_free_one_only_over_isls"
                                   # "algorithm_free_gs_one_sat_many_only_over_isls"
                                   # "algorithm_paired_many_only_over_isls"
-        print_logs
+        print_logs,
+        propagation_mode,
+        ephemeris_positions_m,
+        isl_length_table,
+        incremental_shortest_paths,
+        fstate_format,
+        fstate_keyframe_interval,
+        ground_station_pairs,
+        event_driven,
+        coarser_dynamic_state_dirs
     )
 
 
+def chunk_done_filename(output_dynamic_state_dir, offset_ns):
+    """
+    Filename of the marker which is written when the chunk starting at offset_ns is done.
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+    :param offset_ns:                   Offset (ns) of the first time step of the chunk
+
+    :return: Filename of the marker
+    """
+    return output_dynamic_state_dir + "/chunk_" + str(offset_ns) + "_done.txt"
+
+
+def chunk_done_content(simulation_end_time_ns, time_step_ns, offset_ns, chunk_arguments):
+    """
+    Content of the marker of a chunk, such that a chunk with different time steps or arguments does not match it.
+
+    :param simulation_end_time_ns:  End time (ns) of the chunk (exclusive)
+    :param time_step_ns:            Time step (ns)
+    :param offset_ns:               Offset (ns) of the first time step of the chunk
+    :param chunk_arguments:         Dictionary of the other arguments which affect the dynamic state of the chunk
+
+    :return: Line of offset,end,time step followed by a line of name=value for each argument (sorted by name)
+    """
+    return "%d,%d,%d\n" % (offset_ns, simulation_end_time_ns, time_step_ns) + "".join(
+        ["%s=%s\n" % (name, str(chunk_arguments[name])) for name in sorted(chunk_arguments.keys())]
+    )
+
+
+def fstate_merge_done_filename(output_dynamic_state_dir):
+    """
+    Filename of the marker which is written when the binary forwarding state parts are merged into the store
+    (with as content that of the markers of all chunks).
+
+    :param output_dynamic_state_dir:    Dynamic state directory
+
+    :return: Filename of the marker
+    """
+    return output_dynamic_state_dir + "/fstate_merge_done.txt"
+
+
+def is_marker_done(filename, content):
+    """
+    Check whether a marker is done, which means it exists and has the same content.
+
+    :param filename:    Filename of the marker
+    :param content:     Content of the marker
+
+    :return: True iff the marker is done
+    """
+    if not os.path.isfile(filename):
+        return False
+    with open(filename, "r") as f_in:
+        return f_in.read() == content
+
+
+def write_marker(filename, content):
+    """
+    Write a marker.
+
+    :param filename:    Filename of the marker
+    :param content:     Content of the marker
+    """
+    with open(filename, "w+") as f_out:
+        f_out.write(content)
+
+
+def read_worker_inputs(satellite_network_dir):
+    """
+    Read in the satellite network inputs of the workers.
+
+    :param satellite_network_dir: Satellite network directory
+
+    :return: Tuple of (epoch, satellites, ground stations, list of ISLs, list of GSL interfaces information)
+    """
+    ground_stations = read_ground_stations_extended(satellite_network_dir + "/ground_stations.txt")
+    tles = read_tles(satellite_network_dir + "/tles.txt")
+    satellites = tles["satellites"]
+    list_isls = read_isls(satellite_network_dir + "/isls.txt", len(satellites))
+    list_gsl_interfaces_info = read_gsl_interfaces_info(
+        satellite_network_dir + "/gsl_interfaces_info.txt",
+        len(satellites),
+        len(ground_stations)
+    )
+    return tles["epoch"], satellites, ground_stations, list_isls, list_gsl_interfaces_info
+
+
+def create_worker_inputs(
+        satellite_network_dir, output_dynamic_state_dir, max_gsl_length_m, max_isl_length_m,
+        dynamic_state_algorithm, print_logs, propagation_mode, ephemeris_positions_m, isl_length_table,
+        incremental_shortest_paths, fstate_format, fstate_keyframe_interval, ground_station_pairs, event_driven,
+        coarser_dynamic_state_dirs
+):
+    """
+    Read in the satellite network inputs and combine them with the other arguments which are the same for all chunks.
+
+    :param satellite_network_dir:   Satellite network directory
+    :param ephemeris_positions_m:   Ephemeris table (only for the "ephemeris" propagation mode, else None)
+
+    (the other arguments are those of generate_dynamic_state())
+
+    :return: Dictionary of the inputs of a worker (see chunk_worker())
+    """
+    epoch, satellites, ground_stations, list_isls, list_gsl_interfaces_info = read_worker_inputs(
+        satellite_network_dir
+    )
+    return {
+        "output_dynamic_state_dir": output_dynamic_state_dir,
+        "epoch": epoch,
+        "satellites": satellites,
+        "ground_stations": ground_stations,
+        "list_isls": list_isls,
+        "list_gsl_interfaces_info": list_gsl_interfaces_info,
+        "max_gsl_length_m": max_gsl_length_m,
+        "max_isl_length_m": max_isl_length_m,
+        "dynamic_state_algorithm": dynamic_state_algorithm,
+        "print_logs": print_logs,
+        "propagation_mode": propagation_mode,
+        "ephemeris_positions_m": ephemeris_positions_m,
+        "isl_length_table": isl_length_table,
+        "incremental_shortest_paths": incremental_shortest_paths,
+        "fstate_format": fstate_format,
+        "fstate_keyframe_interval": fstate_keyframe_interval,
+        "ground_station_pairs": ground_station_pairs,
+        "event_driven": event_driven,
+        "coarser_dynamic_state_dirs": coarser_dynamic_state_dirs,
+    }
+
+
+def chunk_worker(inputs, args):
+
+    # Extract arguments (the rest is in the inputs of the worker)
+    (
+        simulation_end_time_ns,
+        time_step_ns,
+        offset_ns
+    ) = args
+
+    # Generate dynamic state
+    worker((
+        inputs["output_dynamic_state_dir"],
+        inputs["epoch"],
+        simulation_end_time_ns,
+        time_step_ns,
+        offset_ns,
+        inputs["satellites"],
+        inputs["ground_stations"],
+        inputs["list_isls"],
+        inputs["list_gsl_interfaces_info"],
+        inputs["max_gsl_length_m"],
+        inputs["max_isl_length_m"],
+        inputs["dynamic_state_algorithm"],
+        inputs["print_logs"],
+        inputs["propagation_mode"],
+        inputs["ephemeris_positions_m"],
+        inputs["isl_length_table"],
+        inputs["incremental_shortest_paths"],
+        inputs["fstate_format"],
+        inputs["fstate_keyframe_interval"],
+        inputs["ground_station_pairs"],
+        inputs["event_driven"],
+        inputs["coarser_dynamic_state_dirs"]
+    ))
+
+    # The chunk is done
+    return args
+
+
+# Inputs of the worker thread, which are shared by all threads except for the satellites
+# (ephem computes a position in place, so each thread reads in its own once for all its chunks)
+thread_worker_inputs = threading.local()
+
+
+def init_thread_worker(satellite_network_dir, inputs):
+    thread_worker_inputs.inputs = dict(
+        inputs,
+        satellites=read_tles(satellite_network_dir + "/tles.txt")["satellites"]
+    )
+
+
+def thread_worker(args):
+    return chunk_worker(thread_worker_inputs.inputs, args)
+
+
+# Inputs of the worker process, which are read in once when it starts and then used for all its chunks
+process_worker_inputs = None
+
+
+def init_process_worker(
+        satellite_network_dir, output_dynamic_state_dir, time_step_ms, duration_s, max_gsl_length_m,
+        max_isl_length_m, dynamic_state_algorithm, print_logs, propagation_mode, isl_length_table,
+        incremental_shortest_paths, fstate_format, fstate_keyframe_interval, ground_station_pairs, event_driven,
+        coarser_dynamic_state_dirs
+):
+    global process_worker_inputs
+
+    # The ephemeris table is memory-mapped (read-only) by each process, such that it is shared
+    ephemeris_positions_m = None
+    if propagation_mode == "ephemeris":
+        ephemeris_positions_m = help_ephemeris(satellite_network_dir, time_step_ms, duration_s)
+
+    process_worker_inputs = create_worker_inputs(
+        satellite_network_dir, output_dynamic_state_dir, max_gsl_length_m, max_isl_length_m,
+        dynamic_state_algorithm, print_logs, propagation_mode, ephemeris_positions_m, isl_length_table,
+        incremental_shortest_paths, fstate_format, fstate_keyframe_interval, ground_station_pairs, event_driven,
+        coarser_dynamic_state_dirs
+    )
+
+
+def process_worker(args):
+    return chunk_worker(process_worker_inputs, args)
+
+
 def help_dynamic_state(
-        output_generated_data_dir, num_threads, name, time_step_ms, duration_s,
-        max_gsl_length_m, max_isl_length_m, dynamic_state_algorithm, print_logs
+        output_generated_data_dir, num_threads, name,
+        time_step_ms,  # Time step (ms), or list of time steps (ms) which are multiples of the finest: the dynamic
+                       # state of all of them is generated at once (the coarser ones are derived from the finest)
+        duration_s,
+        max_gsl_length_m, max_isl_length_m, dynamic_state_algorithm, print_logs, propagation_mode="ephem",
+        memoize_isl_lengths=False, isl_period_ns=None,
+        parallel_mode="threads",  # Options:
+                                  # "threads" (num_threads threads, which share the inputs)
+                                  # "processes" (num_threads processes, each of which reads in the inputs once)
+        chunk_size=None,  # Number of time steps per chunk of work; by default, the time steps
+                          # are divided evenly over the workers (one chunk each)
+        incremental_shortest_paths=False,  # If True, the shortest path trees of the previous time step are
+                                           # repaired instead of calculated again (with the same result)
+        fstate_format="text",  # Options:
+                               # "text" (fstate_<t>.txt file for each time step)
+                               # "binary" (fstate.npy with all time steps, indexed by fstate_index.npy)
+        fstate_keyframe_interval=None,  # If given, the complete forwarding state is written every this many
+                                        # time steps (a keyframe), and the chunks start at keyframes
+        ground_station_pairs=None,  # List of (source, destination) ground station node identifiers: if given,
+                                    # only the forwarding state of these pairs is calculated
+        event_driven=False,  # If True, the satellites in range are only searched for again when one can have
+                             # come in or gone out of range, and the shortest paths are re-evaluated in between
+                             # (with the same dynamic state as a result, see generate_dynamic_state())
+        resume=False  # If True, the chunks which are done (of an earlier call with the same arguments
+                      # which was interrupted) are not calculated again
 ):
 
-    # Directory
-    output_dynamic_state_dir = output_generated_data_dir + "/" + name + "/dynamic_state_" + str(time_step_ms) \
-                               + "ms_for_" + str(duration_s) + "s"
-    if not os.path.isdir(output_dynamic_state_dir):
-        os.makedirs(output_dynamic_state_dir)
+    # Time steps (the dynamic state is calculated at the finest)
+    list_time_step_ms = sorted(set(time_step_ms)) if isinstance(time_step_ms, (list, tuple)) else [time_step_ms]
+    if len(list_time_step_ms) == 0:
+        raise ValueError("There must be at least one time step")
+    time_step_ms = list_time_step_ms[0]
+    for coarser_time_step_ms in list_time_step_ms[1:]:
+        if coarser_time_step_ms % time_step_ms != 0:
+            raise ValueError("Each time step must be a multiple of the finest time step: "
+                             + str(coarser_time_step_ms))
+
+    # Directories
+    satellite_network_dir = output_generated_data_dir + "/" + name
+    list_output_dynamic_state_dir = [
+        satellite_network_dir + "/dynamic_state_" + str(step_ms) + "ms_for_" + str(duration_s) + "s"
+        for step_ms in list_time_step_ms
+    ]
+    for directory in list_output_dynamic_state_dir:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    output_dynamic_state_dir = list_output_dynamic_state_dir[0]
+    coarser_dynamic_state_dirs = [
+        (directory, step_ms * 1000 * 1000)
+        for (directory, step_ms) in zip(list_output_dynamic_state_dir[1:], list_time_step_ms[1:])
+    ]
+
+    # Parallelization
+    if parallel_mode not in ("threads", "processes"):
+        raise ValueError("Unknown parallel mode: " + str(parallel_mode))
+    if num_threads <= 0:
+        raise ValueError("Number of threads must be positive")
+    if chunk_size is not None and chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+    if fstate_format not in ("text", "binary"):
+        raise ValueError("Unknown forwarding state format: " + str(fstate_format))
+    if fstate_keyframe_interval is not None:
+        if fstate_keyframe_interval <= 0:
+            raise ValueError("Forwarding state keyframe interval must be positive")
+        if chunk_size is not None and chunk_size % fstate_keyframe_interval != 0:
+            raise ValueError("Chunk size must be a multiple of the forwarding state keyframe interval")
 
     # In nanoseconds
     simulation_end_time_ns = duration_s * 1000 * 1000 * 1000
     time_step_ns = time_step_ms * 1000 * 1000
 
+    # The ephemeris table is shared (read-only) by all threads
+    ephemeris_positions_m = None
+    if propagation_mode == "ephemeris":
+        ephemeris_positions_m = help_ephemeris(satellite_network_dir, time_step_ms, duration_s)
+
+    # The ISL lengths over one period are calculated once and shared (read-only) by all threads
+    isl_length_table = None
+    if memoize_isl_lengths:
+        if propagation_mode != "ephem":
+            raise ValueError("ISL lengths can only be memoized in the ephem propagation mode")
+        tles = read_tles(satellite_network_dir + "/tles.txt")
+        if isl_period_ns is None:
+            isl_period_ns = walker_period_ns(tles["satellites"])
+        print("Calculating ISL lengths over one period (%.2f s)" % (isl_period_ns / 1e9))
+        isl_length_table = create_isl_length_table(
+            tles["satellites"],
+            tles["epoch"],
+            read_isls(satellite_network_dir + "/isls.txt", len(tles["satellites"])),
+            isl_period_ns
+        )
+
+    # Number of time steps of each chunk
     num_calculations = math.floor(simulation_end_time_ns / time_step_ns)
-    calculations_per_thread = int(math.floor(float(num_calculations) / float(num_threads)))
-    num_threads_with_one_more = num_calculations % num_threads
+    list_chunk_num_time_steps = []
+    if chunk_size is None:
+        # With keyframes, the time steps are divided in blocks starting at a keyframe, such that
+        # each chunk starts at one (and its complete first forwarding state is a keyframe)
+        block_size = 1 if fstate_keyframe_interval is None else fstate_keyframe_interval
+        num_blocks = int(math.ceil(float(num_calculations) / float(block_size)))
+        blocks_per_thread = int(math.floor(float(num_blocks) / float(num_threads)))
+        num_threads_with_one_more = num_blocks % num_threads
+        current = 0
+        for i in range(num_threads):
+            num_time_steps = min(
+                (blocks_per_thread + (1 if i < num_threads_with_one_more else 0)) * block_size,
+                num_calculations - current
+            )
+            list_chunk_num_time_steps.append(num_time_steps)
+            current += num_time_steps
+    else:
+        for current in range(0, num_calculations, chunk_size):
+            list_chunk_num_time_steps.append(min(chunk_size, num_calculations - current))
 
     # Prepare arguments
+    # (each chunk starts without previous state, and all but the last chunk calculate one additional time step)
     current = 0
     list_args = []
-    for i in range(num_threads):
-
-        # How many time steps to calculate for
-        num_time_steps = calculations_per_thread
-        if i < num_threads_with_one_more:
-            num_time_steps += 1
-
-        # Variables (load in for each thread such that they don't interfere)
-        ground_stations = read_ground_stations_extended(output_generated_data_dir + "/" + name + "/ground_stations.txt")
-        tles = read_tles(output_generated_data_dir + "/" + name + "/tles.txt")
-        satellites = tles["satellites"]
-        list_isls = read_isls(output_generated_data_dir + "/" + name + "/isls.txt", len(satellites))
-        list_gsl_interfaces_info = read_gsl_interfaces_info(
-            output_generated_data_dir + "/" + name + "/gsl_interfaces_info.txt",
-            len(satellites),
-            len(ground_stations)
-        )
-        epoch = tles["epoch"]
+    for i in range(len(list_chunk_num_time_steps)):
+        num_time_steps = list_chunk_num_time_steps[i]
 
         # Print goal
-        print("Thread %d does interval [%.2f ms, %.2f ms]" % (
+        print("%s %d does interval [%.2f ms, %.2f ms]" % (
+            "Thread" if chunk_size is None else "Chunk",
             i,
             (current * time_step_ns) / 1e6,
             ((current + num_time_steps) * time_step_ns) / 1e6
         ))
 
         list_args.append((
-            output_dynamic_state_dir,
-            epoch,
-            (current + num_time_steps) * time_step_ns + (time_step_ns if (i + 1) != num_threads else 0),
+            (current + num_time_steps) * time_step_ns
+            + (time_step_ns if (i + 1) != len(list_chunk_num_time_steps) else 0),
             time_step_ns,
-            current * time_step_ns,
-            satellites,
-            ground_stations,
-            list_isls,
-            list_gsl_interfaces_info,
-            max_gsl_length_m,
-            max_isl_length_m,
-            dynamic_state_algorithm,
-            print_logs
+            current * time_step_ns
         ))
 
         current += num_time_steps
 
+    # Arguments which affect the dynamic state of a chunk (besides its time steps)
+    chunk_arguments = {
+        "dynamic_state_algorithm": dynamic_state_algorithm,
+        "propagation_mode": propagation_mode,
+        "max_gsl_length_m": max_gsl_length_m,
+        "max_isl_length_m": max_isl_length_m,
+        "isl_period_ns": isl_period_ns if memoize_isl_lengths else None,
+        "incremental_shortest_paths": incremental_shortest_paths,
+        "fstate_format": fstate_format,
+        "fstate_keyframe_interval": fstate_keyframe_interval,
+        "ground_station_pairs": ground_station_pairs,
+        "event_driven": event_driven,
+        "time_steps_ms": list_time_step_ms,
+    }
+    list_chunk_done_content = [
+        chunk_done_content(chunk_end_time_ns, chunk_time_step_ns, chunk_offset_ns, chunk_arguments)
+        for (chunk_end_time_ns, chunk_time_step_ns, chunk_offset_ns) in list_args
+    ]
+
+    # Each chunk has a marker written when it is done (with its time steps and arguments): when resuming, only the
+    # chunks without one with the same content are calculated, else the markers of an earlier call are removed
+    # (all chunks are calculated again)
+    if not resume:
+        for filename in glob.glob(output_dynamic_state_dir + "/chunk_*_done.txt"):
+            os.remove(filename)
+        for directory in list_output_dynamic_state_dir:
+            if os.path.isfile(fstate_merge_done_filename(directory)):
+                os.remove(fstate_merge_done_filename(directory))
+    list_args_to_run = []
+    for i in range(len(list_args)):
+        chunk_offset_ns = list_args[i][2]
+        if resume and is_marker_done(
+                chunk_done_filename(output_dynamic_state_dir, chunk_offset_ns), list_chunk_done_content[i]
+        ):
+            print("%s %d is already done" % ("Thread" if chunk_size is None else "Chunk", i))
+        else:
+            list_args_to_run.append(list_args[i])
+
     # Run in parallel
-    pool = ThreadPool(num_threads)
-    pool.map(worker, list_args)
+    if parallel_mode == "threads":
+
+        # The inputs are read in once and shared by the threads (except for the satellites)
+        pool = ThreadPool(
+            num_threads,
+            initializer=init_thread_worker,
+            initargs=(satellite_network_dir, create_worker_inputs(
+                satellite_network_dir, output_dynamic_state_dir, max_gsl_length_m, max_isl_length_m,
+                dynamic_state_algorithm, print_logs, propagation_mode, ephemeris_positions_m, isl_length_table,
+                incremental_shortest_paths, fstate_format, fstate_keyframe_interval, ground_station_pairs,
+                event_driven, coarser_dynamic_state_dirs
+            ))
+        )
+        worker_function = thread_worker
+    else:
+        pool = ProcessPool(
+            num_threads,
+            initializer=init_process_worker,
+            initargs=(
+                satellite_network_dir, output_dynamic_state_dir, time_step_ms, duration_s, max_gsl_length_m,
+                max_isl_length_m, dynamic_state_algorithm, print_logs, propagation_mode, isl_length_table,
+                incremental_shortest_paths, fstate_format, fstate_keyframe_interval, ground_station_pairs,
+                event_driven, coarser_dynamic_state_dirs
+            )
+        )
+        worker_function = process_worker
+
+    # Only once all its files are written, the marker of a chunk is written
+    for (_, _, chunk_offset_ns) in pool.imap_unordered(worker_function, list_args_to_run, chunksize=1):
+        write_marker(
+            chunk_done_filename(output_dynamic_state_dir, chunk_offset_ns),
+            list_chunk_done_content[[args[2] for args in list_args].index(chunk_offset_ns)]
+        )
     pool.close()
     pool.join()
+
+    # The binary forwarding state of the chunks is merged into a single store for each directory, after which a
+    # marker is written and only then are the parts removed (when resuming, a merge which is done is not repeated)
+    if fstate_format == "binary" and len(list_args) > 0:
+        list_chunk_offset_ns = [chunk_offset_ns for (_, _, chunk_offset_ns) in list_args]
+        for directory in list_output_dynamic_state_dir:
+            if len(list_args_to_run) > 0 \
+                    or not is_marker_done(fstate_merge_done_filename(directory), "".join(list_chunk_done_content)):
+                merge_fstate_store_parts(directory, list_chunk_offset_ns, remove_parts=False)
+                write_marker(fstate_merge_done_filename(directory), "".join(list_chunk_done_content))
+            remove_fstate_store_parts(directory, list_chunk_offset_ns)
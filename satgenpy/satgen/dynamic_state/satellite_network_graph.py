@@ -0,0 +1,245 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def create_isl_graph(num_satellites, list_isls):
+    """
+    Create the structure of the graph of the satellites with their ISLs, which does not change over time.
+    The ISL lengths (edge weights) of a time step are filled in by isl_graph_at().
+
+    :param num_satellites:  Number of satellites
+    :param list_isls:       List of ISLs (each a tuple of two satellite identifiers)
+
+    :return: ISL graph dictionary with the number of ISLs of each satellite ("num_isls_per_sat"), the interface
+             of each satellite to each of its neighbors ("sat_neighbor_to_if"), the adjacency structure
+             (CSR with sorted indices, with the ISL of each edge) and the neighbors of each satellite
+             (in the order in which the ISLs are listed, with the ISL and interfaces of each)
+    """
+
+    # Interfaces are assigned in the order of the ISLs
+    num_isls_per_sat = [0] * num_satellites
+    sat_neighbor_to_if = {}
+    neighbors = [[] for _ in range(num_satellites)]
+    for isl_idx, (a, b) in enumerate(list_isls):
+        sat_neighbor_to_if[(a, b)] = num_isls_per_sat[a]
+        sat_neighbor_to_if[(b, a)] = num_isls_per_sat[b]
+        num_isls_per_sat[a] += 1
+        num_isls_per_sat[b] += 1
+        neighbors[a].append((b, isl_idx))
+        neighbors[b].append((a, isl_idx))
+
+    # Adjacency structure, each ISL in both directions
+    isls = np.array(list_isls, dtype=int).reshape((-1, 2))
+    rows = np.concatenate((isls[:, 0], isls[:, 1]))
+    cols = np.concatenate((isls[:, 1], isls[:, 0]))
+    order = np.lexsort((cols, rows))
+
+    # Neighbors, padded to the same number for each satellite with the non-existent node num_satellites
+    max_num_neighbors = max([1] + num_isls_per_sat)
+    neighbor_ids = np.full((num_satellites, max_num_neighbors), num_satellites)
+    neighbor_isl_idx = np.full((num_satellites, max_num_neighbors), -1)
+    neighbor_my_if = np.full((num_satellites, max_num_neighbors), -1)
+    neighbor_next_hop_if = np.full((num_satellites, max_num_neighbors), -1)
+    for sid in range(num_satellites):
+        for i, (neighbor_id, isl_idx) in enumerate(neighbors[sid]):
+            neighbor_ids[sid][i] = neighbor_id
+            neighbor_isl_idx[sid][i] = isl_idx
+            neighbor_my_if[sid][i] = sat_neighbor_to_if[(sid, neighbor_id)]
+            neighbor_next_hop_if[sid][i] = sat_neighbor_to_if[(neighbor_id, sid)]
+
+    return {
+        "num_nodes": num_satellites,
+        "num_isls_per_sat": num_isls_per_sat,
+        "sat_neighbor_to_if": sat_neighbor_to_if,
+        "indptr": np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=num_satellites)))),
+        "indices": cols[order],
+        "edge_isl_idx": np.tile(np.arange(len(isls)), 2)[order],
+        "neighbor_ids": neighbor_ids,
+        "neighbor_isl_idx": neighbor_isl_idx,
+        "neighbor_my_if": neighbor_my_if,
+        "neighbor_next_hop_if": neighbor_next_hop_if
+    }
+
+
+def isl_graph_at(isl_graph, isl_lengths_m):
+    """
+    Graph of the satellites with their ISLs at a time step.
+
+    :param isl_graph:       ISL graph (see create_isl_graph())
+    :param isl_lengths_m:   Numpy array with the length (m) of each ISL at the time step
+
+    :return: Graph dictionary with the number of nodes ("num_nodes"), the sparse adjacency matrix (CSR with
+             sorted indices) with the edge weights ("adjacency"), and the neighbors of each node in order
+             (padded with the non-existent node num_nodes at zero weight): "neighbor_ids", "neighbor_weights",
+             and the outgoing and incoming interface to each ("neighbor_my_if", "neighbor_next_hop_if")
+    """
+    isl_lengths_m = np.asarray(isl_lengths_m, dtype=float)
+    num_nodes = isl_graph["num_nodes"]
+    isl_lengths_m_padded = np.append(isl_lengths_m, 0.0)
+    return {
+        "num_nodes": num_nodes,
+        "adjacency": csr_matrix(
+            (isl_lengths_m[isl_graph["edge_isl_idx"]], isl_graph["indices"], isl_graph["indptr"]),
+            shape=(num_nodes, num_nodes)
+        ),
+        "neighbor_ids": isl_graph["neighbor_ids"],
+        "neighbor_weights": isl_lengths_m_padded[isl_graph["neighbor_isl_idx"]],
+        "neighbor_my_if": isl_graph["neighbor_my_if"],
+        "neighbor_next_hop_if": isl_graph["neighbor_next_hop_if"]
+    }
+
+
+def gsl_graph_at(num_satellites, num_ground_stations, ground_station_satellites_in_range):
+    """
+    Graph of the satellites and ground stations with only the GSLs at a time step. The neighbors of each
+    node are in ascending order of identifier, which is the order in which the GSLs are added
+    (ground stations in order, each with the satellites in range in ascending order of satellite id).
+
+    :param num_satellites:                      Number of satellites
+    :param num_ground_stations:                 Number of ground stations
+    :param ground_station_satellites_in_range:  List with for each ground station a list of (distance in meters,
+                                                satellite id) of the satellites in range (ascending satellite id)
+
+    :return: Graph dictionary (see isl_graph_at(), without the interfaces)
+    """
+    num_nodes = num_satellites + num_ground_stations
+    sids = np.array([sid for in_range in ground_station_satellites_in_range for (_, sid) in in_range], dtype=int)
+    gs_node_ids = np.repeat(
+        num_satellites + np.arange(num_ground_stations),
+        [len(in_range) for in_range in ground_station_satellites_in_range]
+    ).astype(int)
+    distances_m = np.array(
+        [distance_m for in_range in ground_station_satellites_in_range for (distance_m, _) in in_range], dtype=float
+    )
+    rows = np.concatenate((sids, gs_node_ids))
+    cols = np.concatenate((gs_node_ids, sids))
+    order = np.lexsort((cols, rows))
+    adjacency = csr_matrix(
+        (np.concatenate((distances_m, distances_m))[order], cols[order],
+         np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=num_nodes))))),
+        shape=(num_nodes, num_nodes)
+    )
+    neighbor_ids, neighbor_weights = padded_neighbors_of_adjacency(adjacency)
+    return {
+        "num_nodes": num_nodes,
+        "adjacency": adjacency,
+        "neighbor_ids": neighbor_ids,
+        "neighbor_weights": neighbor_weights
+    }
+
+
+def padded_neighbors_of_adjacency(adjacency):
+    """
+    Retrieve the neighbors of every node in the order of the sparse adjacency matrix, padded to
+    the same number for each node with the non-existent node num_nodes (at zero weight).
+
+    :param adjacency:   Sparse adjacency matrix (CSR) with the edge weights
+
+    :return: Tuple of two numpy arrays of shape (num_nodes, maximum number of neighbors (at least 1)):
+             (neighbor node identifiers, edge weights)
+    """
+    num_nodes = adjacency.shape[0]
+    num_neighbors = np.diff(adjacency.indptr)
+    rows = np.repeat(np.arange(num_nodes), num_neighbors)
+    positions = np.arange(len(rows)) - adjacency.indptr[rows]
+    neighbor_ids = np.full((num_nodes, max(1, num_neighbors.max(initial=0))), num_nodes)
+    neighbor_weights = np.zeros(neighbor_ids.shape)
+    neighbor_ids[rows, positions] = adjacency.indices
+    neighbor_weights[rows, positions] = adjacency.data
+    return neighbor_ids, neighbor_weights
+
+
+def padded_neighbors(graph, num_nodes):
+    """
+    Retrieve the neighbors of every node in the same order as graph.neighbors(), padded to
+    the same number for each node with the non-existent node num_nodes (at zero weight).
+
+    :param graph:       Graph with nodes 0 to (num_nodes - 1) with "weight" on each edge
+    :param num_nodes:   Number of nodes
+
+    :return: Tuple of two numpy arrays of shape (num_nodes, maximum number of neighbors (at least 1)):
+             (neighbor node identifiers, edge weights)
+    """
+    neighbors = [list(graph.adj[node_id].items()) for node_id in range(num_nodes)]
+    max_num_neighbors = max([1] + [len(node_neighbors) for node_neighbors in neighbors])
+    neighbor_ids = np.full((num_nodes, max_num_neighbors), num_nodes)
+    neighbor_weights = np.zeros((num_nodes, max_num_neighbors))
+    for node_id in range(num_nodes):
+        for i, (neighbor_id, attributes) in enumerate(neighbors[node_id]):
+            neighbor_ids[node_id][i] = neighbor_id
+            neighbor_weights[node_id][i] = attributes["weight"]
+    return neighbor_ids, neighbor_weights
+
+
+def graph_from_networkx(graph, num_nodes, sat_neighbor_to_if=None):
+    """
+    Graph dictionary (see isl_graph_at()) of a networkx graph, with the neighbors in the same order.
+
+    :param graph:               Undirected graph with nodes 0 to (num_nodes - 1) with "weight" on each edge
+    :param num_nodes:           Number of nodes
+    :param sat_neighbor_to_if:  Dictionary of (node, neighbor) to the interface of the node to the neighbor,
+                                if given, the interfaces of the edges in it are filled in (else, and for
+                                other edges, they are -1)
+
+    :return: Graph dictionary
+    """
+    if graph.number_of_nodes() != num_nodes:
+        raise ValueError("Number of nodes in the graph does not match: %d != %d" % (graph.number_of_nodes(), num_nodes))
+    adjacency = nx.to_scipy_sparse_array(graph, nodelist=range(num_nodes), weight="weight", format="csr")
+    adjacency.sort_indices()
+    neighbor_ids, neighbor_weights = padded_neighbors(graph, num_nodes)
+    neighbor_my_if = np.full(neighbor_ids.shape, -1)
+    neighbor_next_hop_if = np.full(neighbor_ids.shape, -1)
+    if sat_neighbor_to_if is not None:
+        for node_id in range(num_nodes):
+            for i in range(neighbor_ids.shape[1]):
+                neighbor_id = int(neighbor_ids[node_id][i])
+                if (node_id, neighbor_id) in sat_neighbor_to_if:
+                    neighbor_my_if[node_id][i] = sat_neighbor_to_if[(node_id, neighbor_id)]
+                    neighbor_next_hop_if[node_id][i] = sat_neighbor_to_if[(neighbor_id, node_id)]
+    return {
+        "num_nodes": num_nodes,
+        "adjacency": adjacency,
+        "neighbor_ids": neighbor_ids,
+        "neighbor_weights": neighbor_weights,
+        "neighbor_my_if": neighbor_my_if,
+        "neighbor_next_hop_if": neighbor_next_hop_if
+    }
+
+
+def graph_of(graph, num_nodes, sat_neighbor_to_if=None):
+    """
+    Graph dictionary of a graph which is either already one, or a networkx graph (see graph_from_networkx()).
+
+    :param graph:               Graph dictionary or networkx graph
+    :param num_nodes:           Number of nodes
+    :param sat_neighbor_to_if:  Dictionary of (node, neighbor) to the interface (only used for a networkx graph)
+
+    :return: Graph dictionary
+    """
+    if isinstance(graph, nx.Graph):
+        return graph_from_networkx(graph, num_nodes, sat_neighbor_to_if)
+    return graph
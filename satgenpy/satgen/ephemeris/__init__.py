@@ -0,0 +1,8 @@
+from .generate_ephemeris import generate_ephemeris
+from .read_ephemeris import read_ephemeris
+from .helper_ephemeris import (
+    ephemeris_filename,
+    ephemeris_tles_hash_filename,
+    help_ephemeris,
+    create_propagator_for_network
+)
@@ -0,0 +1,52 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from satgen.distance_tools import create_satellite_propagator, satellite_positions_m_at
+import numpy as np
+
+
+def generate_ephemeris(filename_ephemeris, satellites, epoch, time_step_ns, simulation_end_time_ns):
+    """
+    Generate the ephemeris table, which holds the Earth-fixed Cartesian position of all satellites
+    at every time step. It is stored as a numpy array of shape (number of time steps, number of
+    satellites, 3) with the (x, y, z) in meters, such that it can be memory-mapped when read in.
+    The positions are calculated using SGP-4 (same as the "sgp4" propagation mode).
+
+    :param filename_ephemeris:      Output filename (typically /path/to/ephemeris_<step>ms_for_<duration>s.npy)
+    :param satellites:              List of satellites (ephem.EarthSatellite, as read in by read_tles())
+    :param epoch:                   Epoch (astropy Time) to which time since epoch is relative
+    :param time_step_ns:            Time step (ns)
+    :param simulation_end_time_ns:  Simulation end time (ns), the last time step is strictly before it
+    """
+    if time_step_ns <= 0:
+        raise ValueError("Time step must be positive")
+    num_time_steps = len(range(0, simulation_end_time_ns, time_step_ns))
+
+    # Each time step is written directly to file, such that the entire table does not have to fit in memory
+    propagator = create_satellite_propagator(satellites, epoch, max_cached_time_steps=0)
+    ephemeris_positions_m = np.lib.format.open_memmap(
+        filename_ephemeris, mode="w+", dtype=np.float64, shape=(num_time_steps, len(satellites), 3)
+    )
+    for i in range(num_time_steps):
+        ephemeris_positions_m[i] = satellite_positions_m_at(propagator, i * time_step_ns)
+    ephemeris_positions_m.flush()
+    del ephemeris_positions_m
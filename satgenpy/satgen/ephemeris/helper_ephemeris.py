@@ -0,0 +1,129 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from satgen.tles import read_tles
+from satgen.distance_tools import create_propagator_for_mode
+from .generate_ephemeris import generate_ephemeris
+from .read_ephemeris import read_ephemeris
+import hashlib
+import os
+
+
+def ephemeris_filename(satellite_network_dir, time_step_ms, duration_s):
+    """
+    Filename of the ephemeris table of a satellite network (located next to its tles.txt).
+
+    :param satellite_network_dir:   Satellite network directory
+    :param time_step_ms:            Time step (ms)
+    :param duration_s:              Duration (s)
+
+    :return: Filename of the ephemeris table
+    """
+    return "%s/ephemeris_%dms_for_%ds.npy" % (satellite_network_dir, time_step_ms, duration_s)
+
+
+def ephemeris_tles_hash_filename(filename_ephemeris):
+    """
+    Filename of the hash of the TLEs from which an ephemeris table was generated (located next to it).
+
+    :param filename_ephemeris:  Filename of the ephemeris table
+
+    :return: Filename of the TLEs hash
+    """
+    return filename_ephemeris[:-len(".npy")] + "_tles_sha256.txt"
+
+
+def tles_hash(filename_tles):
+    """
+    Hash of the content of a TLEs file.
+
+    :param filename_tles:   Filename of the TLEs
+
+    :return: SHA-256 hexadecimal digest of the file content
+    """
+    with open(filename_tles, "rb") as f_in:
+        return hashlib.sha256(f_in.read()).hexdigest()
+
+
+def help_ephemeris(satellite_network_dir, time_step_ms, duration_s):
+    """
+    Retrieve the ephemeris table of a satellite network, generating it first if it does not yet exist
+    or if it was generated from other TLEs (of which the hash is stored next to it).
+
+    :param satellite_network_dir:   Satellite network directory
+    :param time_step_ms:            Time step (ms)
+    :param duration_s:              Duration (s)
+
+    :return: Memory-mapped ephemeris table (see read_ephemeris())
+    """
+    tles = read_tles(satellite_network_dir + "/tles.txt")
+    filename_ephemeris = ephemeris_filename(satellite_network_dir, time_step_ms, duration_s)
+    filename_tles_hash = ephemeris_tles_hash_filename(filename_ephemeris)
+    current_tles_hash = tles_hash(satellite_network_dir + "/tles.txt")
+    stored_tles_hash = None
+    if os.path.isfile(filename_tles_hash):
+        with open(filename_tles_hash, "r") as f_in:
+            stored_tles_hash = f_in.read().strip()
+    if not os.path.isfile(filename_ephemeris) or stored_tles_hash != current_tles_hash:
+
+        # Written to a temporary file first, such that an interrupted generation does not leave a partial table
+        print("Generating ephemeris table: " + filename_ephemeris)
+        filename_ephemeris_tmp = filename_ephemeris + ".tmp.npy"
+        generate_ephemeris(
+            filename_ephemeris_tmp,
+            tles["satellites"],
+            tles["epoch"],
+            time_step_ms * 1000 * 1000,
+            duration_s * 1000 * 1000 * 1000
+        )
+        os.replace(filename_ephemeris_tmp, filename_ephemeris)
+
+        # The hash is only written once the table is, such that a table never has the hash of other TLEs
+        with open(filename_tles_hash + ".tmp", "w+") as f_out:
+            f_out.write(current_tles_hash + "\n")
+        os.replace(filename_tles_hash + ".tmp", filename_tles_hash)
+
+    return read_ephemeris(filename_ephemeris, len(tles["satellites"]))
+
+
+def create_propagator_for_network(propagation_mode, satellite_network_dir, time_step_ms, duration_s,
+                                  satellites, epoch):
+    """
+    Create the propagator belonging to a propagation mode for a satellite network.
+    In the "ephemeris" propagation mode, the ephemeris table of the network is used
+    (and generated first if it does not yet exist).
+
+    :param propagation_mode:        Propagation mode ("ephem", "sgp4" or "ephemeris")
+    :param satellite_network_dir:   Satellite network directory
+    :param time_step_ms:            Time step (ms)
+    :param duration_s:              Duration (s)
+    :param satellites:              List of satellites (ephem.EarthSatellite, as read in by read_tles())
+    :param epoch:                   Epoch (astropy Time) to which time since epoch is relative
+
+    :return: Propagator dictionary, or None if each distance is calculated individually by ephem
+    """
+    ephemeris_positions_m = None
+    if propagation_mode == "ephemeris":
+        ephemeris_positions_m = help_ephemeris(satellite_network_dir, time_step_ms, duration_s)
+    return create_propagator_for_mode(
+        propagation_mode, satellites, epoch, ephemeris_positions_m, time_step_ms * 1000 * 1000
+    )
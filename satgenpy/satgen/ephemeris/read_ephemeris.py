@@ -0,0 +1,43 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+
+
+def read_ephemeris(filename_ephemeris, num_satellites):
+    """
+    Read the ephemeris table as a read-only memory-mapped array.
+
+    :param filename_ephemeris:  Filename of the ephemeris table (typically /path/to/ephemeris_<step>ms_for_<duration>s.npy)
+    :param num_satellites:      Number of satellites (to verify the shape)
+
+    :return: Memory-mapped numpy array of shape (number of time steps, number of satellites, 3)
+             with the Earth-fixed (x, y, z) of each satellite in meters
+    """
+    ephemeris_positions_m = np.load(filename_ephemeris, mmap_mode="r")
+    if len(ephemeris_positions_m.shape) != 3 or ephemeris_positions_m.shape[2] != 3:
+        raise ValueError("Ephemeris table must be of shape (time steps, satellites, 3)")
+    if ephemeris_positions_m.shape[1] != num_satellites:
+        raise ValueError("Ephemeris table has %d satellites, expected %d" % (
+            ephemeris_positions_m.shape[1], num_satellites
+        ))
+    return ephemeris_positions_m
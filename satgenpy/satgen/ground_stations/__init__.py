@@ -1,8 +1,15 @@
 from .read_ground_stations import (
     read_ground_stations_basic,
-    read_ground_stations_extended
+    read_ground_stations_extended,
+    read_ground_stations_basic_arrays,
+    read_ground_stations_extended_arrays
+)
+from .write_ground_stations import (
+    write_ground_stations_basic,
+    write_ground_stations_extended
 )
 from .extend_ground_stations import (
     read_ground_stations_extended,
     extend_ground_stations
 )
+from .ground_station_distance_matrices import read_ground_station_distance_matrices
@@ -0,0 +1,79 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from satgen.distance_tools import (
+    geodesic_distance_m_matrix_between_ground_stations,
+    straight_distance_m_matrix_between_ground_stations
+)
+from .read_ground_stations import read_ground_stations_basic, read_ground_stations_extended
+import os
+
+
+# Distance matrices of ground station files which were already read in:
+# (real path, modification time, size) -> distance matrices
+_distance_matrices_cache = {}
+
+
+def read_ground_station_distance_matrices(filename_ground_stations):
+    """
+    Retrieve the geodesic and straight distance between every pair of ground stations of a ground
+    stations file (basic or extended). They are only calculated the first time a file is read in,
+    or if it was modified since.
+
+    :param filename_ground_stations: Filename of ground stations (typically /path/to/ground_stations.txt)
+
+    :return: Dictionary: {
+                    "geodesic_distance_m":  Read-only numpy array (number of ground stations squared)
+                                            with the geodesic distance between each pair
+                    "straight_distance_m":  Read-only numpy array (number of ground stations squared)
+                                            with the straight distance between each pair
+              }
+    """
+    stat = os.stat(filename_ground_stations)
+    key = (os.path.realpath(filename_ground_stations), stat.st_mtime_ns, stat.st_size)
+    if key in _distance_matrices_cache:
+        return _distance_matrices_cache[key]
+
+    # Basic ground stations have 5 columns, extended ones have 8
+    with open(filename_ground_stations, "r") as f:
+        first_line = f.readline()
+    if len(first_line.split(",")) == 8:
+        ground_stations = read_ground_stations_extended(filename_ground_stations)
+    else:
+        ground_stations = read_ground_stations_basic(filename_ground_stations)
+
+    # Calculate both at once
+    geodesic_distance_m = geodesic_distance_m_matrix_between_ground_stations(ground_stations)
+    straight_distance_m = straight_distance_m_matrix_between_ground_stations(ground_stations, geodesic_distance_m)
+    geodesic_distance_m.flags.writeable = False
+    straight_distance_m.flags.writeable = False
+    distance_matrices = {
+        "geodesic_distance_m": geodesic_distance_m,
+        "straight_distance_m": straight_distance_m,
+    }
+
+    # Only the latest version of a file is kept
+    for cached_key in list(_distance_matrices_cache.keys()):
+        if cached_key[0] == key[0]:
+            del _distance_matrices_cache[cached_key]
+    _distance_matrices_cache[key] = distance_matrices
+    return distance_matrices
@@ -20,6 +20,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import numpy as np
+
 
 def read_ground_stations_basic(filename_ground_stations_basic):
     """
@@ -80,3 +82,94 @@ def read_ground_stations_extended(filename_ground_stations_extended):
             ground_stations_extended.append(ground_station_basic)
             gid += 1
     return ground_stations_extended
+
+
+def _read_ground_station_columns(filename_ground_stations, num_columns, error_message):
+    """
+    Reads all lines of a ground station file at once and splits them into columns.
+
+    :param filename_ground_stations:    Filename of ground stations
+    :param num_columns:                 Number of columns each line must have
+    :param error_message:               Message of the ValueError if a line does not have that number of columns
+
+    :return: List of columns, each a list of strings (one per ground station)
+    """
+    with open(filename_ground_stations, 'r') as f:
+        lines = f.read().split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    for line in lines:
+        if line.count(",") != num_columns - 1:
+            raise ValueError(error_message)
+    if len(lines) == 0:
+        return [[] for _ in range(num_columns)]
+
+    # All fields in one list, of which every column is a slice
+    fields = ",".join(lines).split(",")
+    columns = [fields[i::num_columns] for i in range(num_columns)]
+    if not np.array_equal(np.fromiter(map(int, columns[0]), dtype=int, count=len(lines)), np.arange(len(lines))):
+        raise ValueError("Ground station id must increment each line")
+    return columns
+
+
+def _float_column(column):
+    return np.fromiter(map(float, column), dtype=float, count=len(column))
+
+
+def read_ground_stations_basic_arrays(filename_ground_stations_basic):
+    """
+    Reads ground stations from the input file into arrays (one per column) rather than
+    a dictionary per ground station, which is faster for large numbers of ground stations.
+
+    :param filename_ground_stations_basic: Filename of ground stations basic (typically /path/to/ground_stations.txt)
+
+    :return: Dictionary: {
+                    "gid":                      Numpy array of ground station identifiers
+                    "name":                     List of names
+                    "latitude_degrees_str":     List of latitudes (as read in)
+                    "longitude_degrees_str":    List of longitudes (as read in)
+                    "elevation_m_float":        Numpy array of elevations in meters
+             }
+    """
+    columns = _read_ground_station_columns(
+        filename_ground_stations_basic, 5, "Basic ground station file has 5 columns"
+    )
+    return {
+        "gid": np.arange(len(columns[0])),
+        "name": columns[1],
+        "latitude_degrees_str": columns[2],
+        "longitude_degrees_str": columns[3],
+        "elevation_m_float": _float_column(columns[4]),
+    }
+
+
+def read_ground_stations_extended_arrays(filename_ground_stations_extended):
+    """
+    Reads ground stations from the input file into arrays (one per column) rather than
+    a dictionary per ground station, which is faster for large numbers of ground stations.
+
+    :param filename_ground_stations_extended: Filename of ground stations extended (typically /path/to/ground_stations.txt)
+
+    :return: Dictionary: {
+                    "gid":                      Numpy array of ground station identifiers
+                    "name":                     List of names
+                    "latitude_degrees_str":     List of latitudes (as read in)
+                    "longitude_degrees_str":    List of longitudes (as read in)
+                    "elevation_m_float":        Numpy array of elevations in meters
+                    "cartesian":                Numpy array of shape (number of ground stations, 3) with (x, y, z)
+             }
+    """
+    columns = _read_ground_station_columns(
+        filename_ground_stations_extended, 8, "Extended ground station file has 8 columns"
+    )
+    cartesian = np.empty((len(columns[0]), 3))
+    for i in range(3):
+        cartesian[:, i] = _float_column(columns[5 + i])
+    return {
+        "gid": np.arange(len(columns[0])),
+        "name": columns[1],
+        "latitude_degrees_str": columns[2],
+        "longitude_degrees_str": columns[3],
+        "elevation_m_float": _float_column(columns[4]),
+        "cartesian": cartesian,
+    }
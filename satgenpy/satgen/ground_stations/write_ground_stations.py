@@ -0,0 +1,92 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+
+
+def _format_lines(line_format, columns):
+    """
+    Format all lines at once, by interleaving the columns into one flat sequence of values.
+
+    :param line_format: Format of a single line (e.g., "%d,%s\\n")
+    :param columns:     List of columns (each a list of values, all of equal length)
+
+    :return: String of all formatted lines
+    """
+    num_columns = len(columns)
+    values = [None] * (num_columns * len(columns[0]))
+    for i in range(num_columns):
+        values[i::num_columns] = columns[i]
+    return (line_format * len(columns[0])) % tuple(values)
+
+
+def write_ground_stations_basic(filename_ground_stations_basic_out, names, latitudes_degrees, longitudes_degrees,
+                                elevations_m):
+    """
+    Writes ground stations in the basic format (gid,name,latitude,longitude,elevation) all at once.
+    Ground station identifiers are assigned in order starting at 0.
+
+    :param filename_ground_stations_basic_out:  Output filename of ground stations basic
+    :param names:                               List of names
+    :param latitudes_degrees:                   Latitudes in degrees (written as-is, so either strings or floats)
+    :param longitudes_degrees:                  Longitudes in degrees (written as-is, so either strings or floats)
+    :param elevations_m:                        Elevations in meters (written as-is, so either strings or floats)
+    """
+    if not (len(names) == len(latitudes_degrees) == len(longitudes_degrees) == len(elevations_m)):
+        raise ValueError("Names, latitudes, longitudes and elevations must be of equal length")
+    with open(filename_ground_stations_basic_out, "w+") as f_out:
+        f_out.write(_format_lines(
+            "%d,%s,%s,%s,%s\n",
+            [range(len(names)), list(names), list(latitudes_degrees), list(longitudes_degrees), list(elevations_m)]
+        ))
+
+
+def write_ground_stations_extended(filename_ground_stations_extended_out, names, latitudes_degrees,
+                                   longitudes_degrees, elevations_m, cartesian):
+    """
+    Writes ground stations in the extended format (gid,name,latitude,longitude,elevation,x,y,z) all at once.
+    Ground station identifiers are assigned in order starting at 0.
+
+    :param filename_ground_stations_extended_out:   Output filename of ground stations extended
+    :param names:                                   List of names
+    :param latitudes_degrees:                       Latitudes in degrees (array-like of floats)
+    :param longitudes_degrees:                      Longitudes in degrees (array-like of floats)
+    :param elevations_m:                            Elevations in meters (array-like of floats)
+    :param cartesian:                               Array of shape (number of ground stations, 3) with (x, y, z)
+    """
+    if not (len(names) == len(latitudes_degrees) == len(longitudes_degrees) == len(elevations_m) == len(cartesian)):
+        raise ValueError("Names, latitudes, longitudes, elevations and Cartesian coordinates must be of equal length")
+    with open(filename_ground_stations_extended_out, "w+") as f_out:
+        cartesian = np.asarray(cartesian, dtype=float).reshape(-1, 3)
+        f_out.write(_format_lines(
+            "%d,%s,%f,%f,%f,%f,%f,%f\n",
+            [
+                range(len(names)),
+                list(names),
+                list(latitudes_degrees),
+                list(longitudes_degrees),
+                list(elevations_m),
+                cartesian[:, 0].tolist(),
+                cartesian[:, 1].tolist(),
+                cartesian[:, 2].tolist()
+            ]
+        ))
@@ -3,6 +3,7 @@ from .analyze_path import analyze_path
 from .analyze_rtt import analyze_rtt
 from .analyze_time_step_path import analyze_time_step_path
 from .print_graphical_routes_and_rtt import print_graphical_routes_and_rtt
+from .routes_and_rtt_in_memory import routes_and_rtt_in_memory
 from .graph_tools import (
     construct_graph_with_distances,
     compute_path_length_with_graph,
@@ -23,6 +23,7 @@
 from .graph_tools import *
 from satgen.ground_stations import *
 from satgen.tles import *
+from satgen.dynamic_state import read_fstate_store, read_fstate_updates
 import exputil
 import numpy as np
 from .print_routes_and_rtt import print_routes_and_rtt
@@ -71,6 +72,9 @@ def analyze_path(
     time_step_num_path_changes = []
     time_step_num_fstate_updates = []
 
+    # Forwarding state is read from the binary store if there is one, else from the fstate_<t>.txt files
+    fstate_store = read_fstate_store(satellite_network_dynamic_state_dir)
+
     # For each time moment
     fstate = {}
     num_iterations = simulation_end_time_ns / dynamic_state_update_interval_ns
@@ -80,29 +84,24 @@ def analyze_path(
         num_fstate_updates = 0
 
         # Read in forwarding state
-        with open(satellite_network_dynamic_state_dir + "/fstate_" + str(t) + ".txt", "r") as f_in:
-            for line in f_in:
-                spl = line.split(",")
-                current = int(spl[0])
-                destination = int(spl[1])
-                next_hop = int(spl[2])
-                fstate[(current, destination)] = next_hop
-                num_fstate_updates += 1
-
-            # Go over each pair of ground stations and calculate the length
-            for src in range(len(ground_stations)):
-                for dst in range(src + 1, len(ground_stations)):
-                    src_node_id = len(satellites) + src
-                    dst_node_id = len(satellites) + dst
-                    path = get_path(src_node_id, dst_node_id, fstate)
-                    if path is None:
-                        if len(path_list_per_pair[src][dst]) == 0 or path_list_per_pair[src][dst][-1] != []:
-                            path_list_per_pair[src][dst].append([])
-                            num_path_changes += 1
-                    else:
-                        if len(path_list_per_pair[src][dst]) == 0 or path != path_list_per_pair[src][dst][-1]:
-                            path_list_per_pair[src][dst].append(path)
-                            num_path_changes += 1
+        for fstate_update in read_fstate_updates(satellite_network_dynamic_state_dir, t, fstate_store):
+            fstate[(fstate_update[0], fstate_update[1])] = fstate_update[2]
+            num_fstate_updates += 1
+
+        # Go over each pair of ground stations and calculate the length
+        for src in range(len(ground_stations)):
+            for dst in range(src + 1, len(ground_stations)):
+                src_node_id = len(satellites) + src
+                dst_node_id = len(satellites) + dst
+                path = get_path(src_node_id, dst_node_id, fstate)
+                if path is None:
+                    if len(path_list_per_pair[src][dst]) == 0 or path_list_per_pair[src][dst][-1] != []:
+                        path_list_per_pair[src][dst].append([])
+                        num_path_changes += 1
+                else:
+                    if len(path_list_per_pair[src][dst]) == 0 or path != path_list_per_pair[src][dst][-1]:
+                        path_list_per_pair[src][dst].append(path)
+                        num_path_changes += 1
 
         # First iteration has an update for all, which is not interesting
         # to show in the ECDF and is not really a "change" / "update"
@@ -25,6 +25,8 @@ from satgen.distance_tools import *
 from satgen.isls import *
 from satgen.ground_stations import *
 from satgen.tles import *
+from satgen.dynamic_state import read_fstate_store, read_fstate_updates
+from satgen.ephemeris import create_propagator_for_network
 import exputil
 import numpy as np
 from .print_routes_and_rtt import print_routes_and_rtt
@@ -38,7 +40,7 @@ GEODESIC_ECDF_PLOT_CUTOFF_KM = 500
 
 def analyze_rtt(
         output_data_dir, satellite_network_dir, dynamic_state_update_interval_ms,
-        simulation_end_time_s, satgenpy_dir_with_ending_slash
+        simulation_end_time_s, satgenpy_dir_with_ending_slash, propagation_mode="ephem"
 ):
 
     # Dynamic state directory
@@ -73,6 +75,12 @@ def analyze_rtt(
     max_gsl_length_m = exputil.parse_positive_float(description.get_property_or_fail("max_gsl_length_m"))
     max_isl_length_m = exputil.parse_positive_float(description.get_property_or_fail("max_isl_length_m"))
 
+    # Satellite positions are shared by all distance calculations within a time moment
+    propagator = create_propagator_for_network(
+        propagation_mode, satellite_network_dir, dynamic_state_update_interval_ms, simulation_end_time_s,
+        satellites, epoch
+    )
+
     # Analysis
     rtt_list_per_pair = []
     for i in range(len(ground_stations)):
@@ -82,6 +90,9 @@ def analyze_rtt(
         rtt_list_per_pair.append(temp_list)
     unreachable_per_pair = np.zeros((len(ground_stations), len(ground_stations)))
 
+    # Forwarding state is read from the binary store if there is one, else from the fstate_<t>.txt files
+    fstate_store = read_fstate_store(satellite_network_dynamic_state_dir)
+
     # For each time moment
     fstate = {}
     num_iterations = simulation_end_time_ns / dynamic_state_update_interval_ns
@@ -89,29 +100,25 @@ def analyze_rtt(
     for t in range(0, simulation_end_time_ns, dynamic_state_update_interval_ns):
 
         # Read in forwarding state
-        with open(satellite_network_dynamic_state_dir + "/fstate_" + str(t) + ".txt", "r") as f_in:
-            for line in f_in:
-                spl = line.split(",")
-                current = int(spl[0])
-                destination = int(spl[1])
-                next_hop = int(spl[2])
-                fstate[(current, destination)] = next_hop
-
-            # Given we are going to graph often, we can pre-compute the edge lengths
-            graph_with_distance = construct_graph_with_distances(epoch, t, satellites, ground_stations,
-                                                                 list_isls, max_gsl_length_m, max_isl_length_m)
-
-            # Go over each pair of ground stations and calculate the length
-            for src in range(len(ground_stations)):
-                for dst in range(src + 1, len(ground_stations)):
-                    src_node_id = len(satellites) + src
-                    dst_node_id = len(satellites) + dst
-                    path = get_path(src_node_id, dst_node_id, fstate)
-                    if path is None:
-                        unreachable_per_pair[(src, dst)] += 1
-                    else:
-                        length_path_m = compute_path_length_with_graph(path, graph_with_distance)
-                        rtt_list_per_pair[src][dst].append((2 * length_path_m) * 1000000000.0 / SPEED_OF_LIGHT_M_PER_S)
+        for fstate_update in read_fstate_updates(satellite_network_dynamic_state_dir, t, fstate_store):
+            fstate[(fstate_update[0], fstate_update[1])] = fstate_update[2]
+
+        # Given we are going to graph often, we can pre-compute the edge lengths
+        graph_with_distance = construct_graph_with_distances(epoch, t, satellites, ground_stations,
+                                                             list_isls, max_gsl_length_m, max_isl_length_m,
+                                                             satellite_positions_m_or_none_at(propagator, t))
+
+        # Go over each pair of ground stations and calculate the length
+        for src in range(len(ground_stations)):
+            for dst in range(src + 1, len(ground_stations)):
+                src_node_id = len(satellites) + src
+                dst_node_id = len(satellites) + dst
+                path = get_path(src_node_id, dst_node_id, fstate)
+                if path is None:
+                    unreachable_per_pair[(src, dst)] += 1
+                else:
+                    length_path_m = compute_path_length_with_graph(path, graph_with_distance)
+                    rtt_list_per_pair[src][dst].append((2 * length_path_m) * 1000000000.0 / SPEED_OF_LIGHT_M_PER_S)
 
         # Show progress a bit
         print("%d / %d" % (it, num_iterations))
@@ -128,6 +135,9 @@ def analyze_rtt(
     list_max_minus_min_rtt_ns = []
     list_max_rtt_to_min_rtt_slowdown = []
     list_max_rtt_to_geodesic_slowdown = []
+    geodesic_distance_m_matrix = read_ground_station_distance_matrices(
+        satellite_network_dir + "/ground_stations.txt"
+    )["geodesic_distance_m"]
     for src in range(len(ground_stations)):
         for dst in range(src + 1, len(ground_stations)):
             min_rtt_ns = np.min(rtt_list_per_pair[src][dst])
@@ -137,10 +147,7 @@ def analyze_rtt(
             list_max_rtt_ns.append(max_rtt_ns)
             list_max_minus_min_rtt_ns.append(max_rtt_ns - min_rtt_ns)
             list_max_rtt_to_min_rtt_slowdown.append(max_rtt_slowdown)
-            geodesic_distance_m = geodesic_distance_m_between_ground_stations(
-                ground_stations[src],
-                ground_stations[dst]
-            )
+            geodesic_distance_m = geodesic_distance_m_matrix[src][dst]
             # If the geodesic is under 500km, we do not consider it,
             # as one would use terrestrial networks vs. expending the effort to go up and down
             # Especially if populated cities are very close to each other, would this give a large geodesic slow-down
@@ -191,7 +198,8 @@ def analyze_rtt(
                 ))
                 print_routes_and_rtt(base_output_dir, satellite_network_dir, dynamic_state_update_interval_ms,
                                      simulation_end_time_s, len(satellites) + largest_rtt_delta_list[i][3],
-                                     len(satellites) + largest_rtt_delta_list[i][4], satgenpy_dir_with_ending_slash)
+                                     len(satellites) + largest_rtt_delta_list[i][4], satgenpy_dir_with_ending_slash,
+                                     propagation_mode)
                 already_plotted_nodes.add(largest_rtt_delta_list[i][3])
                 already_plotted_nodes.add(largest_rtt_delta_list[i][4])
                 num_plotted += 1
@@ -223,7 +231,8 @@ def analyze_rtt(
                 ))
                 print_routes_and_rtt(base_output_dir, satellite_network_dir, dynamic_state_update_interval_ms,
                                      simulation_end_time_s, len(satellites) + most_unreachable_list[i][1],
-                                     len(satellites) + most_unreachable_list[i][2], satgenpy_dir_with_ending_slash)
+                                     len(satellites) + most_unreachable_list[i][2], satgenpy_dir_with_ending_slash,
+                                     propagation_mode)
                 already_plotted_nodes.add(most_unreachable_list[i][1])
                 already_plotted_nodes.add(most_unreachable_list[i][2])
                 num_plotted += 1
@@ -23,6 +23,7 @@
 from .graph_tools import *
 from satgen.ground_stations import *
 from satgen.tles import *
+from satgen.dynamic_state import read_fstate_store, read_fstate_updates
 import exputil
 from statsmodels.distributions.empirical_distribution import ECDF
 
@@ -74,6 +75,9 @@ def analyze_time_step_path(output_data_dir, satellite_network_dir,
             path_list_per_pair.append(temp_list)
         per_dyn_state_path_list_per_pair.append(path_list_per_pair)
 
+    # Forwarding state is read from the binary store if there is one, else from the fstate_<t>.txt files
+    fstate_stores = [read_fstate_store(c[1]) for c in configs]
+
     # For each time moment
     fstate = {}
     smallest_step_ns = min(multiple_dynamic_state_update_interval_ms) * 1000 * 1000
@@ -86,29 +90,24 @@ def analyze_time_step_path(output_data_dir, satellite_network_dir,
             if t % (c[0] * 1000 * 1000) == 0:
 
                 # Read in forwarding state
-                with open(c[1] + "/fstate_" + str(t) + ".txt", "r") as f_in:
-                    for line in f_in:
-                        spl = line.split(",")
-                        current = int(spl[0])
-                        destination = int(spl[1])
-                        next_hop = int(spl[2])
-                        fstate[(current, destination)] = next_hop
-
-                    # Go over each pair of ground stations and calculate the length
-                    for src in range(len(ground_stations)):
-                        for dst in range(src + 1, len(ground_stations)):
-                            src_node_id = len(satellites) + src
-                            dst_node_id = len(satellites) + dst
-                            path = get_path(src_node_id, dst_node_id, fstate)
-                            path_list_per_pair = per_dyn_state_path_list_per_pair[c_idx]
-                            if path is None:
-                                if len(path_list_per_pair[src][dst]) == 0 or [] != path_list_per_pair[src][dst][-1][0]:
-                                    path_list_per_pair[src][dst].append(([], t))
-
-                            else:
-                                if len(path_list_per_pair[src][dst]) == 0 \
-                                        or path != path_list_per_pair[src][dst][-1][0]:
-                                    path_list_per_pair[src][dst].append((path, t))
+                for fstate_update in read_fstate_updates(c[1], t, fstate_stores[c_idx]):
+                    fstate[(fstate_update[0], fstate_update[1])] = fstate_update[2]
+
+                # Go over each pair of ground stations and calculate the length
+                for src in range(len(ground_stations)):
+                    for dst in range(src + 1, len(ground_stations)):
+                        src_node_id = len(satellites) + src
+                        dst_node_id = len(satellites) + dst
+                        path = get_path(src_node_id, dst_node_id, fstate)
+                        path_list_per_pair = per_dyn_state_path_list_per_pair[c_idx]
+                        if path is None:
+                            if len(path_list_per_pair[src][dst]) == 0 or [] != path_list_per_pair[src][dst][-1][0]:
+                                path_list_per_pair[src][dst].append(([], t))
+
+                        else:
+                            if len(path_list_per_pair[src][dst]) == 0 \
+                                    or path != path_list_per_pair[src][dst][-1][0]:
+                                path_list_per_pair[src][dst].append((path, t))
 
             c_idx += 1
 
@@ -22,23 +22,38 @@
 
 from satgen.distance_tools import *
 import networkx as nx
-from astropy import units as u
+import numpy as np
 
 
 def construct_graph_with_distances(epoch, time_since_epoch_ns, satellites, ground_stations, list_isls,
-                                   max_gsl_length_m, max_isl_length_m):
+                                   max_gsl_length_m, max_isl_length_m, satellite_positions_m=None):
 
-    # Time
-    time = epoch + time_since_epoch_ns * u.ns
+    # Time (as ephem dates, such that they are not parsed again for every distance calculation)
+    ephem_epoch = ephem_date_at(epoch, 0)
+    ephem_time = ephem_date_at(epoch, time_since_epoch_ns)
 
     # Graph
     sat_net_graph_with_gs = nx.Graph()
 
+    # With the satellite positions given, all distances can be calculated at once
+    isl_lengths_m = None
+    gsl_satellites_in_range = None
+    if satellite_positions_m is not None:
+        isl_lengths_m = distances_m_between_satellites(satellite_positions_m, list_isls)
+        gsl_satellites_in_range = satellites_in_range_of_ground_stations(
+            ground_station_positions_m(ground_stations),
+            satellite_positions_m,
+            max_gsl_length_m
+        )
+
     # ISLs
-    for (a, b) in list_isls:
+    for isl_idx, (a, b) in enumerate(list_isls):
 
         # Only ISLs which are close enough are considered
-        sat_distance_m = distance_m_between_satellites(satellites[a], satellites[b], str(epoch), str(time))
+        if isl_lengths_m is not None:
+            sat_distance_m = float(isl_lengths_m[isl_idx])
+        else:
+            sat_distance_m = distance_m_between_satellites(satellites[a], satellites[b], ephem_epoch, ephem_time)
         if sat_distance_m <= max_isl_length_m:
             sat_net_graph_with_gs.add_edge(
                 a, b, weight=sat_distance_m
@@ -48,10 +63,16 @@ def construct_graph_with_distances(epoch, time_since_epoch_ns, satellites, groun
     for ground_station in ground_stations:
 
         # Find satellites in range
-        for sid in range(len(satellites)):
-            distance_m = distance_m_ground_station_to_satellite(ground_station, satellites[sid], str(epoch), str(time))
-            if distance_m <= max_gsl_length_m:
+        if gsl_satellites_in_range is not None:
+            for (distance_m, sid) in gsl_satellites_in_range[ground_station["gid"]]:
                 sat_net_graph_with_gs.add_edge(len(satellites) + ground_station["gid"], sid, weight=distance_m)
+        else:
+            for sid in range(len(satellites)):
+                distance_m = distance_m_ground_station_to_satellite(
+                    ground_station, satellites[sid], ephem_epoch, ephem_time
+                )
+                if distance_m <= max_gsl_length_m:
+                    sat_net_graph_with_gs.add_edge(len(satellites) + ground_station["gid"], sid, weight=distance_m)
 
     return sat_net_graph_with_gs
 
@@ -61,10 +82,11 @@ def compute_path_length_with_graph(path, graph):
 
 
 def compute_path_length_without_graph(path, epoch, time_since_epoch_ns, satellites, ground_stations, list_isls,
-                                      max_gsl_length_m, max_isl_length_m):
+                                      max_gsl_length_m, max_isl_length_m, satellite_positions_m=None):
 
-    # Time
-    time = epoch + time_since_epoch_ns * u.ns
+    # Time (as ephem dates, such that they are not parsed again for every distance calculation)
+    ephem_epoch = ephem_date_at(epoch, 0)
+    ephem_time = ephem_date_at(epoch, time_since_epoch_ns)
 
     # Go hop-by-hop and compute
     path_length_m = 0.0
@@ -75,12 +97,17 @@ def compute_path_length_without_graph(path, epoch, time_since_epoch_ns, satellit
         
         # Satellite to satellite
         if from_node_id < len(satellites) and to_node_id < len(satellites):
-            sat_distance_m = distance_m_between_satellites(
-                satellites[from_node_id],
-                satellites[to_node_id],
-                str(epoch),
-                str(time)
-            )
+            if satellite_positions_m is not None:
+                sat_distance_m = float(np.linalg.norm(
+                    satellite_positions_m[from_node_id] - satellite_positions_m[to_node_id]
+                ))
+            else:
+                sat_distance_m = distance_m_between_satellites(
+                    satellites[from_node_id],
+                    satellites[to_node_id],
+                    ephem_epoch,
+                    ephem_time
+                )
             if sat_distance_m > max_isl_length_m \
                     or ((to_node_id, from_node_id) not in list_isls and (from_node_id, to_node_id) not in list_isls):
                 raise ValueError("Invalid ISL hop")
@@ -89,12 +116,17 @@ def compute_path_length_without_graph(path, epoch, time_since_epoch_ns, satellit
         # Ground station to satellite
         elif from_node_id >= len(satellites) and to_node_id < len(satellites):
             ground_station = ground_stations[from_node_id - len(satellites)]
-            distance_m = distance_m_ground_station_to_satellite(
-                ground_station,
-                satellites[to_node_id],
-                str(epoch),
-                str(time)
-            )
+            if satellite_positions_m is not None:
+                distance_m = float(np.linalg.norm(
+                    ground_station_positions_m([ground_station])[0] - satellite_positions_m[to_node_id]
+                ))
+            else:
+                distance_m = distance_m_ground_station_to_satellite(
+                    ground_station,
+                    satellites[to_node_id],
+                    ephem_epoch,
+                    ephem_time
+                )
             if distance_m > max_gsl_length_m:
                 raise ValueError("Invalid GSL hop from " + str(from_node_id) + " to " + str(to_node_id)
                                  + " (" + str(distance_m) + " larger than " + str(max_gsl_length_m) + ")")
@@ -103,12 +135,17 @@ def compute_path_length_without_graph(path, epoch, time_since_epoch_ns, satellit
         # Satellite to ground station
         elif from_node_id < len(satellites) and to_node_id >= len(satellites):
             ground_station = ground_stations[to_node_id - len(satellites)]
-            distance_m = distance_m_ground_station_to_satellite(
-                ground_station,
-                satellites[from_node_id],
-                str(epoch),
-                str(time)
-            )
+            if satellite_positions_m is not None:
+                distance_m = float(np.linalg.norm(
+                    ground_station_positions_m([ground_station])[0] - satellite_positions_m[from_node_id]
+                ))
+            else:
+                distance_m = distance_m_ground_station_to_satellite(
+                    ground_station,
+                    satellites[from_node_id],
+                    ephem_epoch,
+                    ephem_time
+                )
             if distance_m > max_gsl_length_m:
                 raise ValueError("Invalid GSL hop from " + str(from_node_id) + " to " + str(to_node_id)
                                  + " (" + str(distance_m) + " larger than " + str(max_gsl_length_m) + ")")
@@ -24,12 +24,15 @@ from .graph_tools import *
 from satgen.isls import *
 from satgen.ground_stations import *
 from satgen.tles import *
+from satgen.dynamic_state import read_fstate_store, read_fstate_updates
+from satgen.ephemeris import create_propagator_for_network
 import exputil
 import tempfile
 
 
 def print_routes_and_rtt(base_output_dir, satellite_network_dir, dynamic_state_update_interval_ms,
-                         simulation_end_time_s, src, dst, satgenpy_dir_with_ending_slash):
+                         simulation_end_time_s, src, dst, satgenpy_dir_with_ending_slash,
+                         propagation_mode="ephem"):
 
     # Local shell
     local_shell = exputil.LocalShell()
@@ -59,62 +62,69 @@ def print_routes_and_rtt(base_output_dir, satellite_network_dir, dynamic_state_u
     max_gsl_length_m = exputil.parse_positive_float(description.get_property_or_fail("max_gsl_length_m"))
     max_isl_length_m = exputil.parse_positive_float(description.get_property_or_fail("max_isl_length_m"))
 
+    # Satellite positions are shared by all distance calculations within a time moment
+    propagator = create_propagator_for_network(
+        propagation_mode, satellite_network_dir, dynamic_state_update_interval_ms, simulation_end_time_s,
+        satellites, epoch
+    )
+
     # Write data file
 
     data_path_filename = data_dir + "/networkx_path_" + str(src) + "_to_" + str(dst) + ".txt"
     with open(data_path_filename, "w+") as data_path_file:
 
+        # Forwarding state is read from the binary store if there is one, else from the fstate_<t>.txt files
+        fstate_store = read_fstate_store(satellite_network_dynamic_state_dir)
+
         # For each time moment
         fstate = {}
         current_path = []
         rtt_ns_list = []
         for t in range(0, simulation_end_time_ns, dynamic_state_update_interval_ns):
 
-            with open(satellite_network_dynamic_state_dir + "/fstate_" + str(t) + ".txt", "r") as f_in:
-                for line in f_in:
-                    spl = line.split(",")
-                    current = int(spl[0])
-                    destination = int(spl[1])
-                    next_hop = int(spl[2])
-                    fstate[(current, destination)] = next_hop
-
-                # Calculate path length
-                path_there = get_path(src, dst, fstate)
-                path_back = get_path(dst, src, fstate)
-                if path_there is not None and path_back is not None:
-                    length_src_to_dst_m = compute_path_length_without_graph(path_there, epoch, t, satellites,
-                                                                            ground_stations, list_isls,
-                                                                            max_gsl_length_m, max_isl_length_m)
-                    length_dst_to_src_m = compute_path_length_without_graph(path_back, epoch, t,
-                                                                            satellites, ground_stations, list_isls,
-                                                                            max_gsl_length_m, max_isl_length_m)
-                    rtt_ns = (length_src_to_dst_m + length_dst_to_src_m) * 1000000000.0 / 299792458.0
-                else:
-                    length_src_to_dst_m = 0.0
-                    length_dst_to_src_m = 0.0
-                    rtt_ns = 0.0
-
-                # Add to RTT list
-                rtt_ns_list.append((t, rtt_ns))
-
-                # Only if there is a new path, print new path
-                new_path = get_path(src, dst, fstate)
-                if current_path != new_path:
-
-                    # This is the new path
-                    current_path = new_path
-
-                    # Write change nicely to the console
-                    print("Change at t=" + str(t) + " ns (= " + str(t / 1e9) + " seconds)")
-                    print("  > Path..... " + (" -- ".join(list(map(lambda x: str(x), current_path)))
-                                              if current_path is not None else "Unreachable"))
-                    print("  > Length... " + str(length_src_to_dst_m + length_dst_to_src_m) + " m")
-                    print("  > RTT...... %.2f ms" % (rtt_ns / 1e6))
-                    print("")
-
-                    # Write to path file
-                    data_path_file.write(str(t) + "," + ("-".join(list(map(lambda x: str(x), current_path)))
-                                                         if current_path is not None else "Unreachable") + "\n")
+            for fstate_update in read_fstate_updates(satellite_network_dynamic_state_dir, t, fstate_store):
+                fstate[(fstate_update[0], fstate_update[1])] = fstate_update[2]
+
+            # Calculate path length
+            path_there = get_path(src, dst, fstate)
+            path_back = get_path(dst, src, fstate)
+            if path_there is not None and path_back is not None:
+                satellite_positions_m = satellite_positions_m_or_none_at(propagator, t)
+                length_src_to_dst_m = compute_path_length_without_graph(path_there, epoch, t, satellites,
+                                                                        ground_stations, list_isls,
+                                                                        max_gsl_length_m, max_isl_length_m,
+                                                                        satellite_positions_m)
+                length_dst_to_src_m = compute_path_length_without_graph(path_back, epoch, t,
+                                                                        satellites, ground_stations, list_isls,
+                                                                        max_gsl_length_m, max_isl_length_m,
+                                                                        satellite_positions_m)
+                rtt_ns = (length_src_to_dst_m + length_dst_to_src_m) * 1000000000.0 / 299792458.0
+            else:
+                length_src_to_dst_m = 0.0
+                length_dst_to_src_m = 0.0
+                rtt_ns = 0.0
+
+            # Add to RTT list
+            rtt_ns_list.append((t, rtt_ns))
+
+            # Only if there is a new path, print new path
+            new_path = get_path(src, dst, fstate)
+            if current_path != new_path:
+
+                # This is the new path
+                current_path = new_path
+
+                # Write change nicely to the console
+                print("Change at t=" + str(t) + " ns (= " + str(t / 1e9) + " seconds)")
+                print("  > Path..... " + (" -- ".join(list(map(lambda x: str(x), current_path)))
+                                          if current_path is not None else "Unreachable"))
+                print("  > Length... " + str(length_src_to_dst_m + length_dst_to_src_m) + " m")
+                print("  > RTT...... %.2f ms" % (rtt_ns / 1e6))
+                print("")
+
+                # Write to path file
+                data_path_file.write(str(t) + "," + ("-".join(list(map(lambda x: str(x), current_path)))
+                                                     if current_path is not None else "Unreachable") + "\n")
 
         # Write data file
         data_filename = data_dir + "/networkx_rtt_" + str(src) + "_to_" + str(dst) + ".txt"
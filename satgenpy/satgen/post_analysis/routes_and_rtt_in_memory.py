@@ -0,0 +1,152 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from .graph_tools import *
+from satgen.isls import *
+from satgen.ground_stations import *
+from satgen.tles import *
+from satgen.interfaces import *
+from satgen.dynamic_state import (
+    generate_dynamic_state_at, create_isl_graph, open_fstate_store_in_memory, read_fstate_store_in_memory
+)
+from satgen.ephemeris import create_propagator_for_network
+import exputil
+import numpy as np
+
+
+def routes_and_rtt_in_memory(satellite_network_dir, time_step_ms, duration_s, ground_station_pairs,
+                             dynamic_state_algorithm, propagation_mode="ephem", incremental_shortest_paths=False,
+                             enable_verbose_logs=False):
+    """
+    Generate the dynamic state of a satellite network, and calculate the paths and round-trip times (RTTs)
+    between ground station pairs over time, all in memory. No dynamic state or analysis files are written: the
+    forwarding state is only calculated for the pairs (in both directions), and kept in a binary forwarding
+    state store in memory. The RTTs are the same as the ones of print_routes_and_rtt().
+
+    :param satellite_network_dir:       Satellite network directory (with the ground stations, TLEs, ISLs,
+                                        GSL interfaces information and description)
+    :param time_step_ms:                Time step (ms)
+    :param duration_s:                  Duration (s)
+    :param ground_station_pairs:        List of (source, destination) ground station node identifiers
+    :param dynamic_state_algorithm:     Dynamic state algorithm (see generate_dynamic_state())
+    :param propagation_mode:            Propagation mode (see generate_dynamic_state())
+    :param incremental_shortest_paths:  True to repair the shortest path trees of the previous time step
+    :param enable_verbose_logs:         True to print the logs of the dynamic state generation
+
+    :return: Dictionary with:
+             "time_since_epoch_ns": numpy array of the time steps (ns)
+             "fstate_store": forwarding state store with the updates of each time step (to pass to
+                             read_fstate_updates() or fstate_at(), with None as directory)
+             "rtt_ns": dictionary of each pair to a numpy array of its RTT (ns) at each time step (0 if unreachable)
+             "paths": dictionary of each pair to a list of (time (ns), path (list of node identifiers, or
+                      None if unreachable)) at each time step at which the path changes
+    """
+
+    # Satellite network
+    ground_stations = read_ground_stations_extended(satellite_network_dir + "/ground_stations.txt")
+    tles = read_tles(satellite_network_dir + "/tles.txt")
+    satellites = tles["satellites"]
+    list_isls = read_isls(satellite_network_dir + "/isls.txt", len(satellites))
+    list_gsl_interfaces_info = read_gsl_interfaces_info(
+        satellite_network_dir + "/gsl_interfaces_info.txt",
+        len(satellites),
+        len(ground_stations)
+    )
+    epoch = tles["epoch"]
+    description = exputil.PropertiesConfig(satellite_network_dir + "/description.txt")
+    max_gsl_length_m = exputil.parse_positive_float(description.get_property_or_fail("max_gsl_length_m"))
+    max_isl_length_m = exputil.parse_positive_float(description.get_property_or_fail("max_isl_length_m"))
+
+    # In nanoseconds
+    simulation_end_time_ns = duration_s * 1000 * 1000 * 1000
+    time_step_ns = time_step_ms * 1000 * 1000
+
+    # The path back is needed for the RTT, so the forwarding state is calculated in both directions
+    ground_station_pairs = sorted(set(map(tuple, ground_station_pairs)))
+    ground_station_pairs_both_directions = sorted(set(
+        ground_station_pairs + [(dst, src) for (src, dst) in ground_station_pairs]
+    ))
+
+    # Satellite positions are shared by the dynamic state generation and the path lengths of a time step
+    propagator = create_propagator_for_network(
+        propagation_mode, satellite_network_dir, time_step_ms, duration_s, satellites, epoch
+    )
+
+    # The structure of the ISL graph is created once, only its edge weights change over time
+    isl_graph = create_isl_graph(len(satellites), list_isls)
+
+    # Generate the dynamic state of each time step, and calculate the RTT from its forwarding state
+    fstate_store = open_fstate_store_in_memory()
+    list_time_since_epoch_ns = list(range(0, simulation_end_time_ns, time_step_ns))
+    rtt_ns = dict([(pair, np.zeros(len(list_time_since_epoch_ns))) for pair in ground_station_pairs])
+    paths = dict([(pair, []) for pair in ground_station_pairs])
+    prev_output = None
+    for i, t in enumerate(list_time_since_epoch_ns):
+        satellite_positions_m = satellite_positions_m_or_none_at(propagator, t)
+        prev_output = generate_dynamic_state_at(
+            None,
+            epoch,
+            t,
+            satellites,
+            ground_stations,
+            list_isls,
+            list_gsl_interfaces_info,
+            max_gsl_length_m,
+            max_isl_length_m,
+            dynamic_state_algorithm,
+            prev_output,
+            enable_verbose_logs,
+            satellite_positions_m,
+            None,
+            incremental_shortest_paths,
+            fstate_store,
+            ground_station_pairs_both_directions,
+            isl_graph
+        )
+        fstate = dict([(key, next_hop_decision[0]) for (key, next_hop_decision) in prev_output["fstate"].items()])
+
+        for (src, dst) in ground_station_pairs:
+
+            # Calculate path length
+            path_there = get_path(src, dst, fstate)
+            path_back = get_path(dst, src, fstate)
+            if path_there is not None and path_back is not None:
+                length_src_to_dst_m = compute_path_length_without_graph(path_there, epoch, t, satellites,
+                                                                        ground_stations, list_isls,
+                                                                        max_gsl_length_m, max_isl_length_m,
+                                                                        satellite_positions_m)
+                length_dst_to_src_m = compute_path_length_without_graph(path_back, epoch, t,
+                                                                        satellites, ground_stations, list_isls,
+                                                                        max_gsl_length_m, max_isl_length_m,
+                                                                        satellite_positions_m)
+                rtt_ns[(src, dst)][i] = (length_src_to_dst_m + length_dst_to_src_m) * 1000000000.0 / 299792458.0
+
+            # Only if there is a new path, add it
+            if len(paths[(src, dst)]) == 0 or paths[(src, dst)][-1][1] != path_there:
+                paths[(src, dst)].append((t, path_there))
+
+    return {
+        "time_since_epoch_ns": np.array(list_time_since_epoch_ns, dtype=np.int64),
+        "fstate_store": read_fstate_store_in_memory(fstate_store),
+        "rtt_ns": rtt_ns,
+        "paths": paths
+    }
@@ -25,12 +25,14 @@ import unittest
 
 import ephem
 import math
+import numpy as np
 from astropy.time import Time
 from astropy import units as u
 import exputil
 
 from satgen.distance_tools import *
 from satgen.ground_stations import *
+from satgen.tles import *
 
 
 class TestDistanceTools(unittest.TestCase):
@@ -320,3 +322,540 @@ class TestDistanceTools(unittest.TestCase):
             straight_shadow_distance_m,
             delta=20000  # 20km
         )
+
+    def test_satellite_propagator(self):
+        epoch = Time("2000-01-01 00:00:00", scale="tdb")
+
+        # Satellites (Kuiper) which are adjacent within an orbit and across orbits
+        satellites = [
+            ephem.readtle(
+                "Kuiper-630 0",
+                "1 00001U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    04",
+                "2 00001  51.9000   0.0000 0000001   0.0000   0.0000 14.80000000    02"
+            ),
+            ephem.readtle(
+                "Kuiper-630 1",
+                "1 00002U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    05",
+                "2 00002  51.9000   0.0000 0000001   0.0000  10.5882 14.80000000    07"
+            ),
+            ephem.readtle(
+                "Kuiper-630 17",
+                "1 00018U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    02",
+                "2 00018  51.9000   0.0000 0000001   0.0000 180.0000 14.80000000    09"
+            ),
+            ephem.readtle(
+                "Kuiper-630 35",
+                "1 00036U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    02",
+                "2 00036  51.9000  10.5882 0000001   0.0000  15.8824 14.80000000    02"
+            )
+        ]
+        list_isls = [(0, 1), (0, 3), (1, 3)]
+        ground_stations = [
+            {
+                "gid": 0,
+                "name": "Manila",
+                "latitude_degrees_str": "14.6042",
+                "longitude_degrees_str": "120.9822",
+                "elevation_m_float": 0.0
+            },
+            {
+                "gid": 1,
+                "name": "Dalian",
+                "latitude_degrees_str": "38.913811",
+                "longitude_degrees_str": "121.602322",
+                "elevation_m_float": 0.0
+            }
+        ]
+
+        propagator = create_satellite_propagator(satellites, epoch)
+        for extra_time_ns in [
+            0,  # 0
+            1000000,  # 1ms
+            60000000000,  # 60s
+            10 * 60000000000,  # 10 minutes
+            100 * 60000000000,  # 100 minutes
+        ]:
+            time = epoch + extra_time_ns * u.ns
+            satellite_positions_m = satellite_positions_m_at(propagator, extra_time_ns)
+            self.assertEqual(satellite_positions_m.shape, (4, 3))
+
+            # All satellites are at the Kuiper altitude (630 km)
+            for sid in range(len(satellites)):
+                self.assertAlmostEqual(
+                    math.sqrt(sum(satellite_positions_m[sid] ** 2)),
+                    6378135.0 + 630000.0,
+                    delta=20000.0
+                )
+
+            # ISL distances are within 20m of the ones calculated by ephem
+            isl_lengths_m = distances_m_between_satellites(satellite_positions_m, list_isls)
+            for i in range(len(list_isls)):
+                self.assertAlmostEqual(
+                    isl_lengths_m[i],
+                    distance_m_between_satellites(
+                        satellites[list_isls[i][0]],
+                        satellites[list_isls[i][1]],
+                        str(epoch),
+                        str(time)
+                    ),
+                    delta=20.0
+                )
+
+            # GSL distances are within 100m of the ones calculated by ephem
+            gsl_lengths_m = distances_m_ground_stations_to_satellites(
+                ground_station_positions_m(ground_stations),
+                satellite_positions_m
+            )
+            self.assertEqual(gsl_lengths_m.shape, (2, 4))
+            for gid in range(len(ground_stations)):
+                for sid in range(len(satellites)):
+                    self.assertAlmostEqual(
+                        gsl_lengths_m[gid][sid],
+                        distance_m_ground_station_to_satellite(
+                            ground_stations[gid],
+                            satellites[sid],
+                            str(epoch),
+                            str(time)
+                        ),
+                        delta=100.0
+                    )
+
+    def test_satellite_propagator_cache(self):
+        epoch = Time("2000-01-01 00:00:00", scale="tdb")
+        satellites = [
+            ephem.readtle(
+                "Kuiper-630 0",
+                "1 00001U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    04",
+                "2 00001  51.9000   0.0000 0000001   0.0000   0.0000 14.80000000    02"
+            ),
+            ephem.readtle(
+                "Kuiper-630 1",
+                "1 00002U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    05",
+                "2 00002  51.9000   0.0000 0000001   0.0000  10.5882 14.80000000    07"
+            )
+        ]
+
+        # Same time moment is only calculated once and cannot be modified
+        propagator = create_satellite_propagator(satellites, epoch, max_cached_time_steps=3)
+        positions_a_m = satellite_positions_m_at(propagator, 1000000)
+        positions_b_m = satellite_positions_m_at(propagator, 1000000)
+        self.assertIs(positions_a_m, positions_b_m)
+        self.assertFalse(positions_a_m.flags.writeable)
+        for sid in range(len(satellites)):
+            self.assertEqual(list(satellite_position_m_at(propagator, sid, 1000000)), list(positions_a_m[sid]))
+            self.assertEqual(
+                list(calculate_satellite_positions_m_at(propagator, 1000000)[sid]),
+                list(positions_a_m[sid])
+            )
+
+        # When full, the earliest time moment is evicted
+        for t in [4000000, 2000000, 3000000]:
+            satellite_positions_m_at(propagator, t)
+        self.assertEqual(sorted(propagator["cached_positions_m"].keys()), [2000000, 3000000, 4000000])
+
+        # Caching can be disabled
+        propagator = create_satellite_propagator(satellites, epoch, max_cached_time_steps=0)
+        satellite_positions_m_at(propagator, 0)
+        self.assertEqual(len(propagator["cached_positions_m"]), 0)
+        try:
+            create_satellite_propagator(satellites, epoch, max_cached_time_steps=-1)
+            self.fail()
+        except ValueError:
+            pass
+
+        # Propagation mode
+        self.assertIsNone(create_propagator_for_mode("ephem", satellites, epoch))
+        self.assertIsNone(satellite_positions_m_or_none_at(None, 0))
+        self.assertEqual(create_propagator_for_mode("sgp4", satellites, epoch)["propagation_mode"], "sgp4")
+        try:
+            create_propagator_for_mode("unknown", satellites, epoch)
+            self.fail()
+        except ValueError:
+            pass
+
+    def test_satellites_in_range_of_ground_stations(self):
+
+        # Satellites spread over a shell at 630 km altitude
+        random_state = np.random.RandomState(123456789)
+        satellite_positions_m = random_state.normal(size=(2000, 3))
+        satellite_positions_m *= (6378135.0 + 630000.0) / np.linalg.norm(satellite_positions_m, axis=1)[:, np.newaxis]
+        ground_stations = [
+            {"gid": 0, "latitude_degrees_str": "14.6042", "longitude_degrees_str": "120.9822",
+             "elevation_m_float": 0.0},
+            {"gid": 1, "latitude_degrees_str": "38.913811", "longitude_degrees_str": "121.602322",
+             "elevation_m_float": 0.0},
+            {"gid": 2, "latitude_degrees_str": "-33.8688", "longitude_degrees_str": "151.2093",
+             "elevation_m_float": 100.0},
+            {"gid": 3, "latitude_degrees_str": "90.0", "longitude_degrees_str": "0.0",
+             "elevation_m_float": 0.0}
+        ]
+        gs_positions_m = ground_station_positions_m(ground_stations)
+
+        # Must be exactly the same as checking all satellites
+        gsl_lengths_m = distances_m_ground_stations_to_satellites(gs_positions_m, satellite_positions_m)
+        for max_gsl_length_m in [100000.0, 1260000.0, 3000000.0]:
+            in_range = satellites_in_range_of_ground_stations(gs_positions_m, satellite_positions_m, max_gsl_length_m)
+            self.assertEqual(len(in_range), 4)
+            for gid in range(len(ground_stations)):
+                expected = []
+                for sid in range(len(satellite_positions_m)):
+                    if gsl_lengths_m[gid, sid] <= max_gsl_length_m:
+                        expected.append((float(gsl_lengths_m[gid, sid]), sid))
+                self.assertEqual(in_range[gid], expected)
+                if max_gsl_length_m > 1000000.0:
+                    self.assertTrue(len(in_range[gid]) > 0)
+
+        # Exactly at the maximum GSL length is in range
+        satellite_positions_m = np.array([[0.0, 0.0, 7000000.0], [0.0, 0.0, 7000001.0]])
+        gs_position_m = np.array([[0.0, 0.0, 6000000.0]])
+        self.assertEqual(
+            satellites_in_range_of_ground_stations(gs_position_m, satellite_positions_m, 1000000.0),
+            [[(1000000.0, 0)]]
+        )
+
+        # No satellites
+        self.assertEqual(satellites_in_range_of_ground_stations(gs_position_m, np.zeros((0, 3)), 1000000.0), [[]])
+
+        # Only among the candidates
+        self.assertEqual(
+            satellites_in_range_of_ground_stations_among(gs_position_m, satellite_positions_m, 1000000.0, [[1]]),
+            [[]]
+        )
+        self.assertEqual(
+            satellites_in_range_of_ground_stations_among(gs_position_m, satellite_positions_m, 1000001.0, [[1, 0]]),
+            [[(1000000.0, 0), (1000001.0, 1)]]
+        )
+
+    def test_satellites_in_range_unchanged_for_ns(self):
+
+        # Time it takes the satellite closest to the edge of the range to reach it at the maximum rate
+        satellite_positions_m = np.array([[0.0, 0.0, 7000000.0], [0.0, 0.0, 7024000.0], [0.0, 0.0, 6990000.0]])
+        gs_position_m = np.array([[0.0, 0.0, 6000000.0]])
+        self.assertEqual(
+            satellites_in_range_unchanged_for_ns(gs_position_m, satellite_positions_m, 1012000.0),
+            1000 * 1000 * 1000
+        )
+        self.assertEqual(satellites_in_range_unchanged_for_ns(gs_position_m, satellite_positions_m, 1000000.0), 0)
+        self.assertEqual(satellites_in_range_unchanged_for_ns(gs_position_m, np.zeros((0, 3)), 1000000.0), math.inf)
+
+        # Within that time, the satellites in range of ground stations of a Kuiper shell stay the same
+        local_shell = exputil.LocalShell()
+        local_shell.make_full_dir("temp_satellites_in_range_unchanged")
+        generate_tles_from_scratch_manual(
+            "temp_satellites_in_range_unchanged/tles.txt", "Kuiper-630", 34, 34, True, 51.9, 0.0000001, 0.0, 14.80
+        )
+        tles = read_tles("temp_satellites_in_range_unchanged/tles.txt")
+        propagator = create_satellite_propagator(tles["satellites"], tles["epoch"])
+        gs_positions_m = ground_station_positions_m([
+            {"gid": 0, "latitude_degrees_str": "14.6042", "longitude_degrees_str": "120.9822",
+             "elevation_m_float": 0.0},
+            {"gid": 1, "latitude_degrees_str": "-33.8688", "longitude_degrees_str": "151.2093",
+             "elevation_m_float": 100.0}
+        ])
+        time_step_ns = 100 * 1000 * 1000
+        list_satellites_in_range = []
+        list_unchanged_for_ns = []
+        for t in range(0, 60 * 1000 * 1000 * 1000, time_step_ns):
+            satellite_positions_m = satellite_positions_m_at(propagator, t)
+            list_satellites_in_range.append([
+                [sid for (_, sid) in in_range]
+                for in_range in satellites_in_range_of_ground_stations(
+                    gs_positions_m, satellite_positions_m, 1089686.4181956202
+                )
+            ])
+            list_unchanged_for_ns.append(
+                satellites_in_range_unchanged_for_ns(gs_positions_m, satellite_positions_m, 1089686.4181956202)
+            )
+        num_changes = 0
+        for i in range(len(list_satellites_in_range)):
+            for j in range(i + 1, len(list_satellites_in_range)):
+                if (j - i) * time_step_ns >= list_unchanged_for_ns[i]:
+                    break
+                self.assertEqual(list_satellites_in_range[i], list_satellites_in_range[j])
+            if i > 0 and list_satellites_in_range[i] != list_satellites_in_range[i - 1]:
+                num_changes += 1
+        self.assertGreater(num_changes, 0)
+        self.assertGreater(max(list_unchanged_for_ns), time_step_ns)
+        local_shell.remove_force_recursive("temp_satellites_in_range_unchanged")
+
+    def test_analytic_propagator(self):
+        local_shell = exputil.LocalShell()
+        local_shell.make_full_dir("temp_analytic_propagator")
+
+        # Kuiper, Starlink and Telesat first shell
+        for values in [
+            ("Kuiper-630", 34, 34, 51.9, 14.80),
+            ("Starlink-550", 72, 22, 53.0, 15.19),
+            ("Telesat-1015", 27, 13, 98.98, 13.66),
+        ]:
+            generate_tles_from_scratch_manual(
+                "temp_analytic_propagator/tles.txt", values[0], values[1], values[2], True, values[3],
+                0.0000001, 0.0, values[4]
+            )
+            tles = read_tles("temp_analytic_propagator/tles.txt")
+            satellites = tles["satellites"]
+            epoch = tles["epoch"]
+
+            # All time moments at once are within 1mm of SGP-4 (over a day)
+            sgp4_propagator = create_satellite_propagator(satellites, epoch)
+            analytic_propagator = create_analytic_propagator(satellites, epoch)
+            times_since_epoch_ns = [0, 1000000, 60000000000, 100 * 60000000000, 24 * 3600 * 1000000000]
+            positions_m = analytic_satellite_positions_m(analytic_propagator, times_since_epoch_ns)
+            self.assertEqual(positions_m.shape, (len(times_since_epoch_ns), len(satellites), 3))
+            for i in range(len(times_since_epoch_ns)):
+                self.assertLess(np.max(np.linalg.norm(
+                    positions_m[i] - satellite_positions_m_at(sgp4_propagator, times_since_epoch_ns[i]),
+                    axis=1
+                )), 0.001)
+
+                # Same via the (cached) per time moment interface
+                self.assertTrue(np.array_equal(
+                    satellite_positions_m_at(analytic_propagator, times_since_epoch_ns[i]),
+                    positions_m[i]
+                ))
+
+            # Propagation mode
+            self.assertEqual(
+                create_propagator_for_mode("analytic", satellites, epoch)["propagation_mode"],
+                "analytic"
+            )
+
+        # Not possible for orbits with drag
+        satellite_with_drag = ephem.readtle(
+            "Kuiper-630 0",
+            "1 00001U 00000ABC 00001.00000000  .00000000  00000-0  10000-3 0    09",
+            "2 00001  51.9000   0.0000 0000001   0.0000   0.0000 14.80000000    02"
+        )
+        try:
+            create_analytic_propagator([satellite_with_drag], Time("2000-01-01 00:00:00", scale="tdb"))
+            self.fail()
+        except ValueError:
+            pass
+
+        local_shell.remove_force_recursive("temp_analytic_propagator")
+
+    def test_ephem_date_at(self):
+        for epoch in [Time("2000-01-01 00:00:00", scale="tdb"), Time("2000-01-02 12:13:14.567", scale="tdb")]:
+            satellite = ephem.readtle(
+                "Kuiper-630 0",
+                "1 00001U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    04",
+                "2 00001  51.9000   0.0000 0000001   0.0000   0.0000 14.80000000    02"
+            )
+            other_satellite = ephem.readtle(
+                "Kuiper-630 1",
+                "1 00002U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    05",
+                "2 00002  51.9000   0.0000 0000001   0.0000  10.5882 14.80000000    07"
+            )
+            ground_station = {
+                "gid": 0,
+                "name": "Manila",
+                "latitude_degrees_str": "14.6042",
+                "longitude_degrees_str": "120.9822",
+                "elevation_m_float": 0.0
+            }
+            for time_since_epoch_ns in [0, 1000000, 50000000, 60000000000, 100 * 60000000000]:
+                time = epoch + time_since_epoch_ns * u.ns
+
+                # Same as parsing the string (at millisecond granularity)
+                self.assertEqual(ephem_date_at(epoch, 0), ephem.Date(str(epoch)))
+                self.assertEqual(ephem_date_at(epoch, time_since_epoch_ns), ephem.Date(str(time)))
+
+                # As such, the distances are exactly the same
+                self.assertEqual(
+                    distance_m_between_satellites(
+                        satellite, other_satellite,
+                        ephem_date_at(epoch, 0), ephem_date_at(epoch, time_since_epoch_ns)
+                    ),
+                    distance_m_between_satellites(satellite, other_satellite, str(epoch), str(time))
+                )
+                self.assertEqual(
+                    distance_m_ground_station_to_satellite(
+                        ground_station, satellite,
+                        ephem_date_at(epoch, 0), ephem_date_at(epoch, time_since_epoch_ns)
+                    ),
+                    distance_m_ground_station_to_satellite(ground_station, satellite, str(epoch), str(time))
+                )
+
+    def test_isl_length_table(self):
+        local_shell = exputil.LocalShell()
+        local_shell.make_full_dir("temp_isl_length_table")
+
+        # Small Walker constellation with +Grid ISLs
+        generate_tles_from_scratch_manual(
+            "temp_isl_length_table/tles.txt", "Kuiper-630", 4, 5, True, 51.9, 0.0000001, 0.0, 14.80
+        )
+        tles = read_tles("temp_isl_length_table/tles.txt")
+        satellites = tles["satellites"]
+        epoch = tles["epoch"]
+        list_isls = [(0, 1), (1, 2), (0, 5), (1, 6), (3, 18)]
+
+        # Period is close to the orbital period (14.80 revolutions per day)
+        period_ns = walker_period_ns(satellites)
+        self.assertAlmostEqual(period_ns / 1e9, 86400.0 / 14.80, delta=10.0)
+
+        # Table-served ISL lengths are within a few meters of the calculated ones, also after several periods
+        isl_length_table = create_isl_length_table(satellites, epoch, list_isls, period_ns)
+        for time_since_epoch_ns in [0, 500000000, 1234567890123, period_ns + 100000000, 3 * period_ns - 50000000]:
+            isl_lengths_m = isl_lengths_m_from_table(isl_length_table, time_since_epoch_ns)
+            self.assertEqual(len(isl_lengths_m), len(list_isls))
+            for isl_idx, (a, b) in enumerate(list_isls):
+                self.assertAlmostEqual(
+                    isl_lengths_m[isl_idx],
+                    distance_m_between_satellites(
+                        satellites[a],
+                        satellites[b],
+                        ephem_date_at(epoch, 0),
+                        ephem_date_at(epoch, time_since_epoch_ns)
+                    ),
+                    delta=5.0
+                )
+
+        # At the time moments of the table entries, they are the calculated ISL lengths themselves
+        for time_since_epoch_ns in [0, 1000000000, 7000000000]:
+            self.assertTrue(np.array_equal(
+                isl_lengths_m_from_table(isl_length_table, time_since_epoch_ns),
+                isl_length_table["isl_lengths_m"][time_since_epoch_ns // 1000000000]
+            ))
+
+        # Not periodic if the orbital shapes differ
+        satellites[3] = ephem.readtle(
+            "Kuiper-630 3",
+            "1 00001U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    04",
+            "2 00001  52.9000   0.0000 0000001   0.0000   0.0000 14.80000000    03"
+        )
+        try:
+            walker_period_ns(satellites)
+            self.fail()
+        except ValueError:
+            pass
+
+        # Invalid table properties
+        for values in [(0, 1000000000), (period_ns, 0), (1000, 1000000000)]:
+            try:
+                create_isl_length_table(satellites, epoch, list_isls, values[0], values[1])
+                self.fail()
+            except ValueError:
+                pass
+
+        local_shell.remove_force_recursive("temp_isl_length_table")
+
+    def test_distance_matrix_between_ground_stations(self):
+        local_shell = exputil.LocalShell()
+
+        # Create some ground stations
+        with open("ground_stations.temp.txt", "w+") as f_out:
+            f_out.write("0,Amsterdam,52.379189,4.899431,0\n")
+            f_out.write("1,Paris,48.864716,2.349014,0\n")
+            f_out.write("2,Rio de Janeiro,-22.970722,-43.182365,0\n")
+            f_out.write("3,Manila,14.599512,120.984222,0\n")
+            f_out.write("4,Perth,-31.953512,115.857048,0\n")
+            f_out.write("5,Some place on Antarctica,-72.927148,33.450844,0\n")
+            f_out.write("6,New York,40.730610,-73.935242,0\n")
+            f_out.write("7,Some place in Greenland,79.741382,-53.143087,0")
+        ground_stations = read_ground_stations_basic("ground_stations.temp.txt")
+
+        # Matrices must match the pair-wise calculation
+        geodesic_distance_m = geodesic_distance_m_matrix_between_ground_stations(ground_stations)
+        straight_distance_m = straight_distance_m_matrix_between_ground_stations(ground_stations)
+        self.assertEqual((8, 8), geodesic_distance_m.shape)
+        self.assertEqual((8, 8), straight_distance_m.shape)
+        for i in range(8):
+            for j in range(8):
+                self.assertAlmostEqual(
+                    geodesic_distance_m_between_ground_stations(ground_stations[i], ground_stations[j]),
+                    geodesic_distance_m[i][j],
+                    delta=0.000001
+                )
+                self.assertAlmostEqual(
+                    straight_distance_m_between_ground_stations(ground_stations[i], ground_stations[j]),
+                    straight_distance_m[i][j],
+                    delta=0.000001
+                )
+
+        # No ground stations
+        self.assertEqual((0, 0), geodesic_distance_m_matrix_between_ground_stations([]).shape)
+
+        # Clean up
+        local_shell.remove("ground_stations.temp.txt")
+
+    def test_geodetic2cartesian_array(self):
+
+        # Same as one at a time
+        latitudes_degrees = [52.379189, -22.970722, 79.741382, 0.0, -90.0]
+        longitudes_degrees = [4.899431, -43.182365, -53.143087, 180.0, 0.0]
+        elevations_m = [0.0, 10.0, 2500.0, -5.0, 0.0]
+        cartesian = geodetic2cartesian_array(latitudes_degrees, longitudes_degrees, elevations_m)
+        self.assertEqual((5, 3), cartesian.shape)
+        for i in range(5):
+            expected = geodetic2cartesian(latitudes_degrees[i], longitudes_degrees[i], elevations_m[i])
+            for j in range(3):
+                self.assertAlmostEqual(expected[j], cartesian[i][j], delta=0.000001)
+
+        # A single elevation for all
+        cartesian_zero = geodetic2cartesian_array(latitudes_degrees, longitudes_degrees, 0.0)
+        self.assertAlmostEqual(cartesian[0][0], cartesian_zero[0][0], delta=0.000001)
+
+        # Empty
+        self.assertEqual((0, 3), geodetic2cartesian_array([], [], []).shape)
+
+        # Invalid: unequal lengths
+        try:
+            geodetic2cartesian_array([1.0, 2.0], [1.0], [0.0, 0.0])
+            self.fail()
+        except ValueError:
+            pass
+
+    def test_sub_satellite_points(self):
+        local_shell = exputil.LocalShell()
+        local_shell.make_full_dir("temp_sub_satellite_points")
+
+        # Kuiper first shell
+        generate_tles_from_scratch_manual(
+            "temp_sub_satellite_points/tles.txt", "Kuiper-630", 34, 34, True, 51.9, 0.0000001, 0.0, 14.80
+        )
+        tles = read_tles("temp_sub_satellite_points/tles.txt")
+        satellites = tles["satellites"]
+        epoch = tles["epoch"]
+        times_since_epoch_ns = [0, 60000000000, 120000000000, 100 * 60000000000]
+
+        # Without propagator it is the same as the shadow ground station
+        latitudes_deg, longitudes_deg = sub_satellite_points_degrees_at(None, satellites, epoch, times_since_epoch_ns)
+        self.assertEqual((len(times_since_epoch_ns), len(satellites)), latitudes_deg.shape)
+        self.assertEqual((len(times_since_epoch_ns), len(satellites)), longitudes_deg.shape)
+        for i in range(len(times_since_epoch_ns)):
+            for j in [0, 1, 500, len(satellites) - 1]:
+                shadow = create_basic_ground_station_for_satellite_shadow(
+                    satellites[j],
+                    ephem_date_at(epoch, 0),
+                    ephem_date_at(epoch, times_since_epoch_ns[i])
+                )
+                self.assertEqual(float(shadow["latitude_degrees_str"]), latitudes_deg[i][j])
+                self.assertEqual(float(shadow["longitude_degrees_str"]), longitudes_deg[i][j])
+
+        # With propagators it is within 0.001 degree (~100m) of ephem
+        for propagator in [
+            create_satellite_propagator(satellites, epoch),
+            create_analytic_propagator(satellites, epoch),
+            create_ephemeris_propagator(
+                np.array([
+                    satellite_positions_m_at(create_satellite_propagator(satellites, epoch), t)
+                    for t in range(0, 100 * 60000000000 + 1, 60000000000)
+                ]),
+                60000000000
+            )
+        ]:
+            latitudes_prop_deg, longitudes_prop_deg = sub_satellite_points_degrees_at(
+                propagator, satellites, epoch, times_since_epoch_ns
+            )
+            self.assertLess(np.max(np.abs(latitudes_prop_deg - latitudes_deg)), 0.001)
+            longitude_difference_deg = np.abs(longitudes_prop_deg - longitudes_deg)
+            self.assertLess(np.max(np.minimum(longitude_difference_deg, 360.0 - longitude_difference_deg)), 0.001)
+
+        # Poles and equator
+        latitudes_deg, longitudes_deg = sub_satellite_points_degrees(
+            np.array([[7000000.0, 0.0, 0.0], [0.0, 7000000.0, 0.0], [0.0, 0.0, -7000000.0]])
+        )
+        self.assertEqual([0.0, 0.0, -90.0], list(latitudes_deg))
+        self.assertEqual([0.0, 90.0, 0.0], list(longitudes_deg))
+
+        local_shell.remove_force_recursive("temp_sub_satellite_points")
@@ -22,10 +22,89 @@
 
 
 import exputil
+import networkx as nx
 import unittest
+import os
 from satgen import *
 
 
+def create_small_equator_constellation(local_shell, satellite_network_dir):
+    """
+    Write the input files of the small constellation around the equator of
+    test_around_equator_connectivity_with_starlink() (4 satellites and 4 ground stations).
+
+    :param local_shell:             Local shell
+    :param satellite_network_dir:   Satellite network directory
+    """
+    local_shell.make_full_dir(satellite_network_dir)
+    local_shell.write_file(
+        satellite_network_dir + "/ground_stations.txt",
+        (
+            "0,Luanda,-8.836820,13.234320,0.000000,6135530.183815,1442953.502786,-973332.344974\n"
+            "1,Lagos,6.453060,3.395830,0.000000,6326864.177950,375422.898833,712064.787620\n"
+            "2,Kinshasa,-4.327580,15.313570,0.000000,6134256.671861,1679704.404461,-478073.165313\n"
+            "3,Ar-Riyadh-(Riyadh),24.690466,46.709566,0.000000,3975957.341095,4220595.030186,2647959.980346"
+        )
+    )
+    local_shell.write_file(
+        satellite_network_dir + "/tles.txt",
+        (
+            "1 4\n"
+            "Starlink-550 0\n"
+            "1 01308U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    05\n"
+            "2 01308  53.0000 295.0000 0000001   0.0000 155.4545 15.19000000    04\n"
+            "Starlink-550 1\n"
+            "1 01309U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    06\n"
+            "2 01309  53.0000 295.0000 0000001   0.0000 171.8182 15.19000000    04\n"
+            "Starlink-550 2\n"
+            "1 01310U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    08\n"
+            "2 01310  53.0000 295.0000 0000001   0.0000 188.1818 15.19000000    03\n"
+            "Starlink-550 3\n"
+            "1 01311U 00000ABC 00001.00000000  .00000000  00000-0  00000+0 0    09\n"
+            "2 01311  53.0000 295.0000 0000001   0.0000 204.5455 15.19000000    04"
+        )
+    )
+    local_shell.write_file(satellite_network_dir + "/isls.txt", "0 1\n1 2\n2 3")
+    local_shell.write_file(
+        satellite_network_dir + "/gsl_interfaces_info.txt",
+        "\n".join(["%d,1,1.0" % node_id for node_id in range(8)])
+    )
+
+
+def help_small_equator_dynamic_state(temp_gen_data, num_threads, time_step_ms, duration_s,
+                                     propagation_mode="sgp4", **kwargs):
+    """
+    Generate the dynamic state of the small constellation around the equator with the free-one algorithm
+    (see create_small_equator_constellation(), in the satellite network directory "small_equator_constellation").
+
+    :param temp_gen_data:       Generated data directory
+    :param num_threads:         Number of threads
+    :param time_step_ms:        Time step (ms) (or list of time steps)
+    :param duration_s:          Duration (s)
+    :param propagation_mode:    Propagation mode
+    :param kwargs:              Further arguments of help_dynamic_state()
+
+    :return: Dynamic state directory (of the finest time step)
+    """
+    help_dynamic_state(
+        temp_gen_data,
+        num_threads,
+        "small_equator_constellation",
+        time_step_ms,
+        duration_s,
+        1089686.4181956202,
+        5016591.2330984278,
+        "algorithm_free_one_only_over_isls",
+        False,
+        propagation_mode,
+        **kwargs
+    )
+    finest_time_step_ms = min(time_step_ms) if isinstance(time_step_ms, list) else time_step_ms
+    return "%s/small_equator_constellation/dynamic_state_%dms_for_%ds" % (
+        temp_gen_data, finest_time_step_ms, duration_s
+    )
+
+
 class TestDynamicState(unittest.TestCase):
 
     def test_around_equator_connectivity_with_starlink(self):
@@ -196,3 +275,466 @@ class TestDynamicState(unittest.TestCase):
 
         # Clean up
         local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_event_driven(self):
+        local_shell = exputil.LocalShell()
+
+        # Output directory
+        temp_gen_data = "temp_dynamic_state_event_driven_gen_data"
+        name = "small_kuiper_constellation"
+        satellite_network_dir = temp_gen_data + "/" + name
+        local_shell.make_full_dir(satellite_network_dir)
+        max_gsl_length_m = 1089686.4181956202
+        max_isl_length_m = 5016591.2330984278
+        time_step_ns = 1000 * 1000 * 1000
+        duration_s = 60
+        num_satellites = 144
+
+        # Small Kuiper shell (12 orbits of 12 satellites) with four ground stations
+        write_ground_stations_basic(
+            satellite_network_dir + "/ground_stations_basic.txt",
+            ["a", "b", "c", "d"], ["10.0", "30.0", "-20.0", "45.0"], ["0.0", "20.0", "30.0", "-10.0"], [0.0] * 4
+        )
+        extend_ground_stations(
+            satellite_network_dir + "/ground_stations_basic.txt", satellite_network_dir + "/ground_stations.txt"
+        )
+        generate_tles_from_scratch_manual(
+            satellite_network_dir + "/tles.txt", "Kuiper-630", 12, 12, True, 51.9, 0.0000001, 0.0, 14.80
+        )
+        generate_plus_grid_isls(satellite_network_dir + "/isls.txt", 12, 12, isl_shift=0, idx_offset=0)
+        generate_description(satellite_network_dir + "/description.txt", max_gsl_length_m, max_isl_length_m)
+        generate_simple_gsl_interfaces_info(
+            satellite_network_dir + "/gsl_interfaces_info.txt", num_satellites, 4, 1, 1, 1, 1
+        )
+
+        # A satellite comes in or goes out of range of a ground station in between
+        tles = read_tles(satellite_network_dir + "/tles.txt")
+        propagator = create_propagator_for_mode("sgp4", tles["satellites"], tles["epoch"])
+        gs_positions_m = ground_station_positions_m(
+            read_ground_stations_extended(satellite_network_dir + "/ground_stations.txt")
+        )
+        list_satellites_in_range = [
+            [
+                [sid for (_, sid) in in_range]
+                for in_range in satellites_in_range_of_ground_stations(
+                    gs_positions_m, satellite_positions_m_at(propagator, t), max_gsl_length_m
+                )
+            ]
+            for t in range(0, duration_s * time_step_ns, time_step_ns)
+        ]
+        self.assertGreater(len([
+            i for i in range(1, duration_s) if list_satellites_in_range[i] != list_satellites_in_range[i - 1]
+        ]), 0)
+
+        # Event-driven, the dynamic state is exactly the same as without it (for all pairs and only some)
+        for ground_station_pairs in [
+            None, [(num_satellites + 0, num_satellites + 2), (num_satellites + 3, num_satellites + 0)]
+        ]:
+            list_dynamic_state_dir = []
+            for event_driven in [False, True]:
+                help_dynamic_state(
+                    temp_gen_data,
+                    1,
+                    name,
+                    1000,
+                    duration_s,
+                    max_gsl_length_m,
+                    max_isl_length_m,
+                    "algorithm_free_one_only_over_isls",
+                    False,
+                    "sgp4",
+                    ground_station_pairs=ground_station_pairs,
+                    event_driven=event_driven
+                )
+                dynamic_state_dir = satellite_network_dir + "/dynamic_state_" + str(event_driven)
+                local_shell.remove_force_recursive(dynamic_state_dir)
+                os.rename(
+                    satellite_network_dir + "/dynamic_state_1000ms_for_" + str(duration_s) + "s", dynamic_state_dir
+                )
+                list_dynamic_state_dir.append(dynamic_state_dir)
+            for t in range(0, duration_s * time_step_ns, time_step_ns):
+                self.assertEqual(
+                    read_fstate_updates(list_dynamic_state_dir[0], t),
+                    read_fstate_updates(list_dynamic_state_dir[1], t)
+                )
+                for dynamic_state_dir in list_dynamic_state_dir:
+                    self.assertTrue(os.path.isfile(dynamic_state_dir + "/gsl_if_bandwidth_" + str(t) + ".txt"))
+
+        # Event-driven requires the satellite positions
+        try:
+            help_dynamic_state(
+                temp_gen_data,
+                1,
+                name,
+                1000,
+                duration_s,
+                max_gsl_length_m,
+                max_isl_length_m,
+                "algorithm_free_one_only_over_isls",
+                False,
+                "ephem",
+                event_driven=True
+            )
+            self.fail()
+        except ValueError:
+            pass
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_memoize_isl_lengths(self):
+        local_shell = exputil.LocalShell()
+
+        # Output directory
+        temp_gen_data = "temp_dynamic_state_memoize_isl_lengths_gen_data"
+        name = "small_kuiper_constellation"
+        satellite_network_dir = temp_gen_data + "/" + name
+        local_shell.make_full_dir(satellite_network_dir)
+        max_gsl_length_m = 1089686.4181956202
+        max_isl_length_m = 5016591.2330984278
+        duration_s = 20
+        num_satellites = 144
+
+        # Small Kuiper shell (12 orbits of 12 satellites) with four ground stations
+        write_ground_stations_basic(
+            satellite_network_dir + "/ground_stations_basic.txt",
+            ["a", "b", "c", "d"], ["10.0", "30.0", "-20.0", "45.0"], ["0.0", "20.0", "30.0", "-10.0"], [0.0] * 4
+        )
+        extend_ground_stations(
+            satellite_network_dir + "/ground_stations_basic.txt", satellite_network_dir + "/ground_stations.txt"
+        )
+        generate_tles_from_scratch_manual(
+            satellite_network_dir + "/tles.txt", "Kuiper-630", 12, 12, True, 51.9, 0.0000001, 0.0, 14.80
+        )
+        generate_plus_grid_isls(satellite_network_dir + "/isls.txt", 12, 12, isl_shift=0, idx_offset=0)
+        generate_description(satellite_network_dir + "/description.txt", max_gsl_length_m, max_isl_length_m)
+        generate_simple_gsl_interfaces_info(
+            satellite_network_dir + "/gsl_interfaces_info.txt", num_satellites, 4, 1, 1, 1, 1
+        )
+
+        # At the time steps of the table (1s apart), the ISL lengths are the ones calculated by ephem,
+        # such that the dynamic state is exactly the same as without memoization
+        tles = read_tles(satellite_network_dir + "/tles.txt")
+        list_isls = read_isls(satellite_network_dir + "/isls.txt", num_satellites)
+        ground_stations = read_ground_stations_extended(satellite_network_dir + "/ground_stations.txt")
+        for time_step_ms in [1000, 250]:
+            list_dynamic_state_dir = []
+            for memoize_isl_lengths in [False, True]:
+                help_dynamic_state(
+                    temp_gen_data,
+                    1,
+                    name,
+                    time_step_ms,
+                    duration_s,
+                    max_gsl_length_m,
+                    max_isl_length_m,
+                    "algorithm_free_one_only_over_isls",
+                    False,
+                    "ephem",
+                    memoize_isl_lengths
+                )
+                dynamic_state_dir = satellite_network_dir + "/dynamic_state_" + str(memoize_isl_lengths)
+                local_shell.remove_force_recursive(dynamic_state_dir)
+                os.rename(
+                    satellite_network_dir + "/dynamic_state_" + str(time_step_ms) + "ms_for_" + str(duration_s) + "s",
+                    dynamic_state_dir
+                )
+                list_dynamic_state_dir.append(dynamic_state_dir)
+            list_fstate = [{}, {}]
+            for t in range(0, duration_s * 1000 * 1000 * 1000, time_step_ms * 1000 * 1000):
+                for i in range(2):
+                    for (curr, dst, next_hop, if_out, if_in) in read_fstate_updates(list_dynamic_state_dir[i], t):
+                        list_fstate[i][(curr, dst)] = next_hop
+                if time_step_ms == 1000:
+                    self.assertEqual(list_fstate[0], list_fstate[1])
+                    continue
+
+                # In between, the interpolated ISL lengths are within a few meters of the ones calculated by ephem,
+                # such that a different next hop is only chosen if its path is equally long within a few meters
+                # (which in a Walker constellation happens for paths which mirror each other)
+                differing = [key for key in list_fstate[0].keys() if list_fstate[0][key] != list_fstate[1][key]]
+                if len(differing) == 0:
+                    continue
+                epoch_str = ephem_date_at(tles["epoch"], 0)
+                date_str = ephem_date_at(tles["epoch"], t)
+                graph = nx.Graph()
+                for (a, b) in list_isls:
+                    graph.add_edge(a, b, weight=distance_m_between_satellites(
+                        tles["satellites"][a], tles["satellites"][b], epoch_str, date_str
+                    ))
+                for (curr, dst) in differing:
+
+                    # Only over ISLs, so the only ground station in the graph is the destination
+                    graph_to_dst = graph.copy()
+                    for sid in range(num_satellites):
+                        distance_m = distance_m_ground_station_to_satellite(
+                            ground_stations[dst - num_satellites], tles["satellites"][sid], epoch_str, date_str
+                        )
+                        if distance_m <= max_gsl_length_m:
+                            graph_to_dst.add_edge(sid, dst, weight=distance_m)
+                    distance_to_dst_m = nx.single_source_dijkstra_path_length(graph_to_dst, dst)
+                    self.assertAlmostEqual(
+                        graph_to_dst.edges[(curr, list_fstate[0][(curr, dst)])]["weight"]
+                        + distance_to_dst_m[list_fstate[0][(curr, dst)]],
+                        graph_to_dst.edges[(curr, list_fstate[1][(curr, dst)])]["weight"]
+                        + distance_to_dst_m[list_fstate[1][(curr, dst)]],
+                        delta=20.0
+                    )
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_fstate_binary_store(self):
+        local_shell = exputil.LocalShell()
+        temp_gen_data = "temp_dynamic_state_binary_gen_data"
+        create_small_equator_constellation(local_shell, temp_gen_data + "/small_equator_constellation")
+        time_step_ns = 1000 * 1000 * 1000
+
+        # The binary store has the same forwarding state as the fstate_<t>.txt files
+        # (also when its parts are written by processes, one for each chunk)
+        text_dynamic_state_dir = temp_gen_data + "/small_equator_constellation/dynamic_state_text"
+        os.rename(help_small_equator_dynamic_state(temp_gen_data, 1, 1000, 3), text_dynamic_state_dir)
+        binary_dynamic_state_dir = help_small_equator_dynamic_state(
+            temp_gen_data, 2, 1000, 3, parallel_mode="processes", chunk_size=1, fstate_format="binary"
+        )
+        fstate_store = read_fstate_store(binary_dynamic_state_dir)
+        self.assertEqual(fstate_store["index"][:, 0].tolist(), [0, 1000000000, 2000000000])
+        self.assertEqual(fstate_store["index"][0].tolist(), [0, 0, 8 * 4 - 4, 1])
+        self.assertFalse(os.path.isfile(binary_dynamic_state_dir + "/fstate_0.txt"))
+        for t in range(0, 3 * time_step_ns, time_step_ns):
+            self.assertEqual(
+                read_fstate_updates(binary_dynamic_state_dir, t, fstate_store),
+                read_fstate_updates(text_dynamic_state_dir, t)
+            )
+            self.assertEqual(
+                fstate_at(binary_dynamic_state_dir, t, time_step_ns, fstate_store=fstate_store),
+                fstate_at(text_dynamic_state_dir, t, time_step_ns)
+            )
+
+        # Only text and binary are formats
+        try:
+            help_small_equator_dynamic_state(temp_gen_data, 1, 1000, 3, fstate_format="csv")
+            self.fail()
+        except ValueError:
+            pass
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_ground_station_pairs(self):
+        local_shell = exputil.LocalShell()
+        temp_gen_data = "temp_dynamic_state_pairs_gen_data"
+        create_small_equator_constellation(local_shell, temp_gen_data + "/small_equator_constellation")
+        time_step_ns = 1000 * 1000 * 1000
+
+        # With ground station pairs, only the forwarding state of the satellites to their destinations
+        # and of their sources to their destinations is calculated (the same as the complete one)
+        complete_dynamic_state_dir = temp_gen_data + "/small_equator_constellation/dynamic_state_complete"
+        os.rename(help_small_equator_dynamic_state(temp_gen_data, 1, 1000, 2), complete_dynamic_state_dir)
+        pairs_dynamic_state_dir = help_small_equator_dynamic_state(
+            temp_gen_data, 1, 1000, 2, ground_station_pairs=[(4, 5), (6, 4), (4, 5)]
+        )
+        for t in range(0, 2 * time_step_ns, time_step_ns):
+            fstate_pairs = fstate_at(pairs_dynamic_state_dir, t, time_step_ns)
+            self.assertEqual(
+                sorted(fstate_pairs.keys()),
+                [(0, 4), (0, 5), (1, 4), (1, 5), (2, 4), (2, 5), (3, 4), (3, 5), (4, 5), (6, 4)]
+            )
+            fstate = fstate_at(complete_dynamic_state_dir, t, time_step_ns)
+            for key in fstate_pairs:
+                self.assertEqual(fstate_pairs[key], fstate[key])
+
+        # Only pairs of different ground stations
+        for ground_station_pairs in [[(4, 5), (3, 4)], [(4, 8)], [(5, 5)]]:
+            try:
+                help_small_equator_dynamic_state(temp_gen_data, 1, 1000, 1, ground_station_pairs=ground_station_pairs)
+                self.fail()
+            except ValueError:
+                pass
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_chunk_markers_and_resume(self):
+        local_shell = exputil.LocalShell()
+        temp_gen_data = "temp_dynamic_state_resume_gen_data"
+        create_small_equator_constellation(local_shell, temp_gen_data + "/small_equator_constellation")
+
+        # Each chunk writes a marker when it is done, and when resuming, only the chunks without one are calculated
+        # (in the binary format, the parts are merged only once)
+        dynamic_state_4s_dir = temp_gen_data + "/small_equator_constellation/dynamic_state_1000ms_for_4s"
+        for (fstate_format, resume) in [("text", False), ("text", True), ("binary", False), ("binary", True)]:
+            help_small_equator_dynamic_state(
+                temp_gen_data, 1, 1000, 4, chunk_size=1, fstate_format=fstate_format, resume=resume
+            )
+            self.assertEqual(
+                sorted(filter(lambda x: x.startswith("chunk_"), os.listdir(dynamic_state_4s_dir))),
+                ["chunk_0_done.txt", "chunk_1000000000_done.txt",
+                 "chunk_2000000000_done.txt", "chunk_3000000000_done.txt"]
+            )
+            with open(dynamic_state_4s_dir + "/chunk_1000000000_done.txt", "r") as f_in:
+                self.assertEqual(f_in.readline(), "1000000000,3000000000,1000000000\n")
+                self.assertIn("fstate_format=" + fstate_format + "\n", f_in.read())
+            if fstate_format == "text" and not resume:
+
+                # Interrupted: the second chunk is not done, and a file of the last chunk is gone (but as it
+                # has a marker, it is not calculated again)
+                os.remove(dynamic_state_4s_dir + "/chunk_1000000000_done.txt")
+                os.remove(dynamic_state_4s_dir + "/gsl_if_bandwidth_1000000000.txt")
+                os.remove(dynamic_state_4s_dir + "/gsl_if_bandwidth_3000000000.txt")
+
+            elif fstate_format == "text":
+                self.assertTrue(os.path.isfile(dynamic_state_4s_dir + "/gsl_if_bandwidth_1000000000.txt"))
+                self.assertFalse(os.path.isfile(dynamic_state_4s_dir + "/gsl_if_bandwidth_3000000000.txt"))
+
+            else:
+                fstate_store = read_fstate_store(dynamic_state_4s_dir)
+                self.assertEqual(fstate_store["index"][:, 0].tolist(), [0, 1000000000, 2000000000, 3000000000])
+                self.assertFalse(os.path.isfile(dynamic_state_4s_dir + "/fstate_part_0.bin"))
+
+        # Interrupted while removing the parts after the merge: as the merge has a marker (only written once the
+        # store is complete), resuming does not merge again, but removes the remaining parts
+        # (and resuming with different arguments calculates all chunks again)
+        os.remove(dynamic_state_4s_dir + "/gsl_if_bandwidth_3000000000.txt")
+        for (incremental_shortest_paths, calculated) in [(False, False), (True, True)]:
+            for filename in ["fstate_part_0.bin", "fstate_part_0_index.bin"]:
+                with open(dynamic_state_4s_dir + "/" + filename, "wb"):
+                    pass
+            help_small_equator_dynamic_state(
+                temp_gen_data, 1, 1000, 4, chunk_size=1, incremental_shortest_paths=incremental_shortest_paths,
+                fstate_format="binary", resume=True
+            )
+            self.assertFalse(os.path.isfile(dynamic_state_4s_dir + "/fstate_part_0.bin"))
+            self.assertFalse(os.path.isfile(dynamic_state_4s_dir + "/fstate_part_0_index.bin"))
+            self.assertEqual(os.path.isfile(dynamic_state_4s_dir + "/gsl_if_bandwidth_3000000000.txt"), calculated)
+            fstate_store = read_fstate_store(dynamic_state_4s_dir)
+            self.assertEqual(fstate_store["index"][:, 0].tolist(), [0, 1000000000, 2000000000, 3000000000])
+            with open(dynamic_state_4s_dir + "/fstate_merge_done.txt", "r") as f_in:
+                self.assertIn(
+                    "incremental_shortest_paths=" + str(incremental_shortest_paths) + "\n", f_in.read()
+                )
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_multiple_time_steps(self):
+        local_shell = exputil.LocalShell()
+        temp_gen_data = "temp_dynamic_state_multiple_time_steps_gen_data"
+        create_small_equator_constellation(local_shell, temp_gen_data + "/small_equator_constellation")
+
+        # Dynamic state of only the finest time step
+        finest_dynamic_state_dir = temp_gen_data + "/small_equator_constellation/dynamic_state_finest"
+        os.rename(help_small_equator_dynamic_state(temp_gen_data, 1, 500, 4), finest_dynamic_state_dir)
+
+        # With multiple time steps, the coarser are derived from the finest, also if a chunk does not start at one
+        # of their time steps (the chunks start at 0 ms, 1500 ms and 3000 ms)
+        for fstate_format in ["text", "binary"]:
+            help_small_equator_dynamic_state(temp_gen_data, 3, [2000, 500, 1000], 4, fstate_format=fstate_format)
+            for step_ms in [500, 1000, 2000]:
+                step_dir = temp_gen_data + "/small_equator_constellation/dynamic_state_" + str(step_ms) + "ms_for_4s"
+                fstate_store = read_fstate_store(step_dir) if fstate_format == "binary" else None
+                fstate = {}
+                for t in range(0, 4 * 1000 * 1000 * 1000, step_ms * 1000 * 1000):
+                    self.assertTrue(os.path.isfile(step_dir + "/gsl_if_bandwidth_" + str(t) + ".txt"))
+                    for spl in read_fstate_updates(step_dir, t, fstate_store):
+                        fstate[(spl[0], spl[1])] = (spl[2], spl[3], spl[4])
+                    self.assertEqual(fstate, fstate_at(finest_dynamic_state_dir, t, 500 * 1000 * 1000))
+                if fstate_format == "binary":
+                    self.assertEqual(
+                        fstate_store["index"][:, 0].tolist(),
+                        list(range(0, 4 * 1000 * 1000 * 1000, step_ms * 1000 * 1000))
+                    )
+
+        # Each time step must be a multiple of the finest
+        try:
+            help_small_equator_dynamic_state(temp_gen_data, 1, [1000, 1500], 1)
+            self.fail()
+        except ValueError:
+            pass
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_fstate_keyframes(self):
+        local_shell = exputil.LocalShell()
+        temp_gen_data = "temp_dynamic_state_keyframes_gen_data"
+        create_small_equator_constellation(local_shell, temp_gen_data + "/small_equator_constellation")
+        time_step_ns = 1000 * 1000 * 1000
+
+        # With a keyframe every two time steps, the chunks start at a keyframe ([0, 4) and [4, 5))
+        output_dynamic_state_dir = help_small_equator_dynamic_state(
+            temp_gen_data, 2, 1000, 5, fstate_keyframe_interval=2
+        )
+        fstate = {}
+        for t in range(0, 5 * time_step_ns, time_step_ns):
+            fstate_updates = read_fstate_updates(output_dynamic_state_dir, t)
+            if t % (2 * time_step_ns) == 0:
+                self.assertEqual(len(fstate_updates), 8 * 4 - 4)
+            for spl in fstate_updates:
+                fstate[(spl[0], spl[1])] = (spl[2], spl[3], spl[4])
+            self.assertEqual(fstate_at(output_dynamic_state_dir, t, time_step_ns, 2), fstate)
+
+        # Keyframe interval must be positive, and the chunks must start at a keyframe
+        for (chunk_size, fstate_keyframe_interval) in [(None, 0), (3, 2)]:
+            try:
+                help_small_equator_dynamic_state(
+                    temp_gen_data, 1, 1000, 5, chunk_size=chunk_size, fstate_keyframe_interval=fstate_keyframe_interval
+                )
+                self.fail()
+            except ValueError:
+                pass
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
+
+    def test_propagation_and_parallel_modes(self):
+        local_shell = exputil.LocalShell()
+        temp_gen_data = "temp_dynamic_state_modes_gen_data"
+        create_small_equator_constellation(local_shell, temp_gen_data + "/small_equator_constellation")
+
+        # Dynamic state with ephem (as in test_around_equator_connectivity_with_starlink())
+        ephem_dynamic_state_dir = temp_gen_data + "/small_equator_constellation/dynamic_state_ephem"
+        os.rename(help_small_equator_dynamic_state(temp_gen_data, 1, 1000, 1, "ephem"), ephem_dynamic_state_dir)
+
+        # The batched SGP-4 propagation (directly, in closed form or via the ephemeris table)
+        # must yield the same state as ephem
+        # (also when the ISL lengths are memoized over one period, and when run in processes or chunks)
+        for (propagation_mode, memoize_isl_lengths, parallel_mode, chunk_size) in [
+            ("ephem", True, "threads", None),
+            ("sgp4", False, "threads", None),
+            ("analytic", False, "threads", None),
+            ("ephemeris", False, "threads", None),
+            ("ephem", False, "threads", 1),
+            ("ephem", True, "processes", None),
+            ("ephemeris", False, "processes", 1),
+        ]:
+            output_dynamic_state_dir = help_small_equator_dynamic_state(
+                temp_gen_data,
+                2 if parallel_mode == "processes" else 1,
+                1000,
+                1,
+                propagation_mode,
+                memoize_isl_lengths=memoize_isl_lengths,
+                parallel_mode=parallel_mode,
+                chunk_size=chunk_size
+            )
+            for filename in ["fstate_0.txt", "gsl_if_bandwidth_0.txt"]:
+                with open(output_dynamic_state_dir + "/" + filename, "r") as f_in:
+                    with open(ephem_dynamic_state_dir + "/" + filename, "r") as f_in_ephem:
+                        self.assertEqual(sorted(f_in.readlines()), sorted(f_in_ephem.readlines()))
+
+        # The ephemeris table was generated next to the TLEs
+        self.assertTrue(os.path.isfile(temp_gen_data + "/small_equator_constellation/ephemeris_1000ms_for_1s.npy"))
+
+        # Invalid parallelization
+        for (num_threads, parallel_mode, chunk_size) in [(1, "gpu", None), (0, "processes", None), (1, "threads", 0)]:
+            try:
+                help_small_equator_dynamic_state(
+                    temp_gen_data, num_threads, 1000, 1, parallel_mode=parallel_mode, chunk_size=chunk_size
+                )
+                self.fail()
+            except ValueError:
+                pass
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_gen_data)
@@ -292,6 +292,38 @@ class TestEndToEnd(unittest.TestCase):
                         self.assertEqual(a_time, b_time)
                         self.assertAlmostEqual(a_rtt, b_rtt, places=6)
 
+            # The same paths and RTTs are calculated in memory, without any files
+            routes_and_rtt = satgen.post_analysis.routes_and_rtt_in_memory(
+                output_generated_data_dir + "/" + name,
+                default_time_step_ms,
+                duration_s,
+                [(12, 13)],
+                dynamic_state_algorithm
+            )
+            self.assertEqual(len(routes_and_rtt["time_since_epoch_ns"]), len(lines1))
+            for i in range(len(lines1)):
+                a_spl = lines1[i].split(",")
+                self.assertEqual(routes_and_rtt["time_since_epoch_ns"][i], int(a_spl[0]))
+                self.assertAlmostEqual(routes_and_rtt["rtt_ns"][(12, 13)][i], float(a_spl[1]), places=6)
+            with open(output_analysis_data_dir + "/" + name + "/data/networkx_path_12_to_13.txt", "r") as f_in:
+                self.assertEqual(
+                    ["%d,%s" % (t, "-".join(map(str, path))) for (t, path) in routes_and_rtt["paths"][(12, 13)]],
+                    [line.strip() for line in f_in]
+                )
+
+            # Its forwarding state is that of the files for the pair (in both directions)
+            satellite_network_dynamic_state_dir = "%s/%s/dynamic_state_%dms_for_%ds" % (
+                output_generated_data_dir, name, default_time_step_ms, duration_s
+            )
+            for t in [0, 27600000000, 199900000000]:
+                fstate = satgen.fstate_at(satellite_network_dynamic_state_dir, t, default_time_step_ms * 1000 * 1000)
+                fstate_in_memory = satgen.fstate_at(
+                    None, t, default_time_step_ms * 1000 * 1000, fstate_store=routes_and_rtt["fstate_store"]
+                )
+                self.assertEqual(len(fstate_in_memory), 12 * 2 + 2)
+                for key in fstate_in_memory:
+                    self.assertEqual(fstate_in_memory[key], fstate[key])
+
             # Now let's run all analyses available
 
             # TODO: Disabled because it requires downloading files from CDNs, which can take too long
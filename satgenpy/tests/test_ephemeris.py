@@ -0,0 +1,120 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import satgen
+import unittest
+import os
+import numpy as np
+import exputil
+
+
+class TestEphemeris(unittest.TestCase):
+
+    def test_ephemeris(self):
+        local_shell = exputil.LocalShell()
+        temp_dir = "temp_ephemeris_network"
+        local_shell.make_full_dir(temp_dir)
+
+        # Small constellation
+        satgen.generate_tles_from_scratch_manual(
+            temp_dir + "/tles.txt", "Kuiper-630", 4, 5, 1, 51.9, 0.0000001, 0.0, 14.80
+        )
+        tles = satgen.read_tles(temp_dir + "/tles.txt")
+        satellites = tles["satellites"]
+        epoch = tles["epoch"]
+
+        # Generated the first time it is needed
+        filename_ephemeris = satgen.ephemeris_filename(temp_dir, 500, 2)
+        self.assertEqual(filename_ephemeris, temp_dir + "/ephemeris_500ms_for_2s.npy")
+        self.assertFalse(os.path.isfile(filename_ephemeris))
+        ephemeris_positions_m = satgen.help_ephemeris(temp_dir, 500, 2)
+        self.assertTrue(os.path.isfile(filename_ephemeris))
+        self.assertEqual(ephemeris_positions_m.shape, (4, 20, 3))
+        self.assertFalse(ephemeris_positions_m.flags.writeable)
+
+        # Must be exactly the same as SGP-4 propagation
+        sgp4_propagator = satgen.create_propagator_for_mode("sgp4", satellites, epoch)
+        ephemeris_propagator = satgen.create_propagator_for_network(
+            "ephemeris", temp_dir, 500, 2, satellites, epoch
+        )
+        for t in [0, 500000000, 1000000000, 1500000000]:
+            self.assertTrue(np.array_equal(
+                satgen.satellite_positions_m_at(sgp4_propagator, t),
+                satgen.satellite_positions_m_at(ephemeris_propagator, t)
+            ))
+            self.assertTrue(np.array_equal(
+                satgen.satellite_position_m_at(sgp4_propagator, 7, t),
+                satgen.satellite_position_m_at(ephemeris_propagator, 7, t)
+            ))
+
+        # Only the time steps in the table can be looked up
+        for t in [-500000000, 100000000, 2000000000]:
+            try:
+                satgen.satellite_positions_m_at(ephemeris_propagator, t)
+                self.fail()
+            except ValueError:
+                pass
+
+        # The hash of the TLEs is stored next to the table
+        filename_tles_hash = satgen.ephemeris_tles_hash_filename(filename_ephemeris)
+        self.assertEqual(filename_tles_hash, temp_dir + "/ephemeris_500ms_for_2s_tles_sha256.txt")
+        self.assertTrue(os.path.isfile(filename_tles_hash))
+
+        # Same number of satellites but other TLEs, the table must be generated again
+        satgen.generate_tles_from_scratch_manual(
+            temp_dir + "/tles.txt", "Kuiper-630", 4, 5, 1, 33.2, 0.0000001, 0.0, 14.80
+        )
+        tles_other = satgen.read_tles(temp_dir + "/tles.txt")
+        sgp4_propagator_other = satgen.create_propagator_for_mode("sgp4", tles_other["satellites"], epoch)
+        ephemeris_positions_m_other = satgen.help_ephemeris(temp_dir, 500, 2)
+        self.assertFalse(np.array_equal(ephemeris_positions_m, ephemeris_positions_m_other))
+        for i, t in enumerate([0, 500000000, 1000000000, 1500000000]):
+            self.assertTrue(np.array_equal(
+                satgen.satellite_positions_m_at(sgp4_propagator_other, t),
+                ephemeris_positions_m_other[i]
+            ))
+
+        # Other propagation modes do not need a table
+        self.assertIsNone(satgen.create_propagator_for_network("ephem", temp_dir, 1000, 2, satellites, epoch))
+        self.assertFalse(os.path.isfile(temp_dir + "/ephemeris_1000ms_for_2s.npy"))
+
+        # Number of satellites must match
+        try:
+            satgen.read_ephemeris(filename_ephemeris, 19)
+            self.fail()
+        except ValueError:
+            pass
+        try:
+            satgen.create_propagator_for_mode("ephemeris", satellites, epoch)
+            self.fail()
+        except ValueError:
+            pass
+
+        # Shape must be (time steps, satellites, 3)
+        np.save(temp_dir + "/invalid.npy", np.zeros((4, 20)))
+        try:
+            satgen.read_ephemeris(temp_dir + "/invalid.npy", 20)
+            self.fail()
+        except ValueError:
+            pass
+
+        local_shell.remove_force_recursive(temp_dir)
@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 import exputil
+import networkx as nx
 import unittest
 from satgen.dynamic_state.fstate_calculation import *
 
@@ -136,6 +137,87 @@ def calculate_fstate_for(
     return result
 
 
+def calculate_fstate_without_gs_relaying_baseline(
+        num_satellites,
+        num_ground_stations,
+        edges
+):
+
+    # Same graph and interfaces as calculate_fstate_for()
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_satellites))
+    ground_station_satellites_in_range = [[] for _ in range(num_ground_stations)]
+    num_isls_per_sat = [0] * num_satellites
+    sat_neighbor_to_if = {}
+    for e in edges:
+        if e[0] < num_satellites and e[1] < num_satellites:
+            graph.add_edge(e[0], e[1], weight=e[2])
+            sat_neighbor_to_if[(e[0], e[1])] = num_isls_per_sat[e[0]]
+            sat_neighbor_to_if[(e[1], e[0])] = num_isls_per_sat[e[1]]
+            num_isls_per_sat[e[0]] += 1
+            num_isls_per_sat[e[1]] += 1
+        else:
+            ground_station_satellites_in_range[max(e[0], e[1]) - num_satellites].append((e[2], min(e[0], e[1])))
+    gid_to_sat_gsl_if_idx = list(range(num_ground_stations))
+
+    # One pair at a time, sorting the possibilities by (distance, satellite identifier)
+    dist_sat_net_without_gs = nx.floyd_warshall_numpy(graph)
+    fstate = {}
+    dist_satellite_to_ground_station = {}
+    for curr in range(num_satellites):
+        for dst_gid in range(num_ground_stations):
+            dst_gs_node_id = num_satellites + dst_gid
+            possibilities = sorted([
+                (dist_sat_net_without_gs[(curr, b[1])] + b[0], b[1])
+                for b in ground_station_satellites_in_range[dst_gid]
+                if not math.isinf(dist_sat_net_without_gs[(curr, b[1])])
+            ])
+            next_hop_decision = (-1, -1, -1)
+            distance_to_ground_station_m = float("inf")
+            if len(possibilities) > 0:
+                dst_sat = possibilities[0][1]
+                distance_to_ground_station_m = possibilities[0][0]
+                if curr != dst_sat:
+                    best_distance_m = 1000000000000000
+                    for neighbor_id in graph.neighbors(curr):
+                        distance_m = graph.edges[(curr, neighbor_id)]["weight"] \
+                                     + dist_sat_net_without_gs[(neighbor_id, dst_sat)]
+                        if distance_m < best_distance_m:
+                            next_hop_decision = (
+                                neighbor_id,
+                                sat_neighbor_to_if[(curr, neighbor_id)],
+                                sat_neighbor_to_if[(neighbor_id, curr)]
+                            )
+                            best_distance_m = distance_m
+                else:
+                    next_hop_decision = (
+                        dst_gs_node_id,
+                        num_isls_per_sat[dst_sat] + gid_to_sat_gsl_if_idx[dst_gid],
+                        0
+                    )
+            dist_satellite_to_ground_station[(curr, dst_gs_node_id)] = distance_to_ground_station_m
+            fstate[(curr, dst_gs_node_id)] = next_hop_decision
+    for src_gid in range(num_ground_stations):
+        for dst_gid in range(num_ground_stations):
+            if src_gid != dst_gid:
+                dst_gs_node_id = num_satellites + dst_gid
+                possibilities = sorted([
+                    (a[0] + dist_satellite_to_ground_station[(a[1], dst_gs_node_id)], a[1])
+                    for a in ground_station_satellites_in_range[src_gid]
+                    if not math.isinf(dist_satellite_to_ground_station[(a[1], dst_gs_node_id)])
+                ])
+                next_hop_decision = (-1, -1, -1)
+                if len(possibilities) > 0:
+                    src_sat_id = possibilities[0][1]
+                    next_hop_decision = (
+                        src_sat_id,
+                        0,
+                        num_isls_per_sat[src_sat_id] + gid_to_sat_gsl_if_idx[src_gid]
+                    )
+                fstate[(num_satellites + src_gid, dst_gs_node_id)] = next_hop_decision
+    return fstate
+
+
 class TestFstateCalculation(unittest.TestCase):
 
     def test_one_sat_two_gs(self):
@@ -521,3 +603,217 @@ class TestFstateCalculation(unittest.TestCase):
         self.assertEqual(output["combined"][(3, 4)], (1, 0, 1))
         self.assertEqual(output["combined"][(4, 2)], (1, 0, 2))
         self.assertEqual(output["combined"][(4, 3)], (1, 0, 2))
+
+    def test_four_sat_two_gs_disconnected(self):
+
+        #
+        #  0 --- 1    2 --- 3
+        #  |                |
+        #  4                5
+        #
+
+        num_satellites = 4
+        num_ground_stations = 2
+
+        edges = [
+            (0, 1, 10),
+            (2, 3, 10),
+            (0, 4, 5),
+            (3, 5, 5),
+        ]
+
+        output = calculate_fstate_for(num_satellites, num_ground_stations, edges)
+
+        self.assertEqual(output["without_gs_relays"][(0, 4)], (4, 1, 0))
+        self.assertEqual(output["without_gs_relays"][(0, 5)], (-1, -1, -1))
+        self.assertEqual(output["without_gs_relays"][(1, 4)], (0, 0, 0))
+        self.assertEqual(output["without_gs_relays"][(1, 5)], (-1, -1, -1))
+        self.assertEqual(output["without_gs_relays"][(2, 4)], (-1, -1, -1))
+        self.assertEqual(output["without_gs_relays"][(2, 5)], (3, 0, 0))
+        self.assertEqual(output["without_gs_relays"][(3, 4)], (-1, -1, -1))
+        self.assertEqual(output["without_gs_relays"][(3, 5)], (5, 2, 0))
+        self.assertEqual(output["without_gs_relays"][(4, 5)], (-1, -1, -1))
+        self.assertEqual(output["without_gs_relays"][(5, 4)], (-1, -1, -1))
+
+        self.assertEqual(output["only_gs_relays"][(0, 4)], (4, 0, 0))
+        self.assertEqual(output["only_gs_relays"][(0, 5)], (-1, -1, -1))
+        self.assertEqual(output["only_gs_relays"][(1, 4)], (-1, -1, -1))
+        self.assertEqual(output["only_gs_relays"][(1, 5)], (-1, -1, -1))
+        self.assertEqual(output["only_gs_relays"][(2, 4)], (-1, -1, -1))
+        self.assertEqual(output["only_gs_relays"][(2, 5)], (-1, -1, -1))
+        self.assertEqual(output["only_gs_relays"][(3, 4)], (-1, -1, -1))
+        self.assertEqual(output["only_gs_relays"][(3, 5)], (5, 1, 0))
+        self.assertEqual(output["only_gs_relays"][(4, 5)], (-1, -1, -1))
+        self.assertEqual(output["only_gs_relays"][(5, 4)], (-1, -1, -1))
+
+        self.assertEqual(output["combined"][(0, 4)], (4, 1, 0))
+        self.assertEqual(output["combined"][(0, 5)], (-1, -1, -1))
+        self.assertEqual(output["combined"][(1, 4)], (0, 0, 0))
+        self.assertEqual(output["combined"][(1, 5)], (-1, -1, -1))
+        self.assertEqual(output["combined"][(2, 4)], (-1, -1, -1))
+        self.assertEqual(output["combined"][(2, 5)], (3, 0, 0))
+        self.assertEqual(output["combined"][(3, 4)], (-1, -1, -1))
+        self.assertEqual(output["combined"][(3, 5)], (5, 2, 0))
+        self.assertEqual(output["combined"][(4, 5)], (-1, -1, -1))
+        self.assertEqual(output["combined"][(5, 4)], (-1, -1, -1))
+
+    def test_four_sat_two_gs_equal_distances(self):
+
+        #
+        #       0
+        #     /   \
+        #    1     2
+        #    | \ / |
+        #    |  5  |
+        #     \   /
+        #       3
+        #       |
+        #       4
+        #
+
+        num_satellites = 4
+        num_ground_stations = 2
+
+        edges = [
+            (0, 1, 10),
+            (0, 2, 10),
+            (1, 3, 10),
+            (2, 3, 10),
+            (3, 4, 5),
+            (2, 5, 5),
+            (1, 5, 5),
+        ]
+
+        output = calculate_fstate_for(num_satellites, num_ground_stations, edges)
+
+        # At equal distance, the first neighbor and the lowest destination satellite identifier is chosen
+        self.assertEqual(output["without_gs_relays"][(0, 4)], (1, 0, 0))
+        self.assertEqual(output["without_gs_relays"][(0, 5)], (1, 0, 0))
+        self.assertEqual(output["without_gs_relays"][(1, 5)], (5, 3, 0))
+        self.assertEqual(output["without_gs_relays"][(2, 5)], (5, 3, 0))
+        self.assertEqual(output["without_gs_relays"][(3, 4)], (4, 2, 0))
+        self.assertEqual(output["without_gs_relays"][(3, 5)], (1, 0, 1))
+        self.assertEqual(output["without_gs_relays"][(4, 5)], (3, 0, 2))
+        self.assertEqual(output["without_gs_relays"][(5, 4)], (1, 0, 3))
+
+        self.assertEqual(output["combined"][(0, 4)], (1, 0, 0))
+        self.assertEqual(output["combined"][(0, 5)], (1, 0, 0))
+        self.assertEqual(output["combined"][(3, 5)], (1, 0, 1))
+        self.assertEqual(output["combined"][(4, 5)], (3, 0, 2))
+        self.assertEqual(output["combined"][(5, 4)], (2, 0, 3))
+
+    def test_ground_station_to_ground_station_ties_as_baseline(self):
+
+        # Ring of 8 satellites with two chords and 4 ground stations, each with several satellites in range,
+        # with small integer distances such that many paths are of equal distance (and one ground station
+        # is disconnected from the rest): the next hops are the same as when selecting one pair at a time
+        num_satellites = 8
+        num_ground_stations = 4
+        rng = np.random.default_rng(2)
+        for _ in range(20):
+            edges = [(i, (i + 1) % 6, int(rng.integers(1, 3))) for i in range(6)] + [(6, 7, 1)]
+            edges += [(0, 3, int(rng.integers(1, 4))), (1, 4, int(rng.integers(1, 4)))]
+            for gid in range(num_ground_stations):
+                in_range = [6, 7] if gid == 3 else sorted(rng.choice(6, size=int(rng.integers(1, 4)), replace=False))
+                for sid in in_range:
+                    edges.append((int(sid), num_satellites + gid, int(rng.integers(1, 3))))
+            output = calculate_fstate_for(num_satellites, num_ground_stations, edges)
+            self.assertEqual(
+                dict(output["without_gs_relays"]),
+                calculate_fstate_without_gs_relaying_baseline(num_satellites, num_ground_stations, edges)
+            )
+
+    def test_incremental_shortest_paths(self):
+
+        # Ring of 12 nodes with chords, of which the weights change a bit every time step
+        num_nodes = 12
+        edges = [(i, (i + 1) % num_nodes) for i in range(num_nodes)] + [(0, 6), (3, 9), (2, 7)]
+        rng = np.random.default_rng(1)
+        base_weights = rng.uniform(100, 200, len(edges))
+
+        shortest_paths = {}
+        for t in range(30):
+            graph = nx.Graph()
+            graph.add_nodes_from(range(num_nodes))
+            for i, (a, b) in enumerate(edges):
+
+                # At some time steps a chord is not there (the edges change)
+                if (a, b) == (3, 9) and 10 <= t < 13:
+                    continue
+                graph.add_edge(a, b, weight=float(base_weights[i] * (1.0 + 0.5 * math.sin(0.2 * t + i))))
+
+            # The sources change as well over time
+            sources = [0, 4, 5] if t < 20 else [4, 11, 0]
+            distances = shortest_path_distances_from_incremental(graph, num_nodes, sources, shortest_paths)
+
+            # Exactly equal to calculating it from scratch
+            self.assertTrue(np.array_equal(distances, shortest_path_distances_from(graph, num_nodes, sources)))
+
+        # Unreachable nodes remain unreachable
+        graph = nx.Graph()
+        graph.add_nodes_from(range(4))
+        graph.add_edge(0, 1, weight=1.0)
+        graph.add_edge(2, 3, weight=1.0)
+        shortest_paths = {}
+        for t in range(2):
+            graph.edges[(0, 1)]["weight"] = 1.0 + t
+            distances = shortest_path_distances_from_incremental(graph, 4, [0, 3], shortest_paths)
+            self.assertEqual(distances.tolist(), [[0.0, 1.0 + t, math.inf, math.inf], [math.inf, math.inf, 1.0, 0.0]])
+
+    def test_forwarding_state_array(self):
+
+        # 2 satellites and 2 ground stations (nodes 2 and 3)
+        fstate_array = empty_fstate_array(2, 2)
+        fstate_array[0, 0] = (2, 1, 0)
+        fstate_array[1, 1] = (-1, -1, -1)
+        fstate_array[3, 0] = (0, 0, 1)
+        fstate = ForwardingState(2, fstate_array)
+        self.assertEqual(len(fstate), 3)
+        self.assertEqual(dict(fstate), {(0, 2): (2, 1, 0), (1, 3): (-1, -1, -1), (3, 2): (0, 0, 1)})
+        self.assertFalse((0, 3) in fstate)
+        self.assertFalse((0, 1) in fstate)
+        self.assertFalse((4, 2) in fstate)
+        try:
+            _ = fstate[(1, 2)]
+            self.fail()
+        except KeyError:
+            pass
+
+        # Without previous forwarding state, all entries are updates
+        self.assertEqual(
+            fstate_updates_between(None, fstate).tolist(),
+            [[0, 2, 2, 1, 0], [1, 3, -1, -1, -1], [3, 2, 0, 0, 1]]
+        )
+
+        # Else, only the entries which changed (in order of current node, and then destination)
+        next_fstate_array = fstate_array.copy()
+        next_fstate_array[1, 1] = (0, 0, 1)
+        next_fstate_array[3, 0, 2] = 2
+        self.assertEqual(
+            fstate_updates_between(fstate, ForwardingState(2, next_fstate_array)).tolist(),
+            [[1, 3, 0, 0, 1], [3, 2, 0, 0, 2]]
+        )
+        self.assertEqual(fstate_updates_between(fstate, fstate).shape, (0, 5))
+
+    def test_gs_relaying_invalid_graph(self):
+
+        # Ground stations 2 and 3 cannot be linked directly
+        graph = nx.Graph()
+        graph.add_nodes_from(range(4))
+        graph.add_edge(0, 2, weight=10.0)
+        graph.add_edge(1, 3, weight=10.0)
+        graph.add_edge(2, 3, weight=10.0)
+        try:
+            calculate_fstate_shortest_path_with_gs_relaying(None, 0, 2, 2, graph, [0, 0], [0, 0], {}, None, False)
+            self.fail()
+        except ValueError:
+            pass
+
+        # Nor can a neighbor be unreachable
+        graph.remove_edge(2, 3)
+        graph.edges[(0, 2)]["weight"] = math.inf
+        try:
+            calculate_fstate_shortest_path_with_gs_relaying(None, 0, 2, 2, graph, [0, 0], [0, 0], {}, None, False)
+            self.fail()
+        except ValueError:
+            pass
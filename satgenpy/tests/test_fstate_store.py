@@ -0,0 +1,142 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import satgen
+import unittest
+import os
+import exputil
+from satgen.dynamic_state.fstate_store import open_fstate_store_part, close_fstate_store_part, write_fstate_updates, \
+    fstate_store_from_arrays
+
+
+class TestFstateStore(unittest.TestCase):
+
+    def test_fstate_store(self):
+        local_shell = exputil.LocalShell()
+        temp_dir = "temp_fstate_store"
+        local_shell.make_full_dir(temp_dir)
+
+        # Two parts, the first of which calculated one additional time step
+        part_0 = open_fstate_store_part(temp_dir, 0)
+        write_fstate_updates(temp_dir, 0, [(0, 2, 1, 0, 0), (1, 2, 2, 1, 0)], False, part_0, True)
+        write_fstate_updates(temp_dir, 100, [], False, part_0)
+        write_fstate_updates(temp_dir, 200, [(0, 2, -1, -1, -1)], False, part_0)
+        close_fstate_store_part(part_0)
+        part_200 = open_fstate_store_part(temp_dir, 200)
+        write_fstate_updates(temp_dir, 200, [(0, 2, -1, -1, -1), (1, 2, 2, 1, 0)], False, part_200, True)
+        write_fstate_updates(temp_dir, 300, [(1, 2, 0, 0, 1)], False, part_200)
+        close_fstate_store_part(part_200)
+        self.assertIsNone(satgen.read_fstate_store(temp_dir))
+
+        # Merged, the shared time step is taken from the first part
+        satgen.merge_fstate_store_parts(temp_dir)
+        self.assertEqual(sorted(os.listdir(temp_dir)), ["fstate.npy", "fstate_index.npy"])
+        fstate_store = satgen.read_fstate_store(temp_dir)
+        self.assertEqual(fstate_store["records"].shape, (4, 5))
+        self.assertEqual(
+            fstate_store["index"].tolist(), [[0, 0, 2, 1], [100, 2, 0, 0], [200, 2, 1, 0], [300, 3, 1, 0]]
+        )
+        self.assertEqual(fstate_store["keyframe_rows"].tolist(), [0])
+        self.assertEqual(satgen.read_fstate_updates(temp_dir, 0, fstate_store), [[0, 2, 1, 0, 0], [1, 2, 2, 1, 0]])
+        self.assertEqual(satgen.read_fstate_updates(temp_dir, 100, fstate_store), [])
+        self.assertEqual(satgen.read_fstate_updates(temp_dir, 200, fstate_store), [[0, 2, -1, -1, -1]])
+        self.assertEqual(satgen.read_fstate_updates(temp_dir, 300, fstate_store), [[1, 2, 0, 0, 1]])
+
+        # Only the time steps in the store can be read
+        try:
+            satgen.read_fstate_updates(temp_dir, 400, fstate_store)
+            self.fail()
+        except ValueError:
+            pass
+
+        # Text files are read the same way
+        write_fstate_updates(temp_dir, 0, [(0, 2, 1, 0, 0), (1, 2, 2, 1, 0)], False)
+        with open(temp_dir + "/fstate_0.txt", "r") as f_in:
+            self.assertEqual(f_in.read(), "0,2,1,0,0\n1,2,2,1,0\n")
+        self.assertEqual(satgen.read_fstate_updates(temp_dir, 0), [[0, 2, 1, 0, 0], [1, 2, 2, 1, 0]])
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_dir)
+
+    def test_fstate_at(self):
+        local_shell = exputil.LocalShell()
+        temp_dir = "temp_fstate_at"
+        local_shell.make_full_dir(temp_dir)
+
+        # Keyframe every two time steps, written both as text files and to the binary store
+        # (the last time step has as many updates as a keyframe, but is not one)
+        list_fstate_updates = [
+            [(0, 2, 1, 0, 0), (1, 2, 2, 1, 0)],
+            [(0, 2, -1, -1, -1)],
+            [(0, 2, -1, -1, -1), (1, 2, 2, 1, 0)],
+            [],
+            [(0, 2, 1, 0, 0), (1, 2, 0, 0, 1)],
+            [(0, 2, -1, -1, -1), (1, 2, 2, 1, 0)],
+        ]
+        part_0 = open_fstate_store_part(temp_dir, 0)
+        for i in range(len(list_fstate_updates)):
+            write_fstate_updates(temp_dir, i * 100, list_fstate_updates[i], False)
+            write_fstate_updates(temp_dir, i * 100, list_fstate_updates[i], False, part_0, i % 2 == 0)
+        close_fstate_store_part(part_0)
+        satgen.merge_fstate_store_parts(temp_dir)
+        fstate_store = satgen.read_fstate_store(temp_dir)
+        self.assertEqual(fstate_store["keyframe_rows"].tolist(), [0, 2, 4])
+
+        # The same as replaying all updates from the start
+        fstate = {}
+        for i in range(len(list_fstate_updates)):
+            for update in list_fstate_updates[i]:
+                fstate[(update[0], update[1])] = update[2:]
+            self.assertEqual(satgen.fstate_at(temp_dir, i * 100, 100, fstate_store=fstate_store), fstate)
+            self.assertEqual(satgen.fstate_at(temp_dir, i * 100, 100, 2), fstate)
+            self.assertEqual(satgen.fstate_at(temp_dir, i * 100, 100), fstate)
+
+        # Only from the last keyframe on are the text files read
+        os.remove(temp_dir + "/fstate_100.txt")
+        self.assertEqual(satgen.fstate_at(temp_dir, 300, 100, 2), {(0, 2): (-1, -1, -1), (1, 2): (2, 1, 0)})
+
+        # Only time steps can be read
+        try:
+            satgen.fstate_at(temp_dir, 150, 100, 2)
+            self.fail()
+        except ValueError:
+            pass
+        try:
+            satgen.fstate_at(temp_dir, 600, 100, fstate_store=fstate_store)
+            self.fail()
+        except ValueError:
+            pass
+
+        # The index must flag its keyframes, starting with the first time step
+        try:
+            fstate_store_from_arrays(fstate_store["records"], fstate_store["index"][:, :3])
+            self.fail()
+        except ValueError:
+            pass
+        try:
+            fstate_store_from_arrays(fstate_store["records"], fstate_store["index"][1:])
+            self.fail()
+        except ValueError:
+            pass
+
+        # Clean up
+        local_shell.remove_force_recursive(temp_dir)
@@ -63,6 +63,147 @@ class TestGroundStations(unittest.TestCase):
         os.remove("ground_stations.temp.txt")
         os.remove("ground_stations_extended.temp.txt")
 
+    def test_ground_station_distance_matrices(self):
+
+        # Write basic ground stations
+        with open("ground_stations.temp.txt", "w+") as f_out:
+            f_out.write("0,Amsterdam,52.379189,4.899431,0\n")
+            f_out.write("1,Paris,48.864716,2.349014,0\n")
+            f_out.write("2,New York,40.730610,-73.935242,0")
+        satgen.extend_ground_stations("ground_stations.temp.txt", "ground_stations_extended.temp.txt")
+
+        # Basic and extended give the same matrices
+        distance_matrices = satgen.read_ground_station_distance_matrices("ground_stations.temp.txt")
+        distance_matrices_extended = satgen.read_ground_station_distance_matrices("ground_stations_extended.temp.txt")
+        for key in ["geodesic_distance_m", "straight_distance_m"]:
+            self.assertEqual((3, 3), distance_matrices[key].shape)
+            self.assertFalse(distance_matrices[key].flags.writeable)
+            for i in range(3):
+                self.assertEqual(0.0, distance_matrices[key][i][i])
+                for j in range(3):
+                    self.assertAlmostEqual(distance_matrices[key][i][j], distance_matrices[key][j][i], delta=0.000001)
+                    self.assertAlmostEqual(
+                        distance_matrices[key][i][j],
+                        distance_matrices_extended[key][i][j],
+                        delta=0.000001
+                    )
+        self.assertTrue(
+            distance_matrices["straight_distance_m"][0][2] < distance_matrices["geodesic_distance_m"][0][2]
+        )
+
+        # Reading it in again is cached
+        self.assertTrue(
+            distance_matrices is satgen.read_ground_station_distance_matrices("ground_stations.temp.txt")
+        )
+
+        # Until the file changes
+        with open("ground_stations.temp.txt", "w+") as f_out:
+            f_out.write("0,Amsterdam,52.379189,4.899431,0\n")
+            f_out.write("1,Paris,48.864716,2.349014,0")
+        distance_matrices_changed = satgen.read_ground_station_distance_matrices("ground_stations.temp.txt")
+        self.assertEqual((2, 2), distance_matrices_changed["geodesic_distance_m"].shape)
+
+        # Clean up
+        os.remove("ground_stations.temp.txt")
+        os.remove("ground_stations_extended.temp.txt")
+
+    def test_ground_stations_arrays(self):
+
+        # Write basic ground stations in bulk
+        satgen.write_ground_stations_basic(
+            "ground_stations.temp.txt",
+            ["abc", "def", "ghi"],
+            ["33", "-12.5", "79.741382"],
+            ["11.0", "120.984222", "-53.143087"],
+            [77.0, 0.0, 1234.5]
+        )
+
+        # Arrays match the per ground station reading
+        ground_stations = satgen.read_ground_stations_basic("ground_stations.temp.txt")
+        ground_stations_arrays = satgen.read_ground_stations_basic_arrays("ground_stations.temp.txt")
+        self.assertEqual(3, len(ground_stations))
+        self.assertEqual(3, len(ground_stations_arrays["gid"]))
+        for i in range(3):
+            self.assertEqual(ground_stations[i]["gid"], ground_stations_arrays["gid"][i])
+            for key in ["name", "latitude_degrees_str", "longitude_degrees_str", "elevation_m_float"]:
+                self.assertEqual(ground_stations[i][key], ground_stations_arrays[key][i])
+        self.assertEqual("33", ground_stations_arrays["latitude_degrees_str"][0])
+        self.assertEqual(1234.5, ground_stations_arrays["elevation_m_float"][2])
+
+        # Extend, which must be identical to converting and writing one at a time
+        satgen.extend_ground_stations("ground_stations.temp.txt", "ground_stations_extended.temp.txt")
+        expected = ""
+        for ground_station in ground_stations:
+            cartesian = satgen.geodetic2cartesian(
+                float(ground_station["latitude_degrees_str"]),
+                float(ground_station["longitude_degrees_str"]),
+                ground_station["elevation_m_float"]
+            )
+            expected += "%d,%s,%f,%f,%f,%f,%f,%f\n" % (
+                ground_station["gid"],
+                ground_station["name"],
+                float(ground_station["latitude_degrees_str"]),
+                float(ground_station["longitude_degrees_str"]),
+                ground_station["elevation_m_float"],
+                cartesian[0],
+                cartesian[1],
+                cartesian[2]
+            )
+        with open("ground_stations_extended.temp.txt", "r") as f_in:
+            self.assertEqual(expected, f_in.read())
+
+        # Extended arrays match the per ground station reading
+        ground_stations_extended = satgen.read_ground_stations_extended("ground_stations_extended.temp.txt")
+        ground_stations_extended_arrays = satgen.read_ground_stations_extended_arrays(
+            "ground_stations_extended.temp.txt"
+        )
+        self.assertEqual((3, 3), ground_stations_extended_arrays["cartesian"].shape)
+        for i in range(3):
+            for key in ["name", "latitude_degrees_str", "longitude_degrees_str", "elevation_m_float"]:
+                self.assertEqual(ground_stations_extended[i][key], ground_stations_extended_arrays[key][i])
+            self.assertEqual(ground_stations_extended[i]["cartesian_x"], ground_stations_extended_arrays["cartesian"][i][0])
+            self.assertEqual(ground_stations_extended[i]["cartesian_y"], ground_stations_extended_arrays["cartesian"][i][1])
+            self.assertEqual(ground_stations_extended[i]["cartesian_z"], ground_stations_extended_arrays["cartesian"][i][2])
+
+        # Empty
+        satgen.write_ground_stations_basic("ground_stations.temp.txt", [], [], [], [])
+        self.assertEqual(0, len(satgen.read_ground_stations_basic_arrays("ground_stations.temp.txt")["gid"]))
+        satgen.extend_ground_stations("ground_stations.temp.txt", "ground_stations_extended.temp.txt")
+        self.assertEqual(
+            (0, 3),
+            satgen.read_ground_stations_extended_arrays("ground_stations_extended.temp.txt")["cartesian"].shape
+        )
+
+        # Invalid: unequal lengths
+        try:
+            satgen.write_ground_stations_basic("ground_stations.temp.txt", ["abc"], ["33", "34"], ["11"], [0.0])
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        # Invalid: missing column, non-ascending gid
+        for content, num_columns in [
+            ("0,abc,33,11", 5),
+            ("0,abc,33,11,5\n0,abc,33,11,5", 5),
+            ("0,abc,33,11,5\n1,abc,33,11,5,4", 5),
+            ("0,abc,33,11,2,3,3", 8),
+            ("0,abc,33,11,5,2,3,3\n0,abc,33,11,5,2,3,3", 8),
+        ]:
+            with open("ground_stations.temp.txt", "w+") as f_out:
+                f_out.write(content)
+            try:
+                if num_columns == 5:
+                    satgen.read_ground_stations_basic_arrays("ground_stations.temp.txt")
+                else:
+                    satgen.read_ground_stations_extended_arrays("ground_stations.temp.txt")
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Clean up
+        os.remove("ground_stations.temp.txt")
+        os.remove("ground_stations_extended.temp.txt")
+
     def test_ground_stations_valid(self):
 
         # Empty
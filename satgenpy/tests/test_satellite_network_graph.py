@@ -0,0 +1,130 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import networkx as nx
+import numpy as np
+from satgen.dynamic_state.satellite_network_graph import *
+from satgen.dynamic_state.algorithm_free_one_only_over_isls import algorithm_free_one_only_over_isls
+from satgen.dynamic_state.algorithm_free_gs_one_sat_many_only_over_isls import \
+    algorithm_free_gs_one_sat_many_only_over_isls
+from satgen.dynamic_state.algorithm_paired_many_only_over_isls import algorithm_paired_many_only_over_isls
+
+
+class TestSatelliteNetworkGraph(unittest.TestCase):
+
+    def check_same_graph(self, graph, nx_graph_dict):
+        self.assertEqual(graph["num_nodes"], nx_graph_dict["num_nodes"])
+        self.assertTrue(np.array_equal(graph["adjacency"].indptr, nx_graph_dict["adjacency"].indptr))
+        self.assertTrue(np.array_equal(graph["adjacency"].indices, nx_graph_dict["adjacency"].indices))
+        self.assertTrue(np.array_equal(graph["adjacency"].data, nx_graph_dict["adjacency"].data))
+        self.assertTrue(np.array_equal(graph["neighbor_ids"], nx_graph_dict["neighbor_ids"]))
+        self.assertTrue(np.array_equal(graph["neighbor_weights"], nx_graph_dict["neighbor_weights"]))
+
+    def test_isl_graph(self):
+
+        # Neighbors are in the order of the ISLs, which is not the order of the identifiers
+        list_isls = [(0, 3), (2, 0), (1, 2), (0, 1), (4, 3)]
+        isl_graph = create_isl_graph(5, list_isls)
+        self.assertEqual(isl_graph["num_isls_per_sat"], [3, 2, 2, 2, 1])
+        self.assertEqual(isl_graph["sat_neighbor_to_if"][(0, 1)], 2)
+        self.assertEqual(isl_graph["sat_neighbor_to_if"][(1, 0)], 1)
+
+        # The structure is the same at every time step, only the weights are different
+        for isl_lengths_m in [[1.0, 2.0, 3.0, 4.0, 5.0], [10.5, 9.5, 8.5, 7.5, 6.5]]:
+            nx_graph = nx.Graph()
+            nx_graph.add_nodes_from(range(5))
+            for isl_idx, (a, b) in enumerate(list_isls):
+                nx_graph.add_edge(a, b, weight=isl_lengths_m[isl_idx])
+            graph = isl_graph_at(isl_graph, np.array(isl_lengths_m))
+            nx_graph_dict = graph_from_networkx(nx_graph, 5, isl_graph["sat_neighbor_to_if"])
+            self.check_same_graph(graph, nx_graph_dict)
+            self.assertTrue(np.array_equal(graph["neighbor_my_if"], nx_graph_dict["neighbor_my_if"]))
+            self.assertTrue(np.array_equal(graph["neighbor_next_hop_if"], nx_graph_dict["neighbor_next_hop_if"]))
+            self.assertEqual(graph["neighbor_ids"][0].tolist(), [3, 2, 1])
+            self.assertEqual(graph["neighbor_ids"][4].tolist(), [3, 5, 5])
+            self.assertEqual(graph["neighbor_weights"][4].tolist(), [isl_lengths_m[4], 0.0, 0.0])
+
+        # Without ISLs
+        graph = isl_graph_at(create_isl_graph(3, []), np.zeros(0))
+        self.assertEqual(graph["adjacency"].nnz, 0)
+        self.assertEqual(graph["neighbor_ids"].tolist(), [[3], [3], [3]])
+
+    def test_gsl_graph(self):
+
+        # 3 satellites and 3 ground stations, of which one has no satellite in range
+        ground_station_satellites_in_range = [[(5.0, 0), (6.0, 2)], [], [(7.0, 1), (8.0, 2)]]
+        nx_graph = nx.Graph()
+        nx_graph.add_nodes_from(range(6))
+        for gid, in_range in enumerate(ground_station_satellites_in_range):
+            for (distance_m, sid) in in_range:
+                nx_graph.add_edge(sid, 3 + gid, weight=distance_m)
+        graph = gsl_graph_at(3, 3, ground_station_satellites_in_range)
+        self.check_same_graph(graph, graph_from_networkx(nx_graph, 6))
+        self.assertEqual(graph["neighbor_ids"][2].tolist(), [3, 5])
+        self.assertEqual(graph["neighbor_ids"][4].tolist(), [6, 6])
+
+    def test_networkx_graph_number_of_nodes(self):
+        nx_graph = nx.Graph()
+        nx_graph.add_nodes_from(range(4))
+        try:
+            graph_from_networkx(nx_graph, 3)
+            self.fail()
+        except ValueError:
+            pass
+        self.assertEqual(graph_of(nx_graph, 4)["num_nodes"], 4)
+
+    def test_algorithms_with_networkx_graph(self):
+
+        # 4 satellites in a line, with ground station 0 in range of satellite 0 and 1, and 1 of satellite 3
+        list_isls = [(0, 1), (1, 2), (2, 3)]
+        isl_lengths_m = [1000.0, 2000.0, 1500.0]
+        isl_graph = create_isl_graph(4, list_isls)
+        nx_graph = nx.Graph()
+        nx_graph.add_nodes_from(range(4))
+        for isl_idx, (a, b) in enumerate(list_isls):
+            nx_graph.add_edge(a, b, weight=isl_lengths_m[isl_idx])
+        ground_station_satellites_in_range = [[(500.0, 0), (700.0, 1)], [(600.0, 3)]]
+
+        # The forwarding state is the same for the graph dictionary and the networkx graph
+        for algorithm, sat_aggregate_max_bandwidth in [
+            (algorithm_free_one_only_over_isls, 1.0),
+            (algorithm_free_gs_one_sat_many_only_over_isls, 2.0),
+            (algorithm_paired_many_only_over_isls, 1.0)
+        ]:
+            list_gsl_interfaces_info = []
+            for node_id in range(6):
+                list_gsl_interfaces_info.append({
+                    "id": node_id,
+                    "number_of_interfaces": 2 if node_id < 4 else 1,
+                    "aggregate_max_bandwidth": sat_aggregate_max_bandwidth if node_id < 4 else 1.0
+                })
+            fstates = []
+            for graph in [isl_graph_at(isl_graph, np.array(isl_lengths_m)), nx_graph]:
+                output = algorithm(
+                    None, 0, [None] * 4, [None] * 2, graph, ground_station_satellites_in_range,
+                    isl_graph["num_isls_per_sat"], isl_graph["sat_neighbor_to_if"], list_gsl_interfaces_info,
+                    None, False
+                )
+                fstates.append(dict(output["fstate"]))
+            self.assertEqual(fstates[0], fstates[1])
+            self.assertEqual(fstates[0][(0, 5)], (1, 0, 0))
@@ -48,6 +48,7 @@ def test_sim_config():
         assert path_name in ["P1", "P2"]
         assert sub_sim_config.duration() == 1
         assert sub_sim_config.constellation().name == "Starlink_550"
+        assert sub_sim_config.constellation().propagation_mode == constants.PROPAGATION_MODE
 
         i = 0
         for point in sub_sim_config.network_points():
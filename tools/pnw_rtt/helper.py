@@ -41,7 +41,7 @@ class PNWMixedNetworkRTTSimulator(NetworkSimulator):
         terra_simulator = PNWDistanceBasedRTTSimulator(self._datapoints_per_run)
 
         state_dir = self._project_dir + "/" + self._config.constellation().name
-        exterra_simulator = SatelliteRelaySimulator(self._groundstation_map, self._config.duration(), state_dir, self._project_dir, os.path.abspath("../../satgenpy"))
+        exterra_simulator = SatelliteRelaySimulator(self._groundstation_map, self._config.duration(), state_dir, self._project_dir, os.path.abspath("../../satgenpy"), self._config.constellation().propagation_mode)
         net_segment.NetworkSegment.configure(exterra_simulator, terra_simulator)
         self._populate_network_segments()
 
@@ -31,7 +31,8 @@ config file format: JSON
         ...,
         "{Path Name N}": [...]
     }
-    "Constellation": Starlink" | "Kuiper" | "Telesat"
+    "Constellation": Starlink" | "Kuiper" | "Telesat",
+    "PropagationMode": "ephem" | "sgp4" | "analytic" | "ephemeris" (optional, default: "ephem")
 }
 """
 
@@ -102,6 +103,8 @@ class SimulationConfig():
         #Validate constellation type
         valid = valid and constants.CONSTELLATION_KEY in config and isinstance(config[constants.CONSTELLATION_KEY], str) and \
                 config[constants.CONSTELLATION_KEY] in ["Starlink", "Kuiper", "Telesat"]
+        valid = valid and (constants.PROPAGATION_MODE_KEY not in config or \
+                config[constants.PROPAGATION_MODE_KEY] in constants.PROPAGATION_MODES)
 
         if not valid:
             return False
@@ -161,6 +164,8 @@ class SimulationConfig():
             self._constellation = constellation_config.GetKuiperConfig()
         else:
             self._constellation = constellation_config.GetTelesatConfig()
+        if constants.PROPAGATION_MODE_KEY in config:
+            self._constellation.propagation_mode = config[constants.PROPAGATION_MODE_KEY]
 
 
         self._subsimulation_configs = {}